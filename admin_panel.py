@@ -1,6 +1,18 @@
 import streamlit as st
+from datetime import datetime
+from config import EXPORT_DIR, PROFILING_ENABLED
 from utils.permissions import is_admin, has_permission
 from utils.categories import get_categories
+from utils.data_export import (iter_local_records, stream_export, export_parquet, export_filename,
+                               run_incremental_export)
+from utils.shard_export import write_shards
+from utils.dedup import run_dedup_job, run_image_dedup_job
+from utils.media_metadata import extract_all_metadata
+from utils.text_processing import process_corpus
+from utils.language_id import detected_label, scan_language_mismatches
+from utils.metrics import registry as metrics_registry, endpoint_summary, render_prometheus, start_metrics_server
+from utils.profiling import load_traces, summarize_traces, TRACES_DIR
+from utils.database import db
 
 def show_admin_panel():
     """Admin panel for system management"""
@@ -10,7 +22,7 @@ def show_admin_panel():
     
     st.header("🔧 Admin Panel")
     
-    tab1, tab2, tab3 = st.tabs(["Users", "Categories", "System"])
+    tab1, tab2, tab3, tab4, tab5, tab6 = st.tabs(["Users", "Categories", "System", "Export", "Duplicates", "Metrics"])
     
     with tab1:
         show_user_management()
@@ -20,6 +32,16 @@ def show_admin_panel():
     
     with tab3:
         show_system_stats()
+    
+    with tab4:
+        show_corpus_export()
+    
+    with tab5:
+        show_duplicate_scan()
+    
+    with tab6:
+        show_api_metrics()
+        show_page_profiles()
 
 def show_user_management():
     """User management interface"""
@@ -110,4 +132,219 @@ def show_system_stats():
         categories_result = st.session_state.api_client.get_categories()
         category_count = len(categories_result) if 'error' not in categories_result else 0
         
-        st.metric("Total Categories", category_count)
\ No newline at end of file
+        st.metric("Total Categories", category_count)
+    
+    st.subheader("🎞️ Local Media")
+    
+    if st.button("Extract Missing Metadata", key="media_metadata_run"):
+        with st.spinner("Reading media headers..."):
+            updated = extract_all_metadata()
+        st.success(f"Extracted metadata for {updated} files")
+    
+    totals = db.media_totals()
+    if totals:
+        st.table([
+            {
+                "Media Type": media_type.title(),
+                "Count": total['count'],
+                "Duration (min)": round(total['duration'] / 60, 1),
+                "Size (MB)": round(total['bytes'] / (1024 * 1024), 1)
+            }
+            for media_type, total in sorted(totals.items())
+        ])
+    
+    st.subheader("📝 Local Text")
+    
+    if st.button("Process Texts", key="text_processing_run"):
+        with st.spinner("Normalizing and tokenizing texts..."):
+            result = process_corpus()
+        st.success(f"Processed {result['processed']} texts ({result['unchanged']} unchanged)")
+    
+    text_stats = db.text_corpus_stats()
+    if text_stats:
+        st.table([
+            {
+                "Script": stats['script'].title(),
+                "Texts": stats['texts'],
+                "Sentences": stats['sentences'],
+                "Tokens": stats['tokens'],
+                "Characters": stats['characters']
+            }
+            for stats in text_stats
+        ])
+    
+    if st.button("Check Languages", key="language_scan_run"):
+        with st.spinner("Identifying text languages..."):
+            mismatches = scan_language_mismatches()
+        if mismatches:
+            st.warning(f"{len(mismatches)} texts may be labelled with the wrong language")
+            st.dataframe([
+                {
+                    "ID": mismatch['id'],
+                    "Selected": str(mismatch['selected']).title(),
+                    "Detected": detected_label(mismatch),
+                    "Confidence": f"{mismatch['confidence']:.0%}"
+                }
+                for mismatch in mismatches
+            ])
+        else:
+            st.success("No language mismatches found")
+
+def show_corpus_export():
+    """Export the local corpus for downstream training jobs"""
+    st.subheader("📦 Corpus Export")
+    
+    col1, col2 = st.columns(2)
+    
+    with col1:
+        export_format = st.selectbox("Format", ["Parquet", "JSONL", "CSV", "Media Shards"], key="corpus_export_format")
+    
+    with col2:
+        if export_format == "Parquet":
+            st.caption("Partitioned by language / category / media type")
+            compression = None
+        elif export_format == "Media Shards":
+            st.caption("WebDataset-style tar shards of media files with metadata")
+            compression = None
+        else:
+            compression = st.selectbox("Compression", ["none", "gzip", "zstd"], key="corpus_export_compression")
+            compression = None if compression == "none" else compression
+    
+    public_only = st.checkbox("Public contributions only", value=True, key="corpus_export_public")
+    incremental = False
+    if export_format in ("Parquet", "JSONL"):
+        incremental = st.checkbox("Incremental (only changes since the last run)", key="corpus_export_incremental")
+    
+    if st.button("Run Export", key="corpus_export_run"):
+        name = f"corpus-{datetime.now().strftime('%Y%m%d-%H%M%S')}"
+        records = iter_local_records(public_only=public_only)
+        
+        with st.spinner("Exporting corpus..."):
+            try:
+                if incremental:
+                    # One watermarked target per format and visibility, merged in place
+                    target = f"corpus-{export_format.lower()}{'-public' if public_only else ''}"
+                    result = run_incremental_export(target, EXPORT_DIR / target, export_format.lower(),
+                                                    public_only=public_only)
+                elif export_format == "Parquet":
+                    result = export_parquet(records, EXPORT_DIR / name)
+                elif export_format == "Media Shards":
+                    result = write_shards(EXPORT_DIR / name, public_only=public_only)
+                    result['records'] = result['samples']
+                else:
+                    path = EXPORT_DIR / export_filename(name, export_format.lower(), compression)
+                    result = stream_export(records, path, export_format.lower(), compression)
+            except (ValueError, ImportError, OSError) as e:
+                st.error(f"Export failed: {e}")
+                return
+        
+        st.success(f"Exported {result['records']} records in {result['seconds']:.1f}s")
+        st.code(result['path'])
+
+def show_duplicate_scan():
+    """Find clusters of near-duplicate contributions across the local corpus"""
+    st.subheader("🧬 Near-duplicate Texts")
+    st.caption("Indexes every text contribution with MinHash signatures, then groups copies with trivial edits")
+    
+    if st.button("Scan Corpus", key="dedup_text_run"):
+        with st.spinner("Indexing and comparing texts..."):
+            result = run_dedup_job()
+        
+        st.success(f"Indexed {result['indexed']} texts; {result['duplicates']} near-duplicates "
+                   f"in {len(result['clusters'])} clusters")
+        for cluster in result['clusters'][:50]:
+            st.write(", ".join(cluster))
+    
+    st.subheader("🖼️ Near-duplicate Images")
+    st.caption("Groups resized and re-compressed copies of the same photo using perceptual hashes")
+    
+    if st.button("Scan Images", key="dedup_image_run"):
+        with st.spinner("Hashing and comparing images..."):
+            result = run_image_dedup_job()
+        
+        st.success(f"Hashed {result['indexed']} images; {result['duplicates']} near-duplicates "
+                   f"in {len(result['clusters'])} clusters")
+        for cluster in result['clusters'][:50]:
+            st.write(", ".join(cluster))
+
+def show_api_metrics():
+    """Backend API latency, errors and traffic recorded by this app process"""
+    st.subheader("⏱️ API Metrics")
+    
+    if not metrics_registry.enabled:
+        st.info("Metrics are disabled. Set METRICS_ENABLED=true to record API calls.")
+        return
+    
+    server = start_metrics_server()
+    if server:
+        host, port = server.server_address[:2]
+        st.caption(f"Prometheus endpoint: http://{host}:{port}/metrics")
+    else:
+        st.caption("Prometheus endpoint off. Set METRICS_PORT (e.g. 9464) to serve /metrics.")
+    
+    snapshot = metrics_registry.snapshot()
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Requests", sum(series['count'] for series in snapshot['series'].values()))
+    with col2:
+        st.metric("In Flight", snapshot['in_flight'], help=f"Peak: {snapshot['max_in_flight']}")
+    with col3:
+        st.metric("Retries", sum(snapshot['retries'].values()))
+    with col4:
+        st.metric("Since", datetime.fromtimestamp(snapshot['started_at']).strftime("%H:%M:%S"))
+    
+    rows = endpoint_summary(snapshot)
+    if rows:
+        st.dataframe([
+            {
+                "Endpoint": f"{row['method']} {row['endpoint']}",
+                "Requests": row['requests'],
+                "Errors": row['errors'],
+                "Total (s)": round(row['total_seconds'], 2),
+                "Mean (ms)": round(row['mean_ms'], 1),
+                "p50 (ms)": round(row['p50_ms'], 1),
+                "p95 (ms)": round(row['p95_ms'], 1),
+                "Sent (KB)": round(row['bytes_sent'] / 1024, 1),
+                "Received (KB)": round(row['bytes_received'] / 1024, 1),
+                "Statuses": ", ".join(f"{status}: {count}" for status, count in sorted(row['statuses'].items()))
+            }
+            for row in rows
+        ])
+    else:
+        st.info("No API requests recorded yet")
+    
+    col1, col2 = st.columns(2)
+    with col1:
+        st.download_button("Download Prometheus Text", render_prometheus(snapshot),
+                           file_name="metrics.txt", mime="text/plain")
+    with col2:
+        if st.button("Reset Metrics", key="metrics_reset"):
+            metrics_registry.reset()
+            st.rerun()
+
+def show_page_profiles():
+    """Per-page rerun latency from the profiling traces"""
+    st.subheader("🐢 Page Renders")
+    
+    if not PROFILING_ENABLED:
+        st.info("Profiling is disabled. Set PROFILING_ENABLED=true to trace page reruns.")
+        return
+    
+    summary = summarize_traces(load_traces())
+    if not summary:
+        st.info("No page reruns traced today")
+        return
+    
+    st.caption(f"Traces and slow-rerun profiles are written to {TRACES_DIR}")
+    st.dataframe([
+        {
+            "Page": row['page'],
+            "Reruns": row['reruns'],
+            "p50 (ms)": round(row['p50_ms'], 1),
+            "p95 (ms)": round(row['p95_ms'], 1),
+            "Max (ms)": round(row['max_ms'], 1),
+            "Profiles": row['profiles'],
+            "Slowest Spans": ", ".join(f"{name} ({ms:.0f} ms)" for name, ms in row['top_spans'])
+        }
+        for row in summary
+    ])
\ No newline at end of file
@@ -2,18 +2,47 @@ import streamlit as st
 import json
 import hashlib
 from datetime import datetime
+import time
+from functools import lru_cache
 from pathlib import Path
 import os
-import bcrypt
-from config import API_BASE_URL, ENVIRONMENT, DEBUG
+from config import API_BASE_URL, ENVIRONMENT, DEBUG, BROWSE_CACHE_TTL_SECONDS
 from utils.api_client import APIClient
+from utils.metrics import start_metrics_server
+from utils.profiling import trace_rerun, span
 from utils.categories import get_categories
 from utils.file_upload import upload_file_chunked, validate_file_size
+from utils.contribution_summary import get_contribution_summary
 from utils.category_mapper import get_category_id_from_name, get_language_enum
-from utils.geospatial import search_nearby_records, search_in_bbox
 from utils.permissions import has_permission, is_admin, can_export_data
-from utils.data_export import export_user_data, format_export_data
-from admin_panel import show_admin_panel
+from utils.offline_mode import offline_user_id, save_offline_contribution
+from utils.offline_sync import get_sync_engine
+from utils.database import db
+from utils.session_store import get_session_store
+
+# Modules that pull in numpy, Pillow, bcrypt or the admin panel are imported
+# inside the pages that use them, so a new process paints the login page sooner
+
+ASSETS_DIR = Path(__file__).parent / "assets"
+
+# Query parameter holding the opaque id of this browser's login session
+SESSION_PARAM = "sid"
+
+@lru_cache(maxsize=None)
+def load_stylesheet(name):
+    """A stylesheet from assets/ as a <style> block, read once per process"""
+    return f"<style>\n{(ASSETS_DIR / name).read_text(encoding='utf-8')}</style>"
+
+def fragment(func=None, **kwargs):
+    """st.fragment, so a widget inside func reruns only func
+    
+    Falls back to st.experimental_fragment (Streamlit 1.33-1.36), then to a
+    plain function that reruns the whole page as before.
+    """
+    decorator = getattr(st, 'fragment', None) or getattr(st, 'experimental_fragment', None)
+    if decorator is None:
+        return func if func is not None else (lambda f: f)
+    return decorator(func, **kwargs) if func is not None else decorator(**kwargs)
 
 # Page config
 st.set_page_config(
@@ -24,136 +53,7 @@ st.set_page_config(
 )
 
 # Professional Color Scheme CSS
-st.markdown("""
-<style>
-    .stApp {
-        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%);
-        color: #2c3e50;
-    }
-    
-
-    
-    /* Card-style category buttons */
-    .category-card {
-        background: white;
-        border-radius: 16px;
-        padding: 24px 16px;
-        margin: 12px;
-        text-align: center;
-        box-shadow: 0 4px 12px rgba(0, 0, 0, 0.1);
-        border: 1px solid #e9ecef;
-        transition: all 0.3s ease;
-        cursor: pointer;
-        min-height: 180px;
-        display: flex;
-        flex-direction: column;
-        justify-content: center;
-        align-items: center;
-    }
-    
-    .category-card:hover {
-        transform: translateY(-4px);
-        box-shadow: 0 8px 25px rgba(0, 0, 0, 0.15);
-        border-color: #3498db;
-    }
-    
-    .category-icon {
-        font-size: 48px;
-        margin-bottom: 12px;
-        display: block;
-    }
-    
-    .category-title {
-        font-size: 18px;
-        font-weight: 600;
-        color: #2c3e50;
-        margin-bottom: 8px;
-    }
-    
-    .category-description {
-        font-size: 12px;
-        color: #6c757d;
-        line-height: 1.4;
-        text-align: center;
-    }
-
-    
-    /* Category buttons - square styling */
-    .category-button-container .stButton > button {
-        width: 100% !important;
-        height: 180px !important;
-        background: linear-gradient(135deg, #f8f9fa 0%, #e9ecef 100%) !important;
-        border: 2px solid #dee2e6 !important;
-        border-radius: 16px !important;
-        box-shadow: 0 4px 12px rgba(0,0,0,0.1) !important;
-        transition: all 0.3s ease !important;
-        display: flex !important;
-        flex-direction: column !important;
-        justify-content: center !important;
-        align-items: center !important;
-        text-align: center !important;
-        font-size: 14px !important;
-        color: #2c3e50 !important;
-        margin-bottom: 15px !important;
-        white-space: pre-line !important;
-        padding: 20px !important;
-    }
-    
-    .category-button-container .stButton > button:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 6px 20px rgba(0,0,0,0.15) !important;
-        border-color: #007bff !important;
-        background: linear-gradient(135deg, #e9ecef 0%, #f8f9fa 100%) !important;
-    }
-    
-    /* Regular buttons - normal styling */
-    .stButton > button:not(.category-button-container .stButton > button) {
-        background: linear-gradient(135deg, #3498db 0%, #2980b9 100%);
-        color: white;
-        border: none;
-        border-radius: 8px;
-        padding: 8px 16px;
-        font-weight: 600;
-        font-size: 14px;
-        transition: all 0.3s ease;
-        box-shadow: 0 2px 8px rgba(52, 152, 219, 0.3);
-    }
-    
-    .stButton > button:not(.category-button-container .stButton > button):hover {
-        background: linear-gradient(135deg, #2980b9 0%, #3498db 100%);
-        transform: translateY(-1px);
-        box-shadow: 0 4px 12px rgba(52, 152, 219, 0.4);
-    }
-    
-    .header-container {
-        background: linear-gradient(135deg, #d35400 0%, #e67e22 100%);
-        padding: 40px;
-        border-radius: 20px;
-        margin-bottom: 40px;
-        text-align: center;
-        color: white;
-        box-shadow: 0 8px 25px rgba(44, 62, 80, 0.3);
-    }
-    
-    .stSelectbox > div > div {
-        background: white;
-        border-radius: 12px;
-        border: 2px solid #e9ecef;
-    }
-    
-    .stTextInput > div > div > input {
-        background: white;
-        border-radius: 12px;
-        border: 2px solid #e9ecef;
-    }
-    
-    .stTextArea > div > div > textarea {
-        background: white;
-        border-radius: 12px;
-        border: 2px solid #e9ecef;
-    }
-</style>
-""", unsafe_allow_html=True)
+st.markdown(load_stylesheet("app.css"), unsafe_allow_html=True)
 
 # Swecha-compatible categories (21 categories)
 CATEGORIES = {
@@ -182,6 +82,9 @@ CATEGORIES = {
 
 MEDIA_TYPES = ["Text", "Image", "Audio", "Video"]
 
+# Location search lists this many nearest results; the map shows all of them
+NEARBY_LIST_LIMIT = 50
+
 # Dynamic categories from API
 def get_current_categories():
     """Get categories with caching"""
@@ -189,72 +92,140 @@ def get_current_categories():
         st.session_state.categories = get_categories()
     return st.session_state.categories
 
-# Local storage functions for offline mode
-def load_users():
-    users_file = Path("data/users.json")
-    if users_file.exists():
-        with open(users_file, 'r') as f:
-            return json.load(f)
-    return {}
-
-def save_users(users):
-    Path("data").mkdir(exist_ok=True)
-    with open("data/users.json", 'w') as f:
-        json.dump(users, f, indent=2)
-
-def load_contributions():
-    contrib_file = Path("data/contributions.json")
-    if contrib_file.exists():
-        with open(contrib_file, 'r') as f:
-            return json.load(f)
-    return []
-
-def save_contributions(contributions):
-    Path("data").mkdir(exist_ok=True)
-    with open("data/contributions.json", 'w') as f:
-        json.dump(contributions, f, indent=2)
-
 def hash_password(password):
     """Hash password using bcrypt"""
+    import bcrypt
     return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
 
 def verify_password(password, hashed):
     """Verify password against hash"""
+    import bcrypt
     return bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
 
+def get_session_id():
+    """Opaque session id from the page URL, which survives reloads and restarts"""
+    if hasattr(st, 'query_params'):
+        return st.query_params.get(SESSION_PARAM)
+    values = st.experimental_get_query_params().get(SESSION_PARAM)
+    return values[0] if values else None
+
+def set_session_id(sid):
+    """Put the session id in the page URL, or remove it when sid is None"""
+    if hasattr(st, 'query_params'):
+        if sid:
+            st.query_params[SESSION_PARAM] = sid
+        elif SESSION_PARAM in st.query_params:
+            del st.query_params[SESSION_PARAM]
+    else:
+        params = {key: values for key, values in st.experimental_get_query_params().items() if key != SESSION_PARAM}
+        if sid:
+            params[SESSION_PARAM] = sid
+        st.experimental_set_query_params(**params)
+
 def restore_user_session():
-    """Restore user session from persistent storage if available"""
-    session_file = Path("data/current_session.json")
-    if session_file.exists():
-        try:
-            with open(session_file, 'r') as f:
-                session_data = json.load(f)
-            if session_data.get('user_id'):
-                st.session_state.user_id = session_data['user_id']
-                st.session_state.user_phone = session_data.get('user_phone')
-                st.session_state.user_name = session_data.get('user_name')
-                st.session_state.page = session_data.get('page', 'Home')
-        except:
-            pass
+    """Restore this browser's login from the session store, if its session id is still valid
+    
+    The id is rotated on every restore, so a URL copied or kept in history
+    stops working as soon as its owner reloads the page.
+    """
+    sid = get_session_id()
+    if not sid:
+        return
+    store = get_session_store()
+    sid, session_data = store.rotate(sid)
+    if not session_data or not session_data.get('user_id'):
+        if sid:
+            store.delete(sid)
+        set_session_id(None)
+        return
+    set_session_id(sid)
+    st.session_state.session_id = sid
+    st.session_state.user_id = session_data['user_id']
+    st.session_state.user_phone = session_data.get('user_phone')
+    st.session_state.user_name = session_data.get('user_name')
+    st.session_state.page = session_data.get('page', 'Home')
+    if session_data.get('access_token'):
+        st.session_state.api_client.set_token(session_data['access_token'])
 
 def save_user_session():
-    """Save current user session to persistent storage"""
+    """Save the current login to the session store under a fresh session id
+    
+    Every save rotates the id, so a URL copied from an open tab stops working
+    at the owner's next navigation. If someone used a leaked URL first, the
+    owner's next save fails and they are logged out.
+    """
     if st.session_state.user_id:
         session_data = {
             'user_id': st.session_state.user_id,
             'user_phone': st.session_state.user_phone,
             'user_name': st.session_state.user_name,
-            'page': st.session_state.page
+            'page': st.session_state.page,
+            'access_token': st.session_state.api_client.token
         }
-        Path("data").mkdir(exist_ok=True)
-        with open("data/current_session.json", 'w') as f:
-            json.dump(session_data, f, indent=2)
+        store = get_session_store()
+        sid = st.session_state.get('session_id')
+        if sid:
+            sid, _ = store.rotate(sid, session_data)
+            if sid:
+                st.session_state.session_id = sid
+                set_session_id(sid)
+            else:
+                # Expired, past SESSION_MAX_AGE_HOURS or taken over: end the login rather than start a fresh session
+                st.session_state.api_client.logout()
+                st.session_state.pop('session_id', None)
+                set_session_id(None)
+                st.session_state.user_id = None
+                st.session_state.user_name = None
+                st.session_state.user_phone = None
+                st.session_state.page = "Login"
+        else:
+            st.session_state.session_id = store.create(session_data)
+            set_session_id(st.session_state.session_id)
 
 def clear_user_session():
-    """Clear saved user session"""
-    session_file = Path("data/current_session.json")
-    if session_file.exists():
-        session_file.unlink()
+    """Delete this browser's saved session"""
+    sid = st.session_state.pop('session_id', None)
+    if sid:
+        get_session_store().delete(sid)
+    set_session_id(None)
+
+def get_current_sync_engine():
+    """Get the background sync engine for the logged-in user"""
+    phone = st.session_state.get('user_phone')
+    return get_sync_engine(
+        st.session_state.api_client,
+        st.session_state.user_id,
+        offline_user_id(phone) if phone else None
+    )
+
+def get_current_export_tracker():
+    """Get the background export task tracker for the logged-in user"""
+    from utils.export_tasks import get_export_tracker
+    return get_export_tracker(st.session_state.api_client, st.session_state.user_id)
+
+def backend_unreachable(result=None):
+    """Check whether a failure was caused by the backend being unreachable"""
+    if result is None:
+        result = st.session_state.api_client.health_check()
+    return 'error' in result and result.get('status_code') is None
+
+def save_local_copy(record_id, record_data, content_data, media_metadata):
+    """Mirror an uploaded record and its media metadata into the local database"""
+    db.upsert_records([{
+        'uid': record_id,
+        'user_id': st.session_state.user_id,
+        'category_id': record_data['category_id'],
+        'media_type': record_data['media_type'].lower(),
+        'title': record_data['title'],
+        'description': record_data['description'],
+        'language': record_data['language'],
+        'file_size': len(content_data.getvalue()),
+        'release_rights': 'creator' if record_data['public'] else 'family_or_friend',
+        'latitude': record_data['latitude'],
+        'longitude': record_data['longitude']
+    }])
+    if media_metadata:
+        db.update_media_metadata([(record_id, media_metadata)])
 
 def format_file_size(size_bytes):
     """Format file size with appropriate unit (B, KB, MB, GB, TB)"""
@@ -278,19 +249,18 @@ def format_file_size(size_bytes):
 if 'api_client' not in st.session_state:
     st.session_state.api_client = APIClient(API_BASE_URL)
 
-# Initialize session state with persistent data
+# Serve /metrics for Prometheus when METRICS_PORT is set; attempted once per process
+start_metrics_server()
+
+# Initialize session state; offline contributions are read on first use (utils.offline_mode)
 if 'user_id' not in st.session_state:
     st.session_state.user_id = None
 if 'user_name' not in st.session_state:
     st.session_state.user_name = None
 if 'user_phone' not in st.session_state:
     st.session_state.user_phone = None
-if 'contributions' not in st.session_state:
-    st.session_state.contributions = load_contributions()
 if 'offline_queue' not in st.session_state:
     st.session_state.offline_queue = []
-if 'registered_users' not in st.session_state:
-    st.session_state.registered_users = load_users()
 if 'page_history' not in st.session_state:
     st.session_state.page_history = []
 if 'otp_sent' not in st.session_state:
@@ -298,8 +268,10 @@ if 'otp_sent' not in st.session_state:
 if 'pending_phone' not in st.session_state:
     st.session_state.pending_phone = None
 
-# Restore user session on app restart
-restore_user_session()
+# Restore user session on app restart, once per browser session
+if 'session_restored' not in st.session_state:
+    restore_user_session()
+    st.session_state.session_restored = True
 
 if 'page' not in st.session_state:
     st.session_state.page = "Login" if not st.session_state.user_id else "Home"
@@ -369,23 +341,33 @@ def main():
     
     page = st.session_state.page
     
+    # Keep replaying offline contributions in the background while logged in
+    if st.session_state.user_id:
+        sync_engine = get_current_sync_engine()
+        sync_engine.start()
+        if st.session_state.offline_queue:
+            sync_engine.enqueue(st.session_state.offline_queue)
+            st.session_state.offline_queue = []
+    
     st.divider()
     
     # Route to pages
-    if page == "Home":
-        show_home()
-    elif page == "Login":
-        show_login()
-    elif page == "Contribute":
-        show_contribute()
-    elif page == "Dashboard":
-        show_dashboard()
-    elif page == "Browse":
-        show_browse()
-    elif page == "About":
-        show_about()
-    elif page == "Admin":
-        show_admin_panel()
+    with trace_rerun(page):
+        if page == "Home":
+            show_home()
+        elif page == "Login":
+            show_login()
+        elif page == "Contribute":
+            show_contribute()
+        elif page == "Dashboard":
+            show_dashboard()
+        elif page == "Browse":
+            show_browse()
+        elif page == "About":
+            show_about()
+        elif page == "Admin":
+            from admin_panel import show_admin_panel
+            show_admin_panel()
 
 def show_home():
     if st.session_state.user_id:
@@ -518,6 +500,7 @@ def show_login():
                                 st.session_state.page = "Home"
                                 st.session_state.otp_sent = False
                                 st.session_state.pending_phone = None
+                                save_user_session()
                                 st.success("Logged in successfully!")
                                 st.balloons()
                                 st.rerun()
@@ -575,6 +558,7 @@ def show_login():
                                 st.session_state.page = "Home"
                                 st.session_state.otp_sent = False
                                 st.session_state.pending_phone = None
+                                save_user_session()
                                 st.success("Registered successfully!")
                                 st.balloons()
                                 st.rerun()
@@ -596,6 +580,12 @@ def show_contribute():
         st.warning("Please login first!")
         return
     
+    from utils.dedup import find_near_duplicates, find_similar_images, index_image
+    from utils.text_processing import normalize_text, truncate_text, ingest_text
+    from utils.language_id import check_language, detected_label
+    from utils.file_handler import perceptual_hashes
+    from utils.media_metadata import extract_metadata
+    
     st.header("Contribute Content")
     
     # Step 1: Category Selection
@@ -615,14 +605,32 @@ def show_contribute():
     content_data = None
     metadata = {}
     
+    near_duplicates = []
+    image_hashes = None
     if media_type == "Text":
         content_data = st.text_area("Enter your text content", height=200)
+        if content_data:
+            # Stored NFC-normalized so identical text always has identical code points
+            content_data = normalize_text(content_data)
+            near_duplicates = find_near_duplicates(content_data)
+        if near_duplicates:
+            st.warning(f"⚠️ This text is {near_duplicates[0]['similarity']:.0%} similar to an existing contribution.")
+            allow_duplicate = st.checkbox("This is a different text - submit anyway")
         
     elif media_type == "Image":
         uploaded_file = st.file_uploader("Upload Image", type=['png', 'jpg', 'jpeg'])
         if uploaded_file:
             content_data = uploaded_file
             st.image(uploaded_file, caption="Preview", width=300)
+            try:
+                image_hashes = perceptual_hashes(uploaded_file)
+                near_duplicates = find_similar_images(*image_hashes)
+            except (OSError, ValueError):
+                # Unreadable images are rejected later by the upload itself
+                pass
+            if near_duplicates:
+                st.warning("⚠️ This image looks like a copy of an existing contribution.")
+                allow_duplicate = st.checkbox("This is a different image - submit anyway")
             
     elif media_type == "Audio":
         uploaded_file = st.file_uploader("Upload Audio", type=['mp3', 'wav', 'ogg'])
@@ -646,6 +654,11 @@ def show_contribute():
         description = st.text_area("Description (optional)", height=100)
         public_consent = st.checkbox("Make this contribution public")
     
+    language_mismatch = check_language(content_data, language) if media_type == "Text" and content_data else None
+    if language_mismatch:
+        st.warning(f"⚠️ This text looks like {detected_label(language_mismatch)}, not {language}.")
+        allow_language = st.checkbox(f"The text is in {language} - submit anyway")
+    
     # Step 4.5: Location (optional)
     st.subheader("🗺️ Location (Optional)")
     add_location = st.checkbox("Add location to this contribution")
@@ -664,6 +677,13 @@ def show_contribute():
     
     # Step 5: Submit
     if st.button("Submit Contribution", type="primary"):
+        if near_duplicates and not allow_duplicate:
+            st.error("Please confirm this is not a duplicate before submitting.")
+            return
+        if language_mismatch and not allow_language:
+            st.error("Please choose the text's language or confirm your selection before submitting.")
+            return
+        
         if content_data:
             # Validate file size for non-text content
             if media_type != "Text" and not validate_file_size(content_data, media_type):
@@ -673,6 +693,18 @@ def show_contribute():
             progress_bar = st.progress(0)
             status_text = st.empty()
             
+            # Kept for the offline fallback when the server cannot be reached
+            offline_record = {
+                "category": category,
+                "media_type": media_type,
+                "title": title or f"{media_type} contribution",
+                "description": description,
+                "language": language,
+                "public": public_consent,
+                "latitude": latitude,
+                "longitude": longitude
+            }
+            
             try:
                 if media_type == "Text":
                     # For text, use description field for content
@@ -682,7 +714,7 @@ def show_contribute():
                     
                     api_record = {
                         "title": title or f"{media_type} contribution",
-                        "description": text_description[:1000] if text_description else "",
+                        "description": truncate_text(text_description, 1000) if text_description else "",
                         "category_id": category_id,
                         "user_id": st.session_state.user_id,
                         "media_type": media_type.lower(),
@@ -703,6 +735,7 @@ def show_contribute():
                     result = st.session_state.api_client.create_record(api_record)
                     
                     if 'error' not in result:
+                        ingest_text(result.get('uid') or result.get('id'), content_data)
                         progress_bar.progress(100)
                         status_text.text("Success!")
                         st.success("Text contribution submitted successfully!")
@@ -711,6 +744,9 @@ def show_contribute():
                         # Clear form
                         if 'selected_category' in st.session_state:
                             del st.session_state.selected_category
+                    elif backend_unreachable(result):
+                        save_offline_contribution(offline_record, content_data)
+                        st.info("📴 Server unreachable. Saved offline; it will sync automatically.")
                     else:
                         st.error(f"Failed to submit: {result['error']}")
                         
@@ -730,9 +766,14 @@ def show_contribute():
                         "longitude": longitude
                     }
                     
+                    # Header-only parse, so this costs the same for a 5 s or a 50 min recording
+                    media_metadata = extract_metadata(content_data)
                     record_id = upload_file_chunked(content_data, record_data)
                     
                     if record_id:
+                        if media_type == "Image" and image_hashes:
+                            index_image(record_id, *image_hashes)
+                        save_local_copy(record_id, record_data, content_data, media_metadata)
                         progress_bar.progress(100)
                         status_text.text("Success!")
                         st.success("File contribution submitted successfully!")
@@ -741,6 +782,9 @@ def show_contribute():
                         # Clear form
                         if 'selected_category' in st.session_state:
                             del st.session_state.selected_category
+                    elif backend_unreachable():
+                        save_offline_contribution(offline_record, content_data)
+                        st.info("📴 Server unreachable. Saved offline; it will sync automatically.")
                     else:
                         st.error("Failed to upload file. Please try again.")
                         
@@ -760,26 +804,36 @@ def show_dashboard():
     
     st.header("Your Dashboard")
     
-    # Fetch user contributions from API
+    show_sync_status()
+    
+    # Pre-aggregated per user; cached until the TTL passes or the user contributes
     with st.spinner("Loading your contributions..."):
-        contributions_data = st.session_state.api_client.get_user_contributions(st.session_state.user_id)
+        summary = get_contribution_summary(st.session_state.api_client, st.session_state.user_id)
     
-    if 'error' in contributions_data:
+    if 'error' in summary:
         st.error("Failed to load contributions. Please try again.")
         return
     
-    total_contributions = contributions_data.get('total_contributions', 0)
-    
-    if total_contributions == 0:
+    if summary['total_contributions'] == 0:
         st.info("No contributions yet. Start contributing to see your stats!")
         return
     
+    show_dashboard_stats(summary)
+    show_media_chart(summary['media_counts'])
+    
+    # Data Export Section
+    if can_export_data():
+        show_export_panel()
+    
+    show_recent_contributions(summary['recent'])
+
+def show_dashboard_stats(summary):
+    """Stat cards for the dashboard"""
+    total_contributions = summary['total_contributions']
+    
     # Stats with colorful cards
     col1, col2, col3, col4 = st.columns(4)
     
-    # Get media type counts
-    media_counts = contributions_data.get('contributions_by_media_type', {})
-    
     with col1:
         st.markdown(f"""
         <div style="background: linear-gradient(135deg, #3498db 0%, #2980b9 100%); padding: 25px; border-radius: 16px; text-align: center; box-shadow: 0 6px 20px rgba(52, 152, 219, 0.3); border: 1px solid #e9ecef;">
@@ -791,9 +845,13 @@ def show_dashboard():
     
     with col2:
         # Calculate total duration for audio/video
-        audio_duration = contributions_data.get('audio_duration', 0)
-        video_duration = contributions_data.get('video_duration', 0)
-        total_duration = audio_duration + video_duration
+        total_duration = summary['audio_duration'] + summary['video_duration']
+        if not total_duration:
+            # The API does not measure media yet; use durations extracted locally
+            phone = st.session_state.get('user_phone')
+            owner_ids = {st.session_state.user_id, offline_user_id(phone) if phone else None} - {None}
+            local_totals = db.media_totals(owner_ids)
+            total_duration = int(sum(local_totals.get(t, {}).get('duration', 0) for t in ('audio', 'video')))
         duration_text = f"{total_duration//60}m {total_duration%60}s" if total_duration > 0 else "0s"
         
         st.markdown(f"""
@@ -805,14 +863,7 @@ def show_dashboard():
         """, unsafe_allow_html=True)
     
     with col3:
-        # Count unique categories from contributions
-        all_contributions = []
-        for media_type in ['text_contributions', 'audio_contributions', 'video_contributions', 'image_contributions', 'document_contributions']:
-            contribs = contributions_data.get(media_type, [])
-            if contribs:
-                all_contributions.extend(contribs)
-        
-        unique_categories = len(set(c.get('category_id', '') for c in all_contributions if c.get('category_id')))
+        unique_categories = summary['unique_categories']
         
         st.markdown(f"""
         <div style="background: linear-gradient(135deg, #e74c3c 0%, #c0392b 100%); padding: 25px; border-radius: 16px; text-align: center; box-shadow: 0 6px 20px rgba(231, 76, 60, 0.3); border: 1px solid #e9ecef;">
@@ -823,8 +874,7 @@ def show_dashboard():
         """, unsafe_allow_html=True)
     
     with col4:
-        # Count public contributions
-        public_count = sum(1 for c in all_contributions if c.get('release_rights') == 'public')
+        public_count = summary['public_count']
         
         st.markdown(f"""
         <div style="background: linear-gradient(135deg, #f39c12 0%, #e67e22 100%); padding: 25px; border-radius: 16px; text-align: center; box-shadow: 0 6px 20px rgba(243, 156, 18, 0.3); border: 1px solid #e9ecef;">
@@ -833,8 +883,9 @@ def show_dashboard():
             <p style="color: white; margin: 0; font-size: 14px;">Public Contributions</p>
         </div>
         """, unsafe_allow_html=True)
-    
-    # Media type breakdown
+
+def show_media_chart(media_counts):
+    """Bar chart of contributions per media type"""
     st.subheader("Contributions by Media Type")
     if media_counts:
         chart_data = {
@@ -848,34 +899,44 @@ def show_dashboard():
         chart_data = {k: v for k, v in chart_data.items() if v > 0}
         if chart_data:
             st.bar_chart(chart_data)
+
+@fragment
+def show_export_panel():
+    """Export controls and task progress; using them reruns only this panel"""
+    from utils.data_export import export_user_data
     
-    # Data Export Section
-    if can_export_data():
-        st.subheader("📥 Data Export")
-        
-        col1, col2, col3 = st.columns(3)
-        
-        with col1:
-            export_format = st.selectbox("Export Format", ["JSON", "CSV"])
-        
-        with col2:
-            if st.button("Export My Data", type="secondary"):
-                with st.spinner("Preparing export..."):
-                    export_result = export_user_data(export_format.lower())
-                    
-                    if 'error' not in export_result:
-                        st.success("Export initiated! Check back in a few minutes.")
-                        if 'task_id' in export_result:
-                            st.info(f"Task ID: {export_result['task_id']}")
+    st.subheader("📥 Data Export")
+    
+    col1, col2, col3 = st.columns(3)
+    
+    with col1:
+        export_format = st.selectbox("Export Format", ["JSON", "CSV"])
+    
+    with col2:
+        if st.button("Export My Data", type="secondary"):
+            with st.spinner("Preparing export..."):
+                export_result = export_user_data(export_format.lower())
+    
+                if 'error' not in export_result:
+                    if 'task_id' in export_result:
+                        try:
+                            get_current_export_tracker().track(export_result['task_id'], export_format.lower())
+                            st.success("Export initiated! It will appear below once it is ready.")
+                        except ValueError as e:
+                            st.error(f"Export failed: {e}")
                     else:
-                        st.error(f"Export failed: {export_result['error']}")
-        
-        with col3:
-            st.info("🔒 Available for authorized users")
+                        st.success("Export initiated!")
+                else:
+                    st.error(f"Export failed: {export_result['error']}")
     
-    # Recent contributions
+    with col3:
+        st.info("🔒 Available for authorized users")
+    
+    show_export_tasks()
+
+def show_recent_contributions(recent_contributions):
+    """Expandable list of the latest contributions"""
     st.subheader("Recent Contributions")
-    recent_contributions = all_contributions[:5] if all_contributions else []
     
     for contrib in recent_contributions:
         with st.expander(f"{contrib.get('title', 'Untitled')} ({contrib.get('media_type', 'Unknown').title()})"):
@@ -895,6 +956,79 @@ def show_dashboard():
                 if contrib.get('size'):
                     st.write(f"**Size:** {format_file_size(contrib['size'])}")
 
+def show_sync_status():
+    """Offline sync queue depth and throughput"""
+    stats = get_current_sync_engine().stats()
+    if not (stats['queue_depth'] or stats['synced'] or stats['failed']):
+        return
+    
+    st.subheader("🔄 Offline Sync")
+    col1, col2, col3, col4 = st.columns(4)
+    with col1:
+        st.metric("Queued", stats['queue_depth'])
+    with col2:
+        st.metric("Synced", stats['synced'] + stats['duplicates'])
+    with col3:
+        st.metric("Failed", stats['failed'])
+    with col4:
+        st.metric("Throughput", f"{stats['throughput_per_min']}/min")
+    if stats['last_sync']:
+        st.caption(f"Last sync: {stats['last_sync'][:19].replace('T', ' ')}")
+
+def show_export_tasks():
+    """Progress of background exports, with a download button once each is ready"""
+    from utils.export_tasks import READY, FAILED
+    tasks = get_current_export_tracker().tasks()
+    if not tasks:
+        return
+    
+    for task in tasks[:5]:
+        created = task.get('created_at', '')[:16].replace('T', ' ')
+        col1, col2 = st.columns([3, 1])
+        with col1:
+            st.write(f"**{task.get('format', 'json').upper()} export** · {created}")
+            if task['status'] == READY:
+                st.caption(f"Ready · {format_file_size(task.get('bytes', 0))}")
+            elif task['status'] == FAILED:
+                st.caption(f"Failed: {task.get('error', 'unknown error')}")
+            elif task.get('total'):
+                st.progress(min(task.get('bytes', 0) / task['total'], 1.0),
+                            text=f"Downloading {format_file_size(task.get('bytes', 0))} of {format_file_size(task['total'])}")
+            else:
+                st.caption(task.get('message') or "Waiting for the export to finish...")
+            if task['status'] != FAILED and task.get('error'):
+                st.caption(f"Connection problem, retrying: {task['error']}")
+        with col2:
+            path = Path(task.get('path', ''))
+            if task['status'] == READY and path.is_file():
+                with open(path, 'rb') as f:
+                    st.download_button("⬇️ Download", f, file_name=path.name, key=f"export_{task['task_id']}")
+    
+    if any(task['status'] not in (READY, FAILED) for task in tasks[:5]):
+        # Clicking reruns the export panel fragment, which re-reads the task states
+        st.button("🔄 Refresh", key="export_tasks_refresh")
+
+@fragment
+def show_cluster_map(cluster_index, bbox, distance_km):
+    """Map of search results, drawn as clusters so large result sets stay light
+    
+    A fragment, so moving the detail slider redraws the map without
+    re-rendering the result list below it.
+    """
+    from utils.geospatial import zoom_for_radius
+    zoom = st.slider("Map detail", 0, 16, zoom_for_radius(distance_km),
+                     help="Higher values split clusters into individual contributions")
+    clusters = cluster_index.get_clusters(zoom, bbox)
+    
+    # Marker area grows with the number of contributions in a cluster
+    base_size = distance_km * 1000 / 50
+    map_data = [
+        {'latitude': c['latitude'], 'longitude': c['longitude'], 'size': base_size * c['count'] ** 0.5}
+        for c in clusters
+    ]
+    st.map(map_data, latitude='latitude', longitude='longitude', size='size', zoom=zoom_for_radius(distance_km))
+    st.caption(f"{len(clusters)} map markers for {sum(c['count'] for c in clusters)} contributions")
+
 def show_browse():
     st.header("Browse Public Contributions")
     
@@ -902,60 +1036,111 @@ def show_browse():
     search_mode = st.radio("Search Mode", ["All Records", "Location-based Search"], horizontal=True)
     
     if search_mode == "Location-based Search":
-        st.subheader("🗺️ Location-based Search")
-        
-        # Location input
-        col1, col2, col3 = st.columns(3)
-        with col1:
-            latitude = st.number_input("Latitude", value=17.385, format="%.6f")
-        with col2:
-            longitude = st.number_input("Longitude", value=78.4867, format="%.6f")
-        with col3:
-            distance = st.slider("Search Radius (km)", 1, 50, 10)
-        
-        # Additional filters
-        col1, col2 = st.columns(2)
-        with col1:
-            categories = get_current_categories()
-            filter_category = st.selectbox("Filter by Category", ["All"] + list(categories.keys()))
-        with col2:
-            filter_media = st.selectbox("Filter by Media Type", ["All"] + ["Text", "Audio", "Video", "Image", "Document"])
-        
-        if st.button("Search Nearby", type="primary"):
-            with st.spinner("Searching nearby contributions..."):
-                category_id = None if filter_category == "All" else get_category_id_from_name(filter_category)
-                media_type = None if filter_media == "All" else filter_media
-                
-                nearby_records = search_nearby_records(latitude, longitude, distance, category_id, media_type)
-                
-                if nearby_records:
-                    st.success(f"Found {len(nearby_records)} contributions within {distance}km")
-                    
-                    for record in nearby_records:
-                        with st.container():
-                            col1, col2 = st.columns([3, 1])
-                            with col1:
-                                st.write(f"**{record.get('title', 'Untitled')}**")
-                                media_type_display = record.get('media_type', 'unknown').title()
-                                language_display = record.get('language', 'unknown').title()
-                                st.write(f"Type: {media_type_display} | Language: {language_display}")
-                                if record.get('description'):
-                                    st.write(record['description'])
-                            with col2:
-                                # Show distance if available
-                                if 'distance' in record:
-                                    st.write(f"📍 {record['distance']:.1f}km")
-                                timestamp = record.get('created_at') or record.get('timestamp')
-                                if timestamp:
-                                    date_str = timestamp[:10] if len(timestamp) >= 10 else timestamp
-                                    st.write(f"📅 {date_str}")
-                            st.divider()
-                else:
-                    st.info("No contributions found in this area.")
+        show_location_search()
+        show_nearby_results()
         return
     
+    show_record_list()
+
+@fragment
+def show_location_search():
+    """Location and filter inputs; editing them reruns only this form"""
+    from utils.geospatial import search_nearby_records, radius_bbox, ClusterIndex
+    
+    st.subheader("🗺️ Location-based Search")
+    
+    # Location input
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        latitude = st.number_input("Latitude", value=17.385, format="%.6f")
+    with col2:
+        longitude = st.number_input("Longitude", value=78.4867, format="%.6f")
+    with col3:
+        distance = st.slider("Search Radius (km)", 1, 50, 10)
+    
+    # Additional filters
+    col1, col2 = st.columns(2)
+    with col1:
+        categories = get_current_categories()
+        filter_category = st.selectbox("Filter by Category", ["All"] + list(categories.keys()))
+    with col2:
+        filter_media = st.selectbox("Filter by Media Type", ["All"] + ["Text", "Audio", "Video", "Image", "Document"])
+    
+    if st.button("Search Nearby", type="primary"):
+        with st.spinner("Searching nearby contributions..."):
+            category_id = None if filter_category == "All" else get_category_id_from_name(filter_category)
+            media_type = None if filter_media == "All" else filter_media
+            
+            nearby_records = search_nearby_records(latitude, longitude, distance, category_id, media_type)
+            
+            # Kept in session state so map interactions don't repeat the search
+            st.session_state.nearby_search = {
+                'records': nearby_records,
+                'distance': distance,
+                'bbox': radius_bbox(latitude, longitude, distance),
+                'clusters': ClusterIndex(nearby_records) if nearby_records else None
+            }
+        # The results render outside this fragment, so redraw the page around them
+        st.rerun()
+
+def show_nearby_results():
+    """Map and list of the last location search, kept in session state"""
+    nearby_search = st.session_state.get('nearby_search')
+    if nearby_search:
+        nearby_records = nearby_search['records']
+        if nearby_records:
+            st.success(f"Found {len(nearby_records)} contributions within {nearby_search['distance']}km")
+            show_cluster_map(nearby_search['clusters'], nearby_search['bbox'], nearby_search['distance'])
+            
+            if len(nearby_records) > NEARBY_LIST_LIMIT:
+                st.caption(f"Showing the {NEARBY_LIST_LIMIT} nearest contributions")
+            
+            for record in nearby_records[:NEARBY_LIST_LIMIT]:
+                with st.container():
+                    col1, col2 = st.columns([3, 1])
+                    with col1:
+                        st.write(f"**{record.get('title', 'Untitled')}**")
+                        media_type_display = record.get('media_type', 'unknown').title()
+                        language_display = record.get('language', 'unknown').title()
+                        st.write(f"Type: {media_type_display} | Language: {language_display}")
+                        if record.get('description'):
+                            st.write(record['description'])
+                    with col2:
+                        # Show distance if available
+                        if 'distance' in record:
+                            st.write(f"📍 {record['distance']:.1f}km")
+                        timestamp = record.get('created_at') or record.get('timestamp')
+                        if timestamp:
+                            date_str = timestamp[:10] if len(timestamp) >= 10 else timestamp
+                            st.write(f"📅 {date_str}")
+                    st.divider()
+        else:
+            st.info("No contributions found in this area.")
+
+def get_public_records(filters):
+    """Records for the API-side filters, reused for BROWSE_CACHE_TTL_SECONDS
+    
+    Refining the text or language filter, or any other rerun of the record
+    list, then filters the cached records instead of fetching them again.
+    """
+    key = tuple(sorted(filters.items()))
+    cached = st.session_state.get('browse_records')
+    if cached and cached['key'] == key and time.time() - cached['fetched_at'] < BROWSE_CACHE_TTL_SECONDS:
+        return cached['records']
+    
+    records = st.session_state.api_client.get_records(**filters)
+    if 'error' not in records:
+        st.session_state.browse_records = {'key': key, 'records': records, 'fetched_at': time.time()}
+    return records
+
+@fragment
+def show_record_list():
+    """Filters and results of "All Records"; changing a filter reruns only this list"""
+    from utils.text_processing import normalize_text, tokenize, analyze_text
+    
     # Regular filters for "All Records" mode
     col1, col2, col3 = st.columns(3)
+    search_query = st.text_input("Search text", placeholder="Words to find in titles, descriptions and texts")
     
     # Get categories for filter
     categories = get_current_categories()
@@ -975,7 +1160,7 @@ def show_browse():
         if filter_media != "All":
             filters['media_type'] = filter_media.lower()
         
-        records = st.session_state.api_client.get_records(**filters)
+        records = get_public_records(filters)
     
     if 'error' in records:
         st.error("Failed to load contributions. Please try again.")
@@ -988,39 +1173,50 @@ def show_browse():
     # Only show public records
     public_records = [r for r in records if r.get('release_rights') == 'public']
     
+    query_tokens = set(tokenize(normalize_text(search_query)))
+    if query_tokens:
+        # Locally ingested texts match on their full content; others on title and description
+        text_matches = set(db.search_text(query_tokens, [r.get('uid') or r.get('id') for r in public_records]))
+        public_records = [
+            r for r in public_records
+            if (r.get('uid') or r.get('id')) in text_matches
+            or query_tokens.issubset(analyze_text(f"{r.get('title', '')}\n{r.get('description', '')}").tokens)
+        ]
+    
     st.write(f"Found {len(public_records)} public contributions")
     
     # Display contributions
-    for record in public_records:
-        with st.container():
-            col1, col2 = st.columns([3, 1])
-            with col1:
-                st.write(f"**{record.get('title', 'Untitled')}**")
-                media_type = record.get('media_type', 'unknown').title()
-                language = record.get('language', 'unknown').title()
-                category_id = record.get('category_id', 'N/A')
-                st.write(f"Category: {category_id} | Type: {media_type} | Language: {language}")
-                if record.get('description'):
-                    st.write(record['description'])
+    with span("render records", count=len(public_records)):
+        for record in public_records:
+            with st.container():
+                col1, col2 = st.columns([3, 1])
+                with col1:
+                    st.write(f"**{record.get('title', 'Untitled')}**")
+                    media_type = record.get('media_type', 'unknown').title()
+                    language = record.get('language', 'unknown').title()
+                    category_id = record.get('category_id', 'N/A')
+                    st.write(f"Category: {category_id} | Type: {media_type} | Language: {language}")
+                    if record.get('description'):
+                        st.write(record['description'])
                 
-                # Show location if available
-                if record.get('latitude') and record.get('longitude'):
-                    st.write(f"📍 Location: {record['latitude']:.4f}, {record['longitude']:.4f}")
+                    # Show location if available
+                    if record.get('latitude') and record.get('longitude'):
+                        st.write(f"📍 Location: {record['latitude']:.4f}, {record['longitude']:.4f}")
                     
-            with col2:
-                timestamp = record.get('created_at') or record.get('timestamp')
-                if timestamp:
-                    date_str = timestamp[:10] if len(timestamp) >= 10 else timestamp
-                    st.write(f"📅 {date_str}")
-                if record.get('size'):
-                    st.write(f"📊 {format_file_size(record['size'])}")
+                with col2:
+                    timestamp = record.get('created_at') or record.get('timestamp')
+                    if timestamp:
+                        date_str = timestamp[:10] if len(timestamp) >= 10 else timestamp
+                        st.write(f"📅 {date_str}")
+                    if record.get('size'):
+                        st.write(f"📊 {format_file_size(record['size'])}")
                     
-                # Admin actions
-                if is_admin():
-                    if st.button(f"View Details", key=f"view_{record.get('id')}", help="Admin view"):
-                        st.info(f"Record ID: {record.get('id')}")
+                    # Admin actions
+                    if is_admin():
+                        if st.button(f"View Details", key=f"view_{record.get('id')}", help="Admin view"):
+                            st.info(f"Record ID: {record.get('id')}")
                         
-            st.divider()
+                st.divider()
 
 def show_about():
     st.header("About Corpus Collection Engine")
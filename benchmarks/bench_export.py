@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""Benchmark streaming export throughput and memory against format_export_data"""
+
+import functools
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.data_export import format_export_data, stream_export, export_filename, zstandard
+
+def synthetic_records(count):
+    """Generate contribution-shaped records without holding them all in memory"""
+    for i in range(count):
+        yield {
+            "id": f"contrib-{i:08d}",
+            "title": f"Folk tale {i}, retold",
+            "category": "Folk Tales",
+            "media_type": "Text",
+            "language": "Telugu",
+            "description": "ఒక ఊరిలో ఒక రాజు ఉండేవాడు. " * 4,
+            "public": i % 2 == 0,
+            "timestamp": "2024-12-19T10:00:00"
+        }
+
+def measure(func):
+    """Run func, returning (result, seconds, peak traced memory in MB)"""
+    tracemalloc.start()
+    start = time.perf_counter()
+    result = func()
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, elapsed, peak / (1024 * 1024)
+
+def run_benchmark(sizes=(10_000, 100_000)):
+    compressions = [None, "gzip"] + (["zstd"] if zstandard else [])
+    print(f"{'records':>8} {'format':>6} {'compress':>8} {'rec/s':>10} {'MB out':>8} {'peak MB':>8}")
+
+    with tempfile.TemporaryDirectory() as out_dir:
+        for size in sizes:
+            # Baseline: the in-memory formatter builds the whole document first
+            for format_type in ("json", "csv"):
+                data = {"contributions": list(synthetic_records(size))}
+                text, elapsed, peak = measure(functools.partial(format_export_data, data, format_type))
+                print(f"{size:>8} {format_type:>6} {'in-mem':>8} {size / elapsed:>10.0f} "
+                      f"{len(text.encode('utf-8')) / 1e6:>8.1f} {peak:>8.1f}")
+
+            for format_type in ("jsonl", "csv"):
+                for compression in compressions:
+                    path = Path(out_dir) / export_filename(f"bench-{size}", format_type, compression)
+                    stats, _, peak = measure(
+                        lambda: stream_export(synthetic_records(size), path, format_type, compression)
+                    )
+                    print(f"{size:>8} {format_type:>6} {compression or 'none':>8} "
+                          f"{stats['records_per_second']:>10.0f} {stats['bytes'] / 1e6:>8.1f} {peak:>8.1f}")
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""Benchmark vectorized distance ranking against the scalar calculate_distance"""
+
+import os
+import random
+import sys
+import time
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.geospatial import calculate_distance, haversine_distances, nearest_k
+
+QUERY = (17.385, 78.4867)  # Hyderabad
+
+def make_points(count, seed=42):
+    """Random points scattered over India"""
+    rng = random.Random(seed)
+    lats = [rng.uniform(8.0, 35.0) for _ in range(count)]
+    lons = [rng.uniform(68.0, 97.0) for _ in range(count)]
+    return lats, lons
+
+def best_of(func, repeat=5):
+    """Best wall time of several runs, in milliseconds"""
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        func()
+        timings.append((time.perf_counter() - start) * 1000)
+    return min(timings)
+
+def run_benchmark(sizes=(1_000, 10_000, 100_000), k=20):
+    print(f"{'points':>8} {'scalar ms':>10} {'vector ms':>10} {'speedup':>8} {'top-k ms':>9}")
+    for size in sizes:
+        lats, lons = make_points(size)
+        
+        scalar_ms = best_of(lambda: sorted(
+            calculate_distance(QUERY[0], QUERY[1], lat, lon) for lat, lon in zip(lats, lons)
+        ))
+        vector_ms = best_of(lambda: haversine_distances(QUERY[0], QUERY[1], lats, lons).argsort())
+        topk_ms = best_of(lambda: nearest_k(QUERY[0], QUERY[1], lats, lons, k))
+        
+        # Both implementations must agree before the timings mean anything
+        scalar = [calculate_distance(QUERY[0], QUERY[1], lat, lon) for lat, lon in zip(lats[:100], lons[:100])]
+        vector = haversine_distances(QUERY[0], QUERY[1], lats[:100], lons[:100])
+        assert max(abs(a - b) for a, b in zip(scalar, vector)) < 1e-6
+        
+        print(f"{size:>8} {scalar_ms:>10.2f} {vector_ms:>10.2f} {scalar_ms / vector_ms:>7.1f}x {topk_ms:>9.2f}")
+
+if __name__ == "__main__":
+    run_benchmark()
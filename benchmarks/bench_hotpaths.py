@@ -0,0 +1,337 @@
+#!/usr/bin/env python3
+"""Micro-benchmark the per-rerun hot paths, with stored baselines and a comparison report
+
+Each benchmark is timed like timeit: calls are batched until a batch takes at
+least --min-time, and the median of --repeat batches is reported per call.
+Save a run as a baseline, then compare later runs against it to prove (or
+disprove) an optimisation:
+
+    python benchmarks/bench_hotpaths.py --save before
+    python benchmarks/bench_hotpaths.py --compare before --threshold 0.1
+
+--compare exits with status 1 when any benchmark is slower than the baseline
+by more than the threshold, so it can gate CI.
+"""
+
+import argparse
+import atexit
+import io
+import json
+import os
+import platform
+import random
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Everything the app writes (corpus.db, uploads, traces) goes to a scratch directory
+SCRATCH_DIR = tempfile.mkdtemp(prefix="bench-hotpaths-")
+os.environ["DATA_DIR"] = SCRATCH_DIR
+atexit.register(shutil.rmtree, SCRATCH_DIR, True)
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import streamlit as st
+from PIL import Image
+from streamlit import config as streamlit_config
+from streamlit.logger import set_log_level
+
+# Bare mode logs a "missing ScriptRunContext" warning on every session_state access.
+# Loading the config first stops it resetting the level on the first st call.
+streamlit_config.get_config_options()
+set_log_level("error")
+
+BASELINES_DIR = Path(__file__).parent / "baselines"
+DEFAULT_ROWS = (10_000, 100_000, 1_000_000)
+
+def time_call(func, repeat=7, min_time=0.05):
+    """Seconds per call: median, min and stdev over repeat batches"""
+    number = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        elapsed = time.perf_counter() - start
+        if elapsed >= min_time or number >= 1 << 20:
+            break
+        number *= 10 if elapsed < min_time / 10 else 2
+
+    timings = [elapsed / number]
+    for _ in range(repeat - 1):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        timings.append((time.perf_counter() - start) / number)
+    return {
+        'median_us': statistics.median(timings) * 1e6,
+        'min_us': min(timings) * 1e6,
+        'stdev_us': (statistics.stdev(timings) if len(timings) > 1 else 0.0) * 1e6,
+        'calls': number * repeat
+    }
+
+def synthetic_records(count, users, seed=42):
+    """API-shaped records scattered over India, spread evenly over users"""
+    from utils.static_categories import CATEGORY_MAPPING
+    rng = random.Random(seed)
+    categories = list(CATEGORY_MAPPING.values())
+    for i in range(count):
+        yield {
+            'uid': f"rec-{i:08d}",
+            'user_id': f"user-{i % users:06d}",
+            'category_id': categories[i % len(categories)],
+            'media_type': ('text', 'image', 'audio', 'video')[i % 4],
+            'title': f"Folk tale {i}",
+            'description': "ఒక ఊరిలో ఒక రాజు ఉండేవాడు.",
+            'language': 'telugu',
+            'file_size': rng.randint(1_000, 5_000_000),
+            'release_rights': 'creator' if i % 2 else 'family_or_friend',
+            'created_at': f"2024-{1 + i % 12:02d}-{1 + i % 28:02d}T10:00:00",
+            'location': {'latitude': rng.uniform(8.0, 35.0), 'longitude': rng.uniform(68.0, 97.0)}
+        }
+
+# Each benchmark is (name, setup); setup prepares state and returns the callable to time
+
+def bench_category_mapper():
+    from utils.category_mapper import get_category_id_from_name
+    from utils.static_categories import CATEGORY_MAPPING
+    # Cached categories, as on every rerun after the first
+    st.session_state.categories_cache = [{'id': cid, 'title': name, 'name': name}
+                                         for name, cid in CATEGORY_MAPPING.items()]
+    name = list(CATEGORY_MAPPING)[-1]
+    return lambda: get_category_id_from_name(name)
+
+def bench_has_permission():
+    from utils.permissions import has_permission
+    st.session_state.user_id = "user-000001"
+    st.session_state.user_roles_cache = [{'name': 'user', 'id': 2}, {'name': 'reviewer', 'id': 3}]
+    return lambda: has_permission('categories:write')
+
+def bench_file_hash():
+    from utils.file_handler import calculate_file_hash
+    content = os.urandom(1024 * 1024)
+    return lambda: calculate_file_hash(content)
+
+def bench_sanitize_image():
+    from utils.file_handler import sanitize_image
+    buffer = io.BytesIO()
+    Image.effect_noise((640, 480), 64).convert('RGB').save(buffer, format='JPEG')
+
+    def run():
+        buffer.seek(0)
+        sanitize_image(buffer)
+    return run
+
+def bench_calculate_distance():
+    from utils.geospatial import calculate_distance
+    return lambda: calculate_distance(17.385, 78.4867, 28.6139, 77.2090)
+
+def bench_format_export(format_type):
+    def setup():
+        from utils.data_export import format_export_data
+        data = {'contributions': [
+            {**record, 'category': record['category_id'], 'timestamp': record['created_at']}
+            for record in synthetic_records(1_000, 100)
+        ]}
+        return lambda: format_export_data(data, format_type)
+    return setup
+
+def bench_format_file_size():
+    # Importing app runs its page setup once, in bare mode
+    from app import format_file_size
+    sizes = [0, 512, 123_456, 7_340_032, 5 * 1024 ** 3]
+    return lambda: [format_file_size(size) for size in sizes]
+
+def bench_offline_store(shared):
+    def setup():
+        import json
+        from utils.shared_json import get_shared_file
+        path = Path(SCRATCH_DIR) / "contributions.json"
+        if not path.exists():
+            path.write_text(json.dumps([{**record, 'id': record['uid']} for record in synthetic_records(10_000, 100)]))
+        if shared:
+            # What each new session pays once the process has parsed the file
+            store = get_shared_file(path, list)
+            return store.get
+
+        def parse():
+            with open(path, 'r') as f:
+                return json.load(f)
+        return parse
+    return setup
+
+def bench_contribution_summary(cached):
+    def setup():
+        from utils.contribution_summary import ContributionSummaryCache, summarize_contributions
+        records = list(synthetic_records(1_000, 1))
+        response = {'total_contributions': len(records), 'contributions_by_media_type': {'text': len(records)},
+                    'text_contributions': records}
+        if cached:
+            # A dashboard rerun once the summary is cached
+            cache = ContributionSummaryCache(ttl=3600)
+            return lambda: cache.get("user-000000", lambda user_id: response)
+        return lambda: summarize_contributions(response)
+    return setup
+
+def bench_session_restore(cached):
+    def setup():
+        from utils.session_store import SessionStore, SqliteSessionBackend
+        store = SessionStore(SqliteSessionBackend(Path(SCRATCH_DIR) / f"sessions-{cached}.db"), cache_size=10_000)
+        sids = [store.create({'user_id': f"user-{i:06d}", 'page': 'Home', 'access_token': "x" * 200})
+                for i in range(10_000)]
+        rng = random.Random(0)
+        if cached:
+            return lambda: store.get(rng.choice(sids))
+        # A restore after a process restart, when the LRU is cold
+        def restore():
+            sid = rng.choice(sids)
+            store._cache.pop(sid, None)
+            return store.get(sid)
+        return restore
+    return setup
+
+_databases = {}
+
+def seeded_database(rows):
+    """A LocalDatabase with rows contributions in its own file, built once per size"""
+    if rows not in _databases:
+        from utils import database as database_module
+        database_module.DATA_DIR = Path(SCRATCH_DIR) / f"rows-{rows}"
+        database = database_module.LocalDatabase()
+        batch = []
+        for record in synthetic_records(rows, max(1, rows // 100)):
+            batch.append(record)
+            if len(batch) == 10_000:
+                database.upsert_records(batch)
+                batch = []
+        database.upsert_records(batch)
+        _databases[rows] = database
+    return _databases[rows]
+
+def bench_db(operation, rows):
+    def setup():
+        database = seeded_database(rows)
+        rng = random.Random(rows)
+        if operation == "create":
+            counter = iter(range(10 ** 9))
+            return lambda: database.create_contribution({
+                'id': f"bench-{next(counter)}", 'user_id': "user-000001", 'category': "folk_tales",
+                'media_type': 'text', 'title': "New tale", 'language': 'telugu',
+                'latitude': 17.385, 'longitude': 78.4867
+            })
+        if operation == "read_user":
+            return lambda: database.get_user_contributions(f"user-{rng.randrange(max(1, rows // 100)):06d}")
+        if operation == "update":
+            record = next(synthetic_records(1, 1))
+            titles = iter(range(10 ** 9))
+            return lambda: database.upsert_records([{**record, 'title': f"Retold {next(titles)}"}])
+        if operation == "search_bbox":
+            return lambda: database.search_bbox(17.0, 78.0, 17.5, 78.5)
+        if operation == "search_nearby":
+            return lambda: database.search_nearby(17.385, 78.4867, 25)
+        raise ValueError(operation)
+    return setup
+
+def build_benchmarks(rows):
+    benchmarks = [
+        ("category_mapper.get_category_id_from_name", bench_category_mapper),
+        ("permissions.has_permission", bench_has_permission),
+        ("file_handler.calculate_file_hash[1MB]", bench_file_hash),
+        ("file_handler.sanitize_image[640x480]", bench_sanitize_image),
+        ("geospatial.calculate_distance", bench_calculate_distance),
+        ("data_export.format_export_data[json,1k]", bench_format_export("json")),
+        ("data_export.format_export_data[csv,1k]", bench_format_export("csv")),
+        ("app.format_file_size[x5]", bench_format_file_size),
+        ("offline contributions json.load[10k]", bench_offline_store(False)),
+        ("offline contributions shared_json.get[10k]", bench_offline_store(True)),
+        ("contribution_summary.summarize[1k]", bench_contribution_summary(False)),
+        ("contribution_summary.get[cached]", bench_contribution_summary(True)),
+        ("session_store.get[sqlite,10k]", bench_session_restore(False)),
+        ("session_store.get[cached,10k]", bench_session_restore(True)),
+    ]
+    # LocalDatabase has no delete; create, read, update and the spatial reads cover its hot paths
+    for size in rows:
+        for operation in ("create", "read_user", "update", "search_bbox", "search_nearby"):
+            benchmarks.append((f"database.{operation}[{size}]", bench_db(operation, size)))
+    return benchmarks
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        return None
+
+def run_benchmark(rows=DEFAULT_ROWS, select=None, repeat=7, min_time=0.05):
+    results = {}
+    for name, setup in build_benchmarks(rows):
+        if select and select not in name:
+            continue
+        func = setup()
+        func()  # Warm caches and lazy imports
+        results[name] = time_call(func, repeat, min_time)
+        print(f"{name:<48} {results[name]['median_us']:>12.2f} us  (min {results[name]['min_us']:.2f})",
+              flush=True)
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'machine': platform.platform(),
+        'results': results
+    }
+
+def baseline_path(name):
+    path = Path(name)
+    return path if path.suffix == ".json" else BASELINES_DIR / f"{name}.json"
+
+def compare(run, baseline, threshold=0.1):
+    """Print median ratios against a baseline; returns the names that regressed"""
+    print(f"\nBaseline {baseline.get('commit') or '?'} ({baseline['timestamp'][:19]}) "
+          f"vs current {run.get('commit') or '?'}")
+    print(f"{'benchmark':<48} {'baseline us':>12} {'current us':>12} {'change':>8}")
+    regressions = []
+    for name, result in run['results'].items():
+        before = baseline['results'].get(name)
+        if before is None:
+            print(f"{name:<48} {'-':>12} {result['median_us']:>12.2f} {'new':>8}")
+            continue
+        change = result['median_us'] / before['median_us'] - 1
+        flag = ""
+        if change > threshold:
+            regressions.append(name)
+            flag = "  SLOWER"
+        elif change < -threshold:
+            flag = "  faster"
+        print(f"{name:<48} {before['median_us']:>12.2f} {result['median_us']:>12.2f} {change:>+7.1%}{flag}")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser(description="Micro-benchmark utils hot paths")
+    parser.add_argument("--rows", default=",".join(str(n) for n in DEFAULT_ROWS),
+                        help="Comma-separated LocalDatabase sizes")
+    parser.add_argument("-k", "--select", help="Only run benchmarks whose name contains this")
+    parser.add_argument("--repeat", type=int, default=7)
+    parser.add_argument("--min-time", type=float, default=0.05, help="Minimum seconds per timed batch")
+    parser.add_argument("--save", metavar="NAME", help="Store the run as benchmarks/baselines/NAME.json")
+    parser.add_argument("--compare", metavar="NAME", help="Compare against a stored baseline")
+    parser.add_argument("--threshold", type=float, default=0.1, help="Slowdown ratio counted as a regression")
+    args = parser.parse_args()
+
+    rows = tuple(int(n) for n in args.rows.split(",") if n)
+    run = run_benchmark(rows, args.select, args.repeat, args.min_time)
+    if args.save:
+        path = baseline_path(args.save)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(run, indent=2) + "\n", encoding='utf-8')
+        print(f"Saved baseline to {path}")
+    if args.compare:
+        baseline = json.loads(baseline_path(args.compare).read_text(encoding='utf-8'))
+        if compare(run, baseline, args.threshold):
+            sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,242 @@
+#!/usr/bin/env python3
+"""Simulate concurrent contributors and report throughput, latency percentiles and error rates
+
+Each virtual user logs in, contributes a text and a chunked media file, opens
+the dashboard and browses, repeatedly, through its own APIClient. Without
+--base-url an in-process stub_server is started, so the numbers track client
+overhead and can be compared across releases.
+
+    python benchmarks/bench_load.py --users 20 --duration 30 --latency-ms 40 --output load.json
+"""
+
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import sys
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional, List, Dict, Any
+
+import numpy as np
+
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from utils.api_client import APIClient
+from utils.file_upload import send_file_chunks, finalize_upload
+from utils.metrics import registry, endpoint_summary
+from utils.static_categories import CATEGORY_MAPPING
+
+STEPS = ("login", "contribute_text", "contribute_media", "dashboard", "browse")
+
+# An idle in-process stub answers GET /health in a few ms over keep-alive; much more
+# than --latency-ms plus this means the numbers measure the stub, not the client
+STUB_BASELINE_MAX_MS = 10.0
+
+class Recorder:
+    """Thread-safe latency samples and error counts per flow step"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples: Dict[str, List[float]] = {step: [] for step in STEPS}
+        self.errors: Dict[str, int] = {step: 0 for step in STEPS}
+        self.flows = 0
+
+    def record(self, step: str, seconds: float, ok: bool):
+        with self._lock:
+            self.samples[step].append(seconds)
+            if not ok:
+                self.errors[step] += 1
+
+    def flow_done(self):
+        with self._lock:
+            self.flows += 1
+
+def _failed(result: Any) -> bool:
+    return isinstance(result, dict) and 'error' in result
+
+def timed(recorder: Recorder, step: str, func):
+    """Run one step, recording its latency and whether it failed"""
+    start = time.perf_counter()
+    try:
+        result = func()
+        ok = not _failed(result)
+    except Exception:
+        result, ok = None, False
+    recorder.record(step, time.perf_counter() - start, ok)
+    return result if ok else None
+
+def run_user(index: int, base_url: str, deadline: float, iterations: Optional[int], media_bytes: int,
+             otp: str, recorder: Recorder, seed: int):
+    """One virtual contributor looping through the app's main flow"""
+    rng = random.Random(seed + index)
+    client = APIClient(base_url)
+    phone = f"+9190000{index:05d}"
+    media = bytes(rng.getrandbits(8) for _ in range(min(media_bytes, 4096))) * max(1, media_bytes // 4096)
+    done = 0
+
+    while time.time() < deadline and (iterations is None or done < iterations):
+        done += 1
+        session = timed(recorder, "login", lambda: (client.send_login_otp(phone), client.verify_login_otp(phone, otp))[1])
+        if not session:
+            continue
+        user_id = session.get('user_id')
+        categories = client.get_categories()
+        category_ids = [category['id'] for category in categories] if isinstance(categories, list) and categories \
+            else list(CATEGORY_MAPPING.values())
+        latitude, longitude = 17.385 + rng.uniform(-0.5, 0.5), 78.4867 + rng.uniform(-0.5, 0.5)
+
+        timed(recorder, "contribute_text", lambda: client.create_record({
+            'title': f"Load test text {index}-{done}",
+            'description': "ఒక ఊరిలో ఒక రాజు ఉండేవాడు. " * 8,
+            'media_type': 'text',
+            'language': 'telugu',
+            'release_rights': 'creator',
+            'user_id': user_id,
+            'category_id': rng.choice(category_ids),
+            'location': {'latitude': latitude, 'longitude': longitude}
+        }))
+
+        def contribute_media():
+            # The same calls upload_file_chunked makes, minus its Streamlit session state
+            file_data = io.BytesIO(media)
+            upload_uuid = str(uuid.uuid4())
+            total_chunks, error = send_file_chunks(client, file_data, "load.wav", upload_uuid)
+            if error:
+                return {'error': error}
+            response = finalize_upload(client, {
+                'title': f"Load test audio {index}-{done}", 'description': '', 'category_id': rng.choice(category_ids),
+                'user_id': user_id, 'media_type': 'audio', 'upload_uuid': upload_uuid, 'filename': "load.wav",
+                'total_chunks': total_chunks, 'release_rights': 'creator', 'language': 'telugu',
+                'latitude': latitude, 'longitude': longitude
+            })
+            return response.json() if response.status_code == 201 else {'error': response.status_code}
+
+        timed(recorder, "contribute_media", contribute_media)
+        timed(recorder, "dashboard", lambda: client.get_user_contributions(user_id))
+
+        def browse():
+            for result in (client.get_records(), client.search_nearby(latitude, longitude, 10000)):
+                if _failed(result):
+                    return result
+            return result
+
+        timed(recorder, "browse", browse)
+        recorder.flow_done()
+
+def percentiles(samples: List[float]) -> Dict[str, Optional[float]]:
+    if not samples:
+        return {'p50_ms': None, 'p95_ms': None, 'p99_ms': None, 'mean_ms': None, 'max_ms': None}
+    values = np.array(samples) * 1000
+    p50, p95, p99 = np.percentile(values, [50, 95, 99])
+    return {'p50_ms': round(float(p50), 3), 'p95_ms': round(float(p95), 3), 'p99_ms': round(float(p99), 3),
+            'mean_ms': round(float(values.mean()), 3), 'max_ms': round(float(values.max()), 3)}
+
+def measure_baseline(base_url: str, samples: int = 20) -> Dict[str, Optional[float]]:
+    """Round-trip latency of GET /health on one reused connection, before any load"""
+    client = APIClient(base_url)
+    timings = []
+    for _ in range(samples):
+        start = time.perf_counter()
+        client.health_check()
+        timings.append(time.perf_counter() - start)
+    return percentiles(timings[1:])
+
+def run_load(users: int = 10, duration: float = 10.0, iterations: Optional[int] = None,
+             base_url: Optional[str] = None, media_kb: int = 512, ramp_up: float = 0.0, otp: str = "123456",
+             latency_ms: float = 0, jitter_ms: float = 0, error_rate: float = 0, seed: int = 0) -> Dict[str, Any]:
+    """Run the load test and return the JSON-ready report"""
+    server = None
+    if base_url is None:
+        from stub_server import start_stub_server
+        server = start_stub_server(latency_ms=latency_ms, jitter_ms=jitter_ms, error_rate=error_rate, seed=seed)
+        base_url = f"http://127.0.0.1:{server.server_address[1]}"
+
+    baseline = measure_baseline(base_url)
+    if server and baseline['p50_ms'] > latency_ms + STUB_BASELINE_MAX_MS:
+        baseline['warning'] = (f"stub p50 {baseline['p50_ms']:.1f} ms exceeds --latency-ms + "
+                               f"{STUB_BASELINE_MAX_MS:.0f} ms; results reflect the stub, not the client")
+        print(f"warning: {baseline['warning']}", file=sys.stderr)
+
+    registry.reset()
+    recorder = Recorder()
+    start = time.time()
+    deadline = start + duration if iterations is None else float('inf')
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        futures = []
+        for index in range(users):
+            futures.append(executor.submit(run_user, index, base_url, deadline, iterations,
+                                           media_kb * 1024, otp, recorder, seed))
+            if ramp_up and users > 1:
+                time.sleep(ramp_up / (users - 1))
+        for future in futures:
+            future.result()
+    elapsed = time.time() - start
+    if server:
+        server.shutdown()
+
+    steps = {}
+    for step in STEPS:
+        count = len(recorder.samples[step])
+        steps[step] = {
+            'count': count,
+            'errors': recorder.errors[step],
+            'error_rate': round(recorder.errors[step] / count, 4) if count else 0.0,
+            **percentiles(recorder.samples[step])
+        }
+    requests_total = sum(row['requests'] for row in endpoint_summary())
+    return {
+        'benchmark': 'load',
+        'timestamp': datetime.now().isoformat(),
+        'python': platform.python_version(),
+        'config': {
+            'users': users, 'duration': duration, 'iterations': iterations, 'media_kb': media_kb,
+            'ramp_up': ramp_up, 'backend': 'stub' if server else base_url,
+            'latency_ms': latency_ms, 'jitter_ms': jitter_ms, 'error_rate': error_rate, 'seed': seed
+        },
+        'baseline': baseline,
+        'elapsed_seconds': round(elapsed, 3),
+        'flows': recorder.flows,
+        'flows_per_second': round(recorder.flows / elapsed, 3),
+        'requests': requests_total,
+        'requests_per_second': round(requests_total / elapsed, 3),
+        'steps': steps,
+        'endpoints': [
+            {key: (round(value, 3) if isinstance(value, float) else value) for key, value in row.items()}
+            for row in endpoint_summary()
+        ]
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the client with concurrent virtual contributors")
+    parser.add_argument("--users", type=int, default=10, help="Concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="Seconds to run (ignored with --iterations)")
+    parser.add_argument("--iterations", type=int, help="Flows per user instead of a fixed duration")
+    parser.add_argument("--base-url", help="Backend to load; defaults to an in-process stub server")
+    parser.add_argument("--media-kb", type=int, default=512, help="Size of each uploaded media file")
+    parser.add_argument("--ramp-up", type=float, default=0.0, help="Seconds over which users start")
+    parser.add_argument("--otp", default="123456", help="OTP submitted at login (the stub accepts any)")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Stub latency per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Stub latency variation")
+    parser.add_argument("--error-rate", type=float, default=0, help="Stub injected failure rate")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="Write the JSON report here instead of stdout")
+    args = parser.parse_args()
+
+    report = run_load(args.users, args.duration, args.iterations, args.base_url, args.media_kb, args.ramp_up,
+                      args.otp, args.latency_ms, args.jitter_ms, args.error_rate, args.seed)
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(text + "\n")
+        print(f"{report['flows']} flows, {report['requests_per_second']} req/s -> {args.output}")
+    else:
+        print(text)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""Benchmark cold start of app.py: import time and first paint in fresh processes
+
+Each sample runs in a new interpreter so nothing is already in sys.modules:
+"import" times `import app` in bare mode, "first paint" times the first
+AppTest run of the script (imports, session setup and rendering the login
+page) and "rerun" times the run after it, in the same process.
+
+    python benchmarks/bench_startup.py --runs 5
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.append(ROOT)
+
+# Modules whose presence after startup means something was imported eagerly
+HEAVY_MODULES = ("numpy", "PIL", "bcrypt", "admin_panel", "utils.geospatial", "utils.dedup",
+                 "utils.language_id", "utils.media_metadata")
+
+def child_import():
+    start = time.perf_counter()
+    # Unused on purpose: importing the app module is what's being timed
+    import app  # noqa: F401
+    return {'import_ms': (time.perf_counter() - start) * 1000}
+
+def child_paint():
+    from streamlit.testing.v1 import AppTest
+    start = time.perf_counter()
+    at = AppTest.from_file(os.path.join(ROOT, "app.py"), default_timeout=120)
+    at.run()
+    first_ms = (time.perf_counter() - start) * 1000
+    start = time.perf_counter()
+    at.run()
+    rerun_ms = (time.perf_counter() - start) * 1000
+    if at.exception:
+        raise RuntimeError(at.exception[0].value)
+    return {'first_paint_ms': first_ms, 'rerun_ms': rerun_ms}
+
+def run_child(mode):
+    """Run one measurement in a fresh interpreter, in a scratch data directory"""
+    with tempfile.TemporaryDirectory() as scratch:
+        env = {**os.environ, 'DATA_DIR': os.path.join(scratch, "data"), 'METRICS_ENABLED': 'false',
+               'STREAMLIT_LOGGER_LEVEL': 'error'}
+        result = subprocess.run([sys.executable, os.path.abspath(__file__), "--child", mode],
+                                cwd=scratch, env=env, capture_output=True, text=True)
+    if result.returncode:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+def run_benchmark(runs=5):
+    samples = {}
+    modules = None
+    for _ in range(runs):
+        for mode in ("import", "paint"):
+            result = run_child(mode)
+            modules = result.pop('heavy_modules')
+            for key, value in result.items():
+                samples.setdefault(key, []).append(value)
+
+    print(f"{'measure':<16} {'median ms':>10} {'min ms':>10} {'max ms':>10}")
+    for key, values in samples.items():
+        print(f"{key[:-3]:<16} {statistics.median(values):>10.1f} {min(values):>10.1f} {max(values):>10.1f}")
+    print(f"heavy modules loaded at first paint: {', '.join(modules) or 'none'}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark app.py cold start")
+    parser.add_argument("--runs", type=int, default=5, help="Fresh processes per measurement")
+    parser.add_argument("--child", choices=["import", "paint"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        result = child_import() if args.child == "import" else child_paint()
+        result['heavy_modules'] = [name for name in HEAVY_MODULES if name in sys.modules]
+        print(json.dumps(result))
+    else:
+        run_benchmark(args.runs)
+
+if __name__ == "__main__":
+    main()
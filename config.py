@@ -1,4 +1,5 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -13,6 +14,16 @@ API_TIMEOUT = int(os.getenv("API_TIMEOUT", "30"))
 JWT_SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key")
 OTP_EXPIRY_MINUTES = int(os.getenv("OTP_EXPIRY_MINUTES", "5"))
 SESSION_TIMEOUT_HOURS = int(os.getenv("SESSION_TIMEOUT_HOURS", "24"))
+# Login sessions: "sqlite" (DATA_DIR/sessions.db) or "memory"
+SESSION_BACKEND = os.getenv("SESSION_BACKEND", "sqlite").lower()
+SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", "1024"))
+SESSION_SWEEP_INTERVAL_SECONDS = int(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", "600"))
+# Hours after login when a session ends, however active it is
+SESSION_MAX_AGE_HOURS = int(os.getenv("SESSION_MAX_AGE_HOURS", "12"))
+
+# Local Storage
+DATA_DIR = Path(os.getenv("DATA_DIR", "data"))
+UPLOADS_DIR = DATA_DIR / "uploads"
 
 # File Upload Configuration
 CHUNK_SIZE = int(os.getenv("CHUNK_SIZE_MB", "1")) * 1024 * 1024
@@ -22,6 +33,75 @@ MAX_FILE_SIZE = {
     "audio": int(os.getenv("MAX_AUDIO_SIZE_MB", "25")) * 1024 * 1024,
     "video": int(os.getenv("MAX_VIDEO_SIZE_MB", "100")) * 1024 * 1024,
 }
+# file_handler's names for the per-type limits and accepted extensions
+MAX_FILE_SIZES = MAX_FILE_SIZE
+ALLOWED_EXTENSIONS = {
+    "text": [".txt"],
+    "image": [".png", ".jpg", ".jpeg"],
+    "audio": [".mp3", ".wav", ".ogg"],
+    "video": [".mp4", ".avi", ".mov"],
+}
+MEDIA_METADATA_WORKERS = int(os.getenv("MEDIA_METADATA_WORKERS", "8"))
+
+# Offline Sync
+SYNC_BATCH_SIZE = int(os.getenv("SYNC_BATCH_SIZE", "20"))
+SYNC_MAX_WORKERS = int(os.getenv("SYNC_MAX_WORKERS", "4"))
+SYNC_INTERVAL_SECONDS = int(os.getenv("SYNC_INTERVAL_SECONDS", "30"))
+SYNC_MAX_ATTEMPTS = int(os.getenv("SYNC_MAX_ATTEMPTS", "8"))
+
+# Geospatial Cache
+GEO_TILE_ZOOM = int(os.getenv("GEO_TILE_ZOOM", "9"))
+GEO_CACHE_TTL_SECONDS = int(os.getenv("GEO_CACHE_TTL_SECONDS", "300"))
+GEO_CACHE_MAX_TILES = int(os.getenv("GEO_CACHE_MAX_TILES", "512"))
+GEO_QUERY_MAX_TILES = int(os.getenv("GEO_QUERY_MAX_TILES", "16"))
+# Records per /records/search/bbox call; tiles are paged until a short page comes back
+GEO_PAGE_SIZE = int(os.getenv("GEO_PAGE_SIZE", "100"))
+
+# Dashboard Summary Cache
+SUMMARY_CACHE_TTL_SECONDS = int(os.getenv("SUMMARY_CACHE_TTL_SECONDS", "300"))
+SUMMARY_CACHE_MAX_USERS = int(os.getenv("SUMMARY_CACHE_MAX_USERS", "1024"))
+
+# Data Export
+EXPORT_PAGE_SIZE = int(os.getenv("EXPORT_PAGE_SIZE", "1000"))
+EXPORT_DIR = DATA_DIR / "exports"
+PARQUET_ROW_GROUP_SIZE = int(os.getenv("PARQUET_ROW_GROUP_SIZE", "50000"))
+PARQUET_MAX_BUFFERED_ROWS = int(os.getenv("PARQUET_MAX_BUFFERED_ROWS", "200000"))
+SHARD_MAX_BYTES = int(os.getenv("SHARD_SIZE_MB", "512")) * 1024 * 1024
+SHARD_READ_WORKERS = int(os.getenv("SHARD_READ_WORKERS", "4"))
+EXPORT_COMPACT_AFTER = int(os.getenv("EXPORT_COMPACT_AFTER", "8"))
+EXPORT_POLL_INTERVAL_SECONDS = float(os.getenv("EXPORT_POLL_INTERVAL_SECONDS", "2"))
+EXPORT_POLL_MAX_SECONDS = float(os.getenv("EXPORT_POLL_MAX_SECONDS", "60"))
+EXPORT_TASK_TIMEOUT_SECONDS = int(os.getenv("EXPORT_TASK_TIMEOUT_SECONDS", "3600"))
+EXPORT_DOWNLOAD_PART_BYTES = int(os.getenv("EXPORT_DOWNLOAD_PART_MB", "8")) * 1024 * 1024
+EXPORT_DOWNLOAD_WORKERS = int(os.getenv("EXPORT_DOWNLOAD_WORKERS", "4"))
+EXPORT_DOWNLOAD_RETRIES = int(os.getenv("EXPORT_DOWNLOAD_RETRIES", "5"))
+
+# Text Processing
+TEXT_CACHE_SIZE = int(os.getenv("TEXT_CACHE_SIZE", "1024"))
+TEXT_CACHE_MAX_BYTES = int(os.getenv("TEXT_CACHE_MB", "32")) * 1024 * 1024
+# Longer texts are analyzed on every call rather than cached
+TEXT_CACHE_MAX_TEXT_CHARS = int(os.getenv("TEXT_CACHE_MAX_TEXT_CHARS", "20000"))
+TEXT_PROCESSING_WORKERS = int(os.getenv("TEXT_PROCESSING_WORKERS", str(os.cpu_count() or 2)))
+
+# Near-duplicate Detection
+NEAR_DUPLICATE_THRESHOLD = float(os.getenv("NEAR_DUPLICATE_THRESHOLD", "0.8"))
+DEDUP_WORKERS = int(os.getenv("DEDUP_WORKERS", str(os.cpu_count() or 2)))
+IMAGE_DUPLICATE_DISTANCE = int(os.getenv("IMAGE_DUPLICATE_DISTANCE", "8"))
+
+# Language Identification
+LANGUAGE_ID_MIN_CONFIDENCE = float(os.getenv("LANGUAGE_ID_MIN_CONFIDENCE", "0.9"))
+
+# Metrics
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+# The /metrics endpoint is opt-in: set a port (e.g. 9464) to serve it
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# Profiling
+PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+PROFILE_SLOW_RERUN_MS = float(os.getenv("PROFILE_SLOW_RERUN_MS", "1000"))
+PROFILE_CAPTURE = os.getenv("PROFILE_CAPTURE", "sample").lower()
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
 
 # Security
 BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", "12"))
@@ -32,4 +112,6 @@ DEBUG = os.getenv("DEBUG", "false").lower() == "true"
 
 # UI Configuration
 CATEGORIES_PER_ROW = 4
-DASHBOARD_RECENT_LIMIT = 5
\ No newline at end of file
+DASHBOARD_RECENT_LIMIT = 5
+# Seconds Browse reuses fetched records while only local filters change
+BROWSE_CACHE_TTL_SECONDS = int(os.getenv("BROWSE_CACHE_TTL_SECONDS", "60"))
\ No newline at end of file
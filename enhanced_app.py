@@ -13,6 +13,7 @@ from utils.database import db
 import hashlib
 import bcrypt
 from utils.file_handler import save_file, validate_file, get_file_info
+from utils.media_metadata import extract_metadata
 from config import SUPPORTED_LANGUAGES, MAX_FILE_SIZES
 
 # Updated categories to match the image
@@ -435,6 +436,7 @@ def show_contribute():
                         file_path, file_hash = save_file(content_data, contribution_id, media_type)
                         contribution_data['file_path'] = file_path
                         contribution_data['file_hash'] = file_hash
+                        contribution_data.update(extract_metadata(content_data))
                     else:
                         # Save text content
                         text_path = Path("data/uploads") / f"{contribution_id}.txt"
@@ -0,0 +1,666 @@
+#!/usr/bin/env python3
+"""Local stand-in for the backend API, generated from openapi.json
+
+Every path in the spec is served. Records, chunked uploads, categories, users,
+geo search and export tasks keep state in memory or SQLite; other operations
+answer with an example built from their response schema. Latency and errors
+can be injected to exercise the client's timeouts, retries and metrics.
+
+    python stub_server.py --port 8000 --latency-ms 40 --jitter-ms 20 --error-rate 0.02
+    API_BASE_URL=http://localhost:8000 streamlit run app.py
+"""
+
+import argparse
+import hashlib
+import json
+import math
+import random
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from email.parser import BytesParser
+from email.policy import HTTP
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+from urllib.parse import urlsplit, parse_qs
+
+from utils.static_categories import CATEGORY_MAPPING
+
+SPEC_PATH = Path(__file__).parent / "openapi.json"
+
+# Seconds an export task stays pending before its file can be downloaded
+EXPORT_TASK_SECONDS = 2.0
+
+def _now() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+class HTTPError(Exception):
+    def __init__(self, status: int, detail: Any):
+        super().__init__(detail)
+        self.status = status
+        self.detail = detail
+
+class MemoryStore:
+    """Documents kept in per-collection dicts"""
+
+    def __init__(self):
+        self._collections: Dict[str, Dict[str, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, collection: str, doc_id: str, doc: Dict[str, Any]):
+        with self._lock:
+            self._collections.setdefault(collection, {})[doc_id] = doc
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._collections.get(collection, {}).get(doc_id)
+
+    def delete(self, collection: str, doc_id: str) -> bool:
+        with self._lock:
+            return self._collections.get(collection, {}).pop(doc_id, None) is not None
+
+    def list(self, collection: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            return list(self._collections.get(collection, {}).values())
+
+class SqliteStore:
+    """Documents stored as JSON in one SQLite table, so state survives restarts"""
+
+    def __init__(self, path):
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute('''
+            CREATE TABLE IF NOT EXISTS documents (
+                collection TEXT NOT NULL,
+                id TEXT NOT NULL,
+                body TEXT NOT NULL,
+                PRIMARY KEY (collection, id)
+            )
+        ''')
+        self._conn.commit()
+
+    def put(self, collection: str, doc_id: str, doc: Dict[str, Any]):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO documents VALUES (?, ?, ?)",
+                               (collection, doc_id, json.dumps(doc)))
+            self._conn.commit()
+
+    def get(self, collection: str, doc_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._conn.execute("SELECT body FROM documents WHERE collection = ? AND id = ?",
+                                     (collection, doc_id)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def delete(self, collection: str, doc_id: str) -> bool:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM documents WHERE collection = ? AND id = ?",
+                                        (collection, doc_id))
+            self._conn.commit()
+        return cursor.rowcount > 0
+
+    def list(self, collection: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            rows = self._conn.execute("SELECT body FROM documents WHERE collection = ? ORDER BY rowid",
+                                      (collection,)).fetchall()
+        return [json.loads(row[0]) for row in rows]
+
+class OpenAPISpec:
+    """Route table and schema helpers built from an OpenAPI document"""
+
+    def __init__(self, path=SPEC_PATH):
+        with open(path, 'r', encoding='utf-8') as f:
+            self.spec = json.load(f)
+        self.routes = []
+        for template, operations in self.spec['paths'].items():
+            pattern = re.compile('^' + re.sub(r'\\{(\w+)\\}', r'(?P<\1>[^/]+)', re.escape(template)) + '$')
+            for method, operation in operations.items():
+                self.routes.append((method.upper(), template, pattern, operation))
+        # Literal paths such as /records/search/nearby must win over /records/{record_id}
+        self.routes.sort(key=lambda route: route[1].count('{'))
+
+    def match(self, method: str, path: str) -> Tuple[Optional[str], Dict[str, str], Optional[Dict[str, Any]], bool]:
+        """(template, path params, operation, path exists with another method)"""
+        path_exists = False
+        for route_method, template, pattern, operation in self.routes:
+            found = pattern.match(path)
+            if found:
+                if route_method == method:
+                    return template, found.groupdict(), operation, True
+                path_exists = True
+        return None, {}, None, path_exists
+
+    def resolve(self, schema: Dict[str, Any]) -> Dict[str, Any]:
+        while '$ref' in schema:
+            node = self.spec
+            for part in schema['$ref'].lstrip('#/').split('/'):
+                node = node[part]
+            schema = node
+        return schema
+
+    def example(self, schema: Dict[str, Any], depth: int = 0) -> Any:
+        """A value that satisfies the schema, preferring examples, defaults and enums"""
+        schema = self.resolve(schema)
+        if 'example' in schema:
+            return schema['example']
+        if 'default' in schema:
+            return schema['default']
+        if 'enum' in schema:
+            return schema['enum'][0]
+        if 'anyOf' in schema:
+            options = [option for option in schema['anyOf'] if option.get('type') != 'null']
+            return self.example(options[0], depth) if options else None
+        kind = schema.get('type')
+        if kind == 'array':
+            return [self.example(schema.get('items', {}), depth + 1)] if depth < 3 else []
+        if kind == 'object' or 'properties' in schema:
+            return {
+                name: self.example(prop, depth + 1)
+                for name, prop in schema.get('properties', {}).items()
+                if name in schema.get('required', []) or depth == 0
+            }
+        if kind == 'integer':
+            return 0
+        if kind == 'number':
+            return 0.0
+        if kind == 'boolean':
+            return False
+        return {
+            'uuid': str(uuid.UUID(int=0)),
+            'date-time': _now(),
+            'date': _now()[:10],
+            'email': 'user@example.com'
+        }.get(schema.get('format'), 'string')
+
+    def request_schema(self, operation: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        content = operation.get('requestBody', {}).get('content', {})
+        for media_type in ('application/json', 'multipart/form-data', 'application/x-www-form-urlencoded'):
+            if media_type in content:
+                return self.resolve(content[media_type]['schema'])
+        return None
+
+    def success(self, operation: Dict[str, Any]) -> Tuple[int, Optional[Dict[str, Any]]]:
+        """Status code and schema of an operation's successful response"""
+        for status, response in operation.get('responses', {}).items():
+            if status.startswith('2'):
+                schema = response.get('content', {}).get('application/json', {}).get('schema')
+                return int(status), schema
+        return 200, None
+
+    def validate(self, operation: Dict[str, Any], query: Dict[str, str], body: Any) -> List[Dict[str, Any]]:
+        """FastAPI-style validation errors for missing required fields and bad enum values"""
+        errors = []
+        for param in operation.get('parameters', []):
+            if param['in'] == 'query' and param.get('required') and param['name'] not in query:
+                errors.append({'loc': ['query', param['name']], 'msg': 'Field required', 'type': 'missing'})
+        schema = self.request_schema(operation)
+        if schema and isinstance(body, dict):
+            for name in schema.get('required', []):
+                if body.get(name) is None:
+                    errors.append({'loc': ['body', name], 'msg': 'Field required', 'type': 'missing'})
+            for name, prop in schema.get('properties', {}).items():
+                allowed = self.resolve(prop).get('enum')
+                if allowed and name in body and body[name] not in allowed:
+                    errors.append({'loc': ['body', name], 'msg': f"Input should be one of {allowed}", 'type': 'enum'})
+        return errors
+
+def _page(items: List[Dict[str, Any]], query: Dict[str, str], default_limit: int = 100) -> List[Dict[str, Any]]:
+    skip = int(query.get('skip', 0))
+    limit = int(query.get('limit', default_limit))
+    return items[skip:skip + limit]
+
+def _filter_records(records: List[Dict[str, Any]], query: Dict[str, str]) -> List[Dict[str, Any]]:
+    for field in ('category_id', 'user_id', 'media_type'):
+        if query.get(field):
+            records = [record for record in records if str(record.get(field)) == query[field]]
+    return records
+
+def _haversine_meters(lat1: float, lng1: float, lat2: float, lng2: float) -> float:
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    a = (math.sin((phi2 - phi1) / 2) ** 2
+         + math.cos(phi1) * math.cos(phi2) * math.sin(math.radians(lng2 - lng1) / 2) ** 2)
+    return 2 * 6371000 * math.asin(math.sqrt(a))
+
+def _located(records: List[Dict[str, Any]]) -> List[Tuple[Dict[str, Any], float, float]]:
+    return [
+        (record, record['location']['latitude'], record['location']['longitude'])
+        for record in records if record.get('location')
+    ]
+
+class StubBackend:
+    """Stateful implementations of the operations the app relies on"""
+
+    def __init__(self, store, spec: OpenAPISpec, export_task_seconds: float = EXPORT_TASK_SECONDS):
+        self.store = store
+        self.spec = spec
+        self.export_task_seconds = export_task_seconds
+        if not store.list('categories'):
+            for rank, (name, category_id) in enumerate(CATEGORY_MAPPING.items()):
+                store.put('categories', category_id, {
+                    'id': category_id, 'name': name, 'title': name.title(), 'description': None,
+                    'published': True, 'rank': rank, 'created_at': _now(), 'updated_at': _now()
+                })
+        self.handlers = {
+            ('GET', '/'): lambda r: {'message': 'Corpus API stub'},
+            ('GET', '/health'): lambda r: {'status': 'healthy'},
+            ('POST', '/api/v1/auth/signup/send-otp'): self.send_otp,
+            ('POST', '/api/v1/auth/signup/resend-otp'): self.send_otp,
+            ('POST', '/api/v1/auth/login/send-otp'): self.send_otp,
+            ('POST', '/api/v1/auth/login/resend-otp'): self.send_otp,
+            ('POST', '/api/v1/auth/signup/verify-otp'): self.verify_otp,
+            ('POST', '/api/v1/auth/login/verify-otp'): self.verify_otp,
+            ('GET', '/api/v1/auth/me'): self.current_user,
+            ('GET', '/api/v1/users/'): lambda r: _page(self.store.list('users'), r['query']),
+            ('POST', '/api/v1/users/'): self.create_user,
+            ('GET', '/api/v1/users/{user_id}'): lambda r: self._get('users', r['params']['user_id']),
+            ('GET', '/api/v1/users/{user_id}/roles'): self.user_roles,
+            ('PUT', '/api/v1/users/{user_id}/roles/add'): self.add_role,
+            ('GET', '/api/v1/users/{user_id}/contributions'): self.user_contributions,
+            ('GET', '/api/v1/categories/'): lambda r: sorted(self.store.list('categories'), key=lambda c: c['rank']),
+            ('POST', '/api/v1/categories/'): self.create_category,
+            ('GET', '/api/v1/categories/{category_id}'): lambda r: self._get('categories', r['params']['category_id']),
+            ('DELETE', '/api/v1/categories/{category_id}'): self.delete_category,
+            ('GET', '/api/v1/records/'): lambda r: _page(_filter_records(self.store.list('records'), r['query']), r['query']),
+            ('POST', '/api/v1/records/'): self.create_record,
+            ('GET', '/api/v1/records/{record_id}'): lambda r: self._get('records', r['params']['record_id']),
+            ('PATCH', '/api/v1/records/{record_id}'): self.patch_record,
+            ('POST', '/api/v1/records/upload/chunk'): self.upload_chunk,
+            ('POST', '/api/v1/records/upload'): self.finalize_upload,
+            ('GET', '/api/v1/records/search/nearby'): self.search_nearby,
+            ('GET', '/api/v1/records/search/bbox'): self.search_bbox,
+            ('GET', '/api/v1/records/search/distance'): self.search_distance,
+            ('GET', '/api/v1/records/{record_id}/record-url'): self.record_url,
+            ('POST', '/api/v1/tasks/export-data'): self.create_export,
+        }
+
+    def _get(self, collection: str, doc_id: str) -> Dict[str, Any]:
+        doc = self.store.get(collection, doc_id)
+        if doc is None:
+            raise HTTPError(404, f"{collection[:-1].title()} not found")
+        return doc
+
+    def _user_for(self, request) -> Dict[str, Any]:
+        token = request['headers'].get('Authorization', '').partition(' ')[2]
+        session = self.store.get('tokens', token) if token else None
+        if session is None:
+            raise HTTPError(401, "Not authenticated")
+        return self._get('users', session['user_id'])
+
+    # Auth: any OTP is accepted
+    def send_otp(self, request):
+        return {'status': 'sent', 'message': 'OTP sent', 'reference_id': uuid.uuid4().hex[:12]}
+
+    def verify_otp(self, request):
+        body = request['body']
+        phone = body.get('phone_number', '')
+        user = next((user for user in self.store.list('users') if user['phone'] == phone), None)
+        if user is None:
+            user = self._new_user(phone, body.get('name') or phone)
+        token = uuid.uuid4().hex
+        self.store.put('tokens', token, {'user_id': user['id']})
+        user['last_login_at'] = _now()
+        self.store.put('users', user['id'], user)
+        return {'access_token': token, 'token_type': 'bearer', 'user_id': user['id'],
+                'phone_number': phone, 'roles': user['roles']}
+
+    def current_user(self, request):
+        return self._user_for(request)
+
+    def _new_user(self, phone: str, name: str) -> Dict[str, Any]:
+        user = {
+            'id': str(uuid.uuid4()), 'phone': phone, 'name': name, 'email': None, 'gender': None,
+            'date_of_birth': None, 'place': None, 'is_active': True, 'has_given_consent': True,
+            'consent_given_at': _now(), 'last_login_at': None, 'created_at': _now(), 'updated_at': _now(),
+            'roles': [{'id': 1, 'name': 'user', 'description': None}]
+        }
+        self.store.put('users', user['id'], user)
+        return user
+
+    def create_user(self, request):
+        return 201, self._new_user(request['body']['phone'], request['body']['name'])
+
+    def user_roles(self, request):
+        return self._get('users', request['params']['user_id'])['roles']
+
+    def add_role(self, request):
+        user = self._get('users', request['params']['user_id'])
+        role_id = int(request['query'].get('role_id', 0))
+        names = {1: 'user', 2: 'admin', 3: 'reviewer'}
+        if all(role['id'] != role_id for role in user['roles']):
+            user['roles'].append({'id': role_id, 'name': names.get(role_id, 'user'), 'description': None})
+            self.store.put('users', user['id'], user)
+        return user['roles']
+
+    def user_contributions(self, request):
+        user_id = request['params']['user_id']
+        records = [record for record in self.store.list('records') if record['user_id'] == user_id]
+        result = {'user_id': user_id, 'total_contributions': len(records), 'contributions_by_media_type': {}}
+        for media_type in ('text', 'audio', 'image', 'video', 'document'):
+            matching = [record for record in records if record['media_type'] == media_type]
+            result['contributions_by_media_type'][media_type] = len(matching)
+            result[f"{media_type}_contributions"] = [
+                {
+                    'id': record['uid'], 'size': record.get('file_size') or 0,
+                    'category_id': record['category_id'], 'reviewed': record['reviewed'],
+                    'title': record['title'], 'description': record.get('description'),
+                    'duration': record.get('duration_seconds'), 'timestamp': record['created_at'],
+                    'location': record.get('location'), 'release_rights': record['release_rights'],
+                    'language': record['language'], 'file_hash': record.get('file_hash'), 'snr_frequency': None
+                }
+                for record in matching
+            ]
+        return result
+
+    def create_category(self, request):
+        category = {'id': str(uuid.uuid4()), 'published': False, 'rank': 0, 'description': None,
+                    **request['body'], 'created_at': _now(), 'updated_at': _now()}
+        self.store.put('categories', category['id'], category)
+        return 201, category
+
+    def delete_category(self, request):
+        if not self.store.delete('categories', request['params']['category_id']):
+            raise HTTPError(404, "Category not found")
+        return {'message': 'Category deleted'}
+
+    def _new_record(self, fields: Dict[str, Any]) -> Dict[str, Any]:
+        record = {
+            'description': None, 'file_url': None, 'file_name': None, 'file_size': None,
+            'status': 'pending', 'location': None, 'reviewed': False, 'reviewed_by': None,
+            'reviewed_at': None, 'duration_seconds': None,
+            **fields,
+            'uid': str(uuid.uuid4()), 'created_at': _now(), 'updated_at': _now()
+        }
+        self.store.put('records', record['uid'], record)
+        return record
+
+    def create_record(self, request):
+        return 201, self._new_record(request['body'])
+
+    def patch_record(self, request):
+        record = self._get('records', request['params']['record_id'])
+        record.update({key: value for key, value in request['body'].items() if key not in ('uid', 'created_at')})
+        record['updated_at'] = _now()
+        self.store.put('records', record['uid'], record)
+        return record
+
+    def upload_chunk(self, request):
+        form = request['body']
+        upload = self.store.get('uploads', form['upload_uuid']) or {'chunks': {}, 'hash': {}}
+        chunk = form['chunk']
+        upload['chunks'][str(form['chunk_index'])] = len(chunk)
+        upload['hash'][str(form['chunk_index'])] = hashlib.sha256(chunk).hexdigest()
+        upload['total_chunks'] = int(form['total_chunks'])
+        self.store.put('uploads', form['upload_uuid'], upload)
+        return {'message': f"Chunk {form['chunk_index']} received"}
+
+    def finalize_upload(self, request):
+        form = request['body']
+        upload = self.store.get('uploads', form['upload_uuid'])
+        total = int(form['total_chunks'])
+        if upload is None or len(upload['chunks']) != total:
+            received = len(upload['chunks']) if upload else 0
+            raise HTTPError(400, f"Upload incomplete: {received} of {total} chunks received")
+        location = None
+        if form.get('latitude') and form.get('longitude'):
+            location = {'latitude': float(form['latitude']), 'longitude': float(form['longitude'])}
+        digest = hashlib.sha256(''.join(upload['hash'][str(i)] for i in range(total)).encode()).hexdigest()
+        record = self._new_record({
+            'title': form['title'], 'description': form.get('description'), 'media_type': form['media_type'],
+            'file_name': form['filename'], 'file_size': sum(upload['chunks'].values()), 'location': location,
+            'release_rights': form.get('release_rights', 'creator'), 'language': form.get('language', 'hindi'),
+            'user_id': form['user_id'], 'category_id': form['category_id'], 'file_hash': digest
+        })
+        self.store.delete('uploads', form['upload_uuid'])
+        return 201, record
+
+    def search_nearby(self, request):
+        query = request['query']
+        lat, lng = float(query['latitude']), float(query['longitude'])
+        radius = float(query['distance_meters'])
+        matches = [
+            record for record, record_lat, record_lng in _located(_filter_records(self.store.list('records'), query))
+            if _haversine_meters(lat, lng, record_lat, record_lng) <= radius
+        ]
+        return _page(matches, query)
+
+    def search_bbox(self, request):
+        query = request['query']
+        min_lat, max_lat = float(query['min_lat']), float(query['max_lat'])
+        min_lng, max_lng = float(query['min_lng']), float(query['max_lng'])
+        matches = [
+            record for record, lat, lng in _located(_filter_records(self.store.list('records'), query))
+            if min_lat <= lat <= max_lat and min_lng <= lng <= max_lng
+        ]
+        return _page(matches, query)
+
+    def search_distance(self, request):
+        query = request['query']
+        lat, lng = float(query['latitude']), float(query['longitude'])
+        max_distance = float(query.get('max_distance_meters', math.inf))
+        ranked = sorted(
+            ({**record, 'distance_meters': _haversine_meters(lat, lng, record_lat, record_lng)}
+             for record, record_lat, record_lng in _located(self.store.list('records'))),
+            key=lambda record: record['distance_meters']
+        )
+        return _page([record for record in ranked if record['distance_meters'] <= max_distance], query)
+
+    def record_url(self, request):
+        record = self._get('records', request['params']['record_id'])
+        return {'record_url': f"{request['base_url']}/files/{record['uid']}"}
+
+    # Export tasks. GET /api/v1/tasks/{id} and /download are not in openapi.json;
+    # they follow what utils.export_tasks polls.
+    def create_export(self, request):
+        task = {
+            'task_id': uuid.uuid4().hex, 'task_name': 'export_user_data',
+            'export_format': request['query'].get('export_format', 'json'),
+            'user_id': self._user_for(request)['id'] if request['headers'].get('Authorization') else None,
+            'created': time.time()
+        }
+        self.store.put('tasks', task['task_id'], task)
+        return {'task_id': task['task_id'], 'task_name': task['task_name'], 'status': 'PENDING',
+                'message': 'Export started'}
+
+    def task_status(self, task_id: str):
+        task = self._get('tasks', task_id)
+        done = time.time() - task['created'] >= self.export_task_seconds
+        status = {'task_id': task_id, 'task_name': task['task_name'], 'status': 'SUCCESS' if done else 'PENDING',
+                  'message': 'Export ready' if done else 'Export in progress'}
+        if done:
+            status['result'] = {'download_url': f"/api/v1/tasks/{task_id}/download"}
+        return status
+
+    def export_file(self, task_id: str) -> bytes:
+        task = self._get('tasks', task_id)
+        records = [record for record in self.store.list('records')
+                   if task['user_id'] is None or record['user_id'] == task['user_id']]
+        return json.dumps({'exported_at': _now(), 'records': records}, indent=2).encode('utf-8')
+
+class StubHandler(BaseHTTPRequestHandler):
+    server_version = "CorpusStub/1.0"
+    protocol_version = "HTTP/1.1"
+    # Headers and body go out as separate writes; with Nagle on, each keep-alive
+    # response waits for the client's delayed ACK (~40 ms)
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        if self.server.verbose:
+            super().log_message(format, *args)
+
+    def _send(self, status: int, payload: Any = None, body: Optional[bytes] = None,
+              content_type: str = 'application/json', headers: Optional[Dict[str, str]] = None):
+        if body is None:
+            body = b'' if payload is None else json.dumps(payload).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != 'HEAD':
+            self.wfile.write(body)
+
+    def _parse_body(self, raw: bytes) -> Any:
+        content_type = self.headers.get('Content-Type', '')
+        if content_type.startswith('multipart/form-data'):
+            message = BytesParser(policy=HTTP).parsebytes(
+                f"Content-Type: {content_type}\r\n\r\n".encode('latin-1') + raw)
+            form = {}
+            for part in message.iter_parts():
+                name = part.get_param('name', header='content-disposition')
+                payload = part.get_payload(decode=True) or b''
+                # File parts stay bytes; plain fields become strings
+                form[name] = payload if part.get_filename() or name == 'chunk' else payload.decode('utf-8')
+            return form
+        if content_type.startswith('application/x-www-form-urlencoded'):
+            return {key: values[-1] for key, values in parse_qs(raw.decode('utf-8')).items()}
+        if raw:
+            try:
+                return json.loads(raw)
+            except ValueError:
+                raise HTTPError(422, [{'loc': ['body'], 'msg': 'Invalid JSON', 'type': 'json_invalid'}])
+        return {}
+
+    def _serve_download(self, data: bytes):
+        """Serve bytes with single-range support, as the ranged export downloads expect"""
+        etag = '"' + hashlib.sha1(data).hexdigest() + '"'
+        range_header = self.headers.get('Range', '')
+        if_range = self.headers.get('If-Range')
+        found = re.match(r'bytes=(\d*)-(\d*)$', range_header)
+        if found and (not if_range or if_range == etag):
+            start = int(found.group(1)) if found.group(1) else max(0, len(data) - int(found.group(2)))
+            end = int(found.group(2)) if found.group(1) and found.group(2) else len(data) - 1
+            if start >= len(data):
+                self._send(416, headers={'Content-Range': f"bytes */{len(data)}"})
+                return
+            end = min(end, len(data) - 1)
+            self._send(206, body=data[start:end + 1], content_type='application/octet-stream',
+                       headers={'Content-Range': f"bytes {start}-{end}/{len(data)}", 'ETag': etag,
+                                'Accept-Ranges': 'bytes'})
+            return
+        self._send(200, body=data, content_type='application/octet-stream',
+                   headers={'ETag': etag, 'Accept-Ranges': 'bytes'})
+
+    def _inject_faults(self) -> bool:
+        """Apply configured latency and errors; True if the request was answered with an error"""
+        options = self.server.options
+        delay = options['latency_ms'] + random.uniform(-1, 1) * options['jitter_ms']
+        if delay > 0:
+            time.sleep(delay / 1000)
+        if options['error_rate'] and random.random() < options['error_rate']:
+            self._send(options['error_status'], {'detail': 'Injected failure'})
+            return True
+        return False
+
+    def _handle(self):
+        backend: StubBackend = self.server.backend
+        url = urlsplit(self.path)
+        path = url.path
+        query = {key: values[-1] for key, values in parse_qs(url.query).items()}
+        if path == '/api/v1/health':
+            # APIClient.health_check prefixes /api/v1 to the spec's /health
+            path = '/health'
+
+        # Read the body up front so a keep-alive connection stays in sync whatever the response
+        length = int(self.headers.get('Content-Length') or 0)
+        raw = self.rfile.read(length) if length else b''
+
+        try:
+            if self._inject_faults():
+                return
+
+            task_match = re.match(r'^/api/v1/tasks/([^/]+)(/download)?$', path)
+            if self.command == 'GET' and task_match and task_match.group(1) != 'export-data':
+                if task_match.group(2):
+                    self._serve_download(backend.export_file(task_match.group(1)))
+                else:
+                    self._send(200, backend.task_status(task_match.group(1)))
+                return
+
+            template, params, operation, path_exists = backend.spec.match(self.command, path)
+            if operation is None:
+                self._send(405 if path_exists else 404,
+                           {'detail': 'Method Not Allowed' if path_exists else 'Not Found'})
+                return
+
+            body = self._parse_body(raw)
+            errors = backend.spec.validate(operation, query, body)
+            if errors:
+                self._send(422, {'detail': errors})
+                return
+
+            request = {
+                'params': params, 'query': query, 'body': body, 'headers': self.headers,
+                'base_url': f"http://{self.headers.get('Host', 'localhost')}"
+            }
+            handler = backend.handlers.get((self.command, template))
+            default_status, schema = backend.spec.success(operation)
+            if handler is None:
+                # Operations without stored state answer with a schema example
+                self._send(default_status, backend.spec.example(schema) if schema else {'message': 'OK'})
+                return
+            result = handler(request)
+            status, payload = result if isinstance(result, tuple) else (default_status, result)
+            self._send(status, payload)
+        except HTTPError as e:
+            self._send(e.status, {'detail': e.detail})
+        except (KeyError, ValueError) as e:
+            self._send(422, {'detail': [{'loc': ['body'], 'msg': f"Invalid input: {e}", 'type': 'value_error'}]})
+        except Exception as e:
+            self._send(500, {'detail': f"Stub error: {e}"})
+
+    do_GET = do_POST = do_PUT = do_PATCH = do_DELETE = do_HEAD = _handle
+
+def start_stub_server(port: int = 0, host: str = "127.0.0.1", storage: str = "memory",
+                      db_path: str = "data/stub_backend.db", latency_ms: float = 0, jitter_ms: float = 0,
+                      error_rate: float = 0, error_status: int = 503, export_task_seconds: float = EXPORT_TASK_SECONDS,
+                      seed: Optional[int] = None, verbose: bool = False) -> ThreadingHTTPServer:
+    """Start the stub on a daemon thread; port 0 picks a free port (see server.server_address)"""
+    if seed is not None:
+        random.seed(seed)
+    if storage == "sqlite":
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        store = SqliteStore(db_path)
+    else:
+        store = MemoryStore()
+
+    server = ThreadingHTTPServer((host, port), StubHandler)
+    server.daemon_threads = True
+    server.backend = StubBackend(store, OpenAPISpec(), export_task_seconds)
+    server.options = {'latency_ms': latency_ms, 'jitter_ms': jitter_ms,
+                      'error_rate': error_rate, 'error_status': error_status}
+    server.verbose = verbose
+    threading.Thread(target=server.serve_forever, name="stub-backend", daemon=True).start()
+    return server
+
+def main():
+    parser = argparse.ArgumentParser(description="Local stand-in backend generated from openapi.json")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--storage", choices=["memory", "sqlite"], default="memory")
+    parser.add_argument("--db", default="data/stub_backend.db", help="SQLite file for --storage sqlite")
+    parser.add_argument("--latency-ms", type=float, default=0, help="Added delay per request")
+    parser.add_argument("--jitter-ms", type=float, default=0, help="Uniform +/- variation of the delay")
+    parser.add_argument("--error-rate", type=float, default=0, help="Fraction of requests that fail")
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--export-seconds", type=float, default=EXPORT_TASK_SECONDS,
+                        help="How long export tasks stay pending")
+    parser.add_argument("--seed", type=int, help="Seed for repeatable fault injection")
+    parser.add_argument("--verbose", action="store_true", help="Log every request")
+    args = parser.parse_args()
+
+    server = start_stub_server(args.port, args.host, args.storage, args.db, args.latency_ms, args.jitter_ms,
+                               args.error_rate, args.error_status, args.export_seconds, args.seed, args.verbose)
+    host, port = server.server_address[:2]
+    print(f"Stub backend on http://{host}:{port} ({args.storage} storage)")
+    print(f"Run the app with API_BASE_URL=http://{host}:{port}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
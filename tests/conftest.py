@@ -0,0 +1,10 @@
+import os
+import sys
+import tempfile
+
+# utils.database creates DATA_DIR/corpus.db on import, so point it at a scratch
+# directory before any test module imports the app code
+os.environ.setdefault("DATA_DIR", tempfile.mkdtemp(prefix="corpus-tests-"))
+os.environ.setdefault("METRICS_ENABLED", "false")
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,111 @@
+import threading
+import time
+
+from utils.contribution_summary import ContributionSummaryCache, summarize_contributions
+
+def contributions(total, public=0):
+    texts = [{'category_id': f"c{i % 3}", 'release_rights': 'public' if i < public else 'private'}
+             for i in range(total)]
+    return {'total_contributions': total, 'text_contributions': texts,
+            'contributions_by_media_type': {'text': total}}
+
+class CountingFetch:
+    def __init__(self, total=1):
+        self.total = total
+        self.calls = 0
+
+    def __call__(self, user_id):
+        self.calls += 1
+        return contributions(self.total)
+
+def test_summarize_contributions():
+    summary = summarize_contributions(contributions(5, public=2))
+    assert summary['total_contributions'] == 5
+    assert summary['unique_categories'] == 3
+    assert summary['public_count'] == 2
+    assert summary['media_counts'] == {'text': 5}
+
+def test_second_get_is_a_hit():
+    cache = ContributionSummaryCache(ttl=60, max_users=10)
+    fetch = CountingFetch()
+    assert cache.get("u1", fetch) is cache.get("u1", fetch)
+    assert fetch.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+def test_entries_expire_after_ttl():
+    cache = ContributionSummaryCache(ttl=0.05, max_users=10)
+    fetch = CountingFetch()
+    cache.get("u1", fetch)
+    time.sleep(0.1)
+    cache.get("u1", fetch)
+    assert fetch.calls == 2
+
+def test_errors_are_not_cached():
+    cache = ContributionSummaryCache(ttl=60, max_users=10)
+    assert cache.get("u1", lambda user_id: {'error': "timeout"}) == {'error': "timeout"}
+    fetch = CountingFetch(total=4)
+    assert cache.get("u1", fetch)['total_contributions'] == 4
+    assert fetch.calls == 1
+
+def test_invalidate_forces_a_refetch():
+    cache = ContributionSummaryCache(ttl=60, max_users=10)
+    fetch = CountingFetch()
+    cache.get("u1", fetch)
+    cache.invalidate("u1")
+    fetch.total = 2
+    assert cache.get("u1", fetch)['total_contributions'] == 2
+    assert fetch.calls == 2
+
+def test_least_recently_used_user_is_evicted():
+    cache = ContributionSummaryCache(ttl=60, max_users=2)
+    fetch = CountingFetch()
+    cache.get("u1", fetch)
+    cache.get("u2", fetch)
+    cache.get("u1", fetch)
+    cache.get("u3", fetch)
+    assert fetch.calls == 3
+    cache.get("u2", fetch)
+    assert fetch.calls == 4
+
+def test_fetch_racing_invalidate_is_not_stored():
+    cache = ContributionSummaryCache(ttl=60, max_users=10)
+    fetch_started = threading.Event()
+    invalidated = threading.Event()
+
+    def slow_fetch(user_id):
+        # Read the API before the user's new contribution lands
+        fetch_started.set()
+        invalidated.wait(timeout=5)
+        return contributions(1)
+
+    results = []
+    reader = threading.Thread(target=lambda: results.append(cache.get("u1", slow_fetch)))
+    reader.start()
+    assert fetch_started.wait(timeout=5)
+    cache.invalidate("u1")
+    invalidated.set()
+    reader.join(timeout=5)
+
+    # The stale result is still returned to its caller, but not cached
+    assert results[0]['total_contributions'] == 1
+    fetch = CountingFetch(total=2)
+    assert cache.get("u1", fetch)['total_contributions'] == 2
+    assert fetch.calls == 1
+
+def test_invalidate_of_another_user_does_not_block_caching():
+    cache = ContributionSummaryCache(ttl=60, max_users=10)
+
+    def fetch(user_id):
+        cache.invalidate("u2")
+        return contributions(1)
+
+    cache.get("u1", fetch)
+    other = CountingFetch()
+    cache.get("u1", other)
+    assert other.calls == 0
+
+def test_invalidate_ignores_anonymous_users():
+    cache = ContributionSummaryCache(ttl=60, max_users=10)
+    cache.invalidate(None)
+    cache.invalidate("")
+    assert cache._generations == {}
@@ -0,0 +1,50 @@
+import pytest
+
+from utils import database as database_module
+
+@pytest.fixture
+def database(tmp_path, monkeypatch):
+    monkeypatch.setattr(database_module, "DATA_DIR", tmp_path)
+    return database_module.LocalDatabase()
+
+def local_contribution(contribution_id, is_public):
+    return {
+        'id': contribution_id, 'user_id': "u1", 'category': "folk_tales", 'media_type': 'text',
+        'title': "A tale", 'language': 'telugu', 'is_public': is_public,
+        'latitude': 17.385, 'longitude': 78.4867
+    }
+
+def search_record(uid, **fields):
+    return {'uid': uid, 'user_id': "u2", 'category_id': "folk_tales", 'media_type': 'text',
+            'title': "Found nearby", 'language': 'hindi', 'release_rights': 'public',
+            'location': {'latitude': 17.386, 'longitude': 78.487}, **fields}
+
+def test_public_only_hides_private_offline_contributions(database):
+    database.create_contribution(local_contribution("public", True))
+    database.create_contribution(local_contribution("private", False))
+
+    assert {c['id'] for c in database.search_bbox(17.0, 78.0, 18.0, 79.0)} == {"public", "private"}
+    assert [c['id'] for c in database.search_bbox(17.0, 78.0, 18.0, 79.0, public_only=True)] == ["public"]
+    assert [c['id'] for c in database.search_nearby(17.385, 78.4867, 5, public_only=True)] == ["public"]
+
+def test_search_results_stay_out_of_the_corpus(database):
+    database.create_contribution(local_contribution("mine", True))
+    database.upsert_records([search_record("theirs")], source='search')
+
+    assert {c['id'] for c in database.search_bbox(17.0, 78.0, 18.0, 79.0, public_only=True)} == {"mine", "theirs"}
+    assert [c['id'] for c in database.iter_contributions()] == ["mine"]
+    assert [c['id'] for c in database.iter_changed_since()] == ["mine"]
+    assert [c['id'] for c in database.get_public_contributions()] == ["mine"]
+    assert database.get_user_contributions("u2") == []
+    assert database.media_totals()['text']['count'] == 1
+
+def test_search_results_do_not_demote_local_rows(database):
+    database.upsert_records([search_record("mine", user_id="u1")])
+    database.upsert_records([search_record("mine", user_id="u1", title="Renamed")], source='search')
+    assert [c['title'] for c in database.iter_contributions()] == ["Renamed"]
+
+def test_null_fields_are_stored_as_empty(database):
+    database.upsert_records([search_record("nulls", language=None, title=None, category_id=None)],
+                            source='search')
+    [record] = database.search_bbox(17.0, 78.0, 18.0, 79.0)
+    assert (record['language'], record['title'], record['category']) == ('', '', '')
@@ -0,0 +1,65 @@
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+from utils import export_tasks
+from utils.api_client import APIClient
+from utils.export_tasks import ExportTaskTracker
+
+class FileHandler(BaseHTTPRequestHandler):
+    body = b"exported data"
+    authorization = []
+
+    def do_GET(self):
+        FileHandler.authorization.append(self.headers.get('Authorization'))
+        self.send_response(200)
+        self.send_header('Content-Length', str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args):
+        pass
+
+@pytest.fixture
+def file_server():
+    FileHandler.authorization = []
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FileHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server.server_address[1]
+    server.shutdown()
+    server.server_close()
+
+@pytest.fixture
+def tracker(tmp_path, monkeypatch):
+    monkeypatch.setattr(export_tasks, "TASKS_DIR", tmp_path / "tasks")
+    monkeypatch.setattr(export_tasks, "DOWNLOADS_DIR", tmp_path / "downloads")
+    return lambda client: ExportTaskTracker(client, "u1")
+
+def test_session_for_keeps_the_token_on_the_api_origin():
+    client = APIClient("https://api.example.org", token="secret")
+    assert client.session_for("https://api.example.org/api/v1/tasks/t1/download") is client.session
+    for url in ("https://bucket.s3.amazonaws.com/t1.json?X-Amz-Signature=x",
+                "http://api.example.org/t1.json", "https://api.example.org:8443/t1.json"):
+        session = client.session_for(url)
+        assert session is not client.session
+        assert 'Authorization' not in session.headers
+
+@pytest.mark.parametrize("origin, expected", [("127.0.0.1", "Bearer secret"), ("localhost", None)])
+def test_download_sends_token_only_to_the_api_origin(tracker, file_server, origin, expected):
+    client = APIClient(f"http://127.0.0.1:{file_server}", token="secret")
+    exports = tracker(client)
+    exports._set_task("t1", status=export_tasks.POLLING, format='json')
+    exports._download("t1", {'result': {'download_url': f"http://{origin}:{file_server}/t1.json"}})
+
+    assert set(FileHandler.authorization) == {expected}
+    task = exports.state['tasks']['t1']
+    assert task['status'] == export_tasks.READY
+    assert open(task['path'], 'rb').read() == FileHandler.body
+
+@pytest.mark.parametrize("task_id", ["../../etc/passwd", "a/b", "t1.json", "", None])
+def test_track_rejects_unsafe_task_ids(tracker, task_id):
+    exports = tracker(APIClient("http://127.0.0.1:9"))
+    with pytest.raises(ValueError):
+        exports.track(task_id)
+    assert exports.state['tasks'] == {}
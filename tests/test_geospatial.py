@@ -0,0 +1,131 @@
+import numpy as np
+import pytest
+
+from utils.geospatial import GeoTileCache, calculate_distance, haversine_distances, nearest_k, rank_by_distance
+
+# Delhi, with points nearby, across the antimeridian, at the poles and antipodal
+ORIGIN = (28.6139, 77.2090)
+POINTS = [
+    (28.6139, 77.2090),
+    (28.7041, 77.1025),
+    (19.0760, 72.8777),
+    (12.9716, 77.5946),
+    (-33.8688, 151.2093),
+    (51.5074, -0.1278),
+    (64.8378, -147.7164),
+    (-17.7134, 178.0650),
+    (-16.5780, -179.9990),
+    (90.0, 0.0),
+    (-90.0, 0.0),
+    (-28.6139, -102.7910),
+]
+
+def test_haversine_distances_match_calculate_distance():
+    lats, lons = zip(*POINTS)
+    distances = haversine_distances(*ORIGIN, lats, lons)
+    expected = [calculate_distance(*ORIGIN, lat, lon) for lat, lon in POINTS]
+    assert distances.shape == (len(POINTS),)
+    np.testing.assert_allclose(distances, expected, rtol=1e-9, atol=1e-6)
+
+def test_haversine_distances_random_pairs():
+    rng = np.random.default_rng(42)
+    lats = rng.uniform(-90, 90, 500)
+    lons = rng.uniform(-180, 180, 500)
+    for latitude, longitude in zip(rng.uniform(-90, 90, 5), rng.uniform(-180, 180, 5)):
+        expected = [calculate_distance(latitude, longitude, lat, lon) for lat, lon in zip(lats, lons)]
+        np.testing.assert_allclose(haversine_distances(latitude, longitude, lats, lons), expected,
+                                   rtol=1e-9, atol=1e-6)
+
+def test_haversine_distances_empty_input():
+    assert haversine_distances(*ORIGIN, [], []).shape == (0,)
+
+@pytest.mark.parametrize("k", [1, 3, len(POINTS) - 1, len(POINTS), len(POINTS) + 5])
+def test_nearest_k_matches_sorted_calculate_distance(k):
+    lats, lons = zip(*POINTS)
+    indices, distances = nearest_k(*ORIGIN, lats, lons, k)
+    expected = sorted((calculate_distance(*ORIGIN, lat, lon), i) for i, (lat, lon) in enumerate(POINTS))
+    expected = expected[:min(k, len(POINTS))]
+    assert indices.tolist() == [i for _, i in expected]
+    np.testing.assert_allclose(distances, [d for d, _ in expected], rtol=1e-9, atol=1e-6)
+
+def test_nearest_k_random_points():
+    rng = np.random.default_rng(7)
+    lats = rng.uniform(-90, 90, 2000)
+    lons = rng.uniform(-180, 180, 2000)
+    indices, distances = nearest_k(10.0, 20.0, lats, lons, 25)
+    expected = sorted(range(len(lats)), key=lambda i: calculate_distance(10.0, 20.0, lats[i], lons[i]))[:25]
+    assert indices.tolist() == expected
+    assert np.all(np.diff(distances) >= 0)
+
+def test_nearest_k_keeps_input_order_for_ties():
+    indices, distances = nearest_k(0.0, 0.0, [1.0, 0.0, 1.0, 1.0], [0.0, 0.0, 0.0, 0.0], 3)
+    assert indices.tolist() == [1, 0, 2]
+    assert distances[1] == distances[2]
+
+@pytest.mark.parametrize("k", [0, -1])
+def test_nearest_k_non_positive_k(k):
+    indices, distances = nearest_k(*ORIGIN, [1.0], [2.0], k)
+    assert indices.size == 0 and distances.size == 0
+
+def test_nearest_k_empty_input():
+    indices, distances = nearest_k(*ORIGIN, [], [], 5)
+    assert indices.size == 0 and distances.size == 0
+
+def test_rank_by_distance_annotates_and_keeps_unlocated_last():
+    records = [
+        {'id': "far", 'latitude': 12.9716, 'longitude': 77.5946},
+        {'id': "none"},
+        {'id': "near", 'location': {'latitude': 28.7041, 'longitude': 77.1025}},
+    ]
+    ranked = rank_by_distance(records, *ORIGIN)
+    assert [r['id'] for r in ranked] == ["near", "far", "none"]
+    assert ranked[0]['distance'] == pytest.approx(calculate_distance(*ORIGIN, 28.7041, 77.1025))
+    assert 'distance' not in records[0]
+    assert [r['id'] for r in rank_by_distance(records, *ORIGIN, limit=1)] == ["near"]
+
+class PagedFetch:
+    """Stands in for /records/search/bbox, which returns at most one page per call"""
+
+    def __init__(self, records):
+        self.records = records
+        self.calls = []
+
+    def __call__(self, min_lat, min_lng, max_lat, max_lng, skip=0, limit=100, **filters):
+        self.calls.append((skip, limit))
+        matches = [r for r in self.records
+                   if min_lat <= r['latitude'] <= max_lat and min_lng <= r['longitude'] <= max_lng]
+        return matches[skip:skip + limit]
+
+def dense_records(count):
+    # 11 m apart, all inside one zoom-9 tile
+    return [{'id': f"r{i}", 'latitude': 17.399 + i * 0.0001, 'longitude': 78.4867} for i in range(count)]
+
+def test_tile_cache_pages_dense_tiles():
+    cache = GeoTileCache(zoom=9, ttl=60, max_tiles=16, max_query_tiles=16, page_size=100)
+    fetch = PagedFetch(dense_records(250))
+    result = cache.search_bbox(fetch, 17.39, 78.48, 17.43, 78.49)
+    assert len(result['records']) == 250
+    assert fetch.calls == [(0, 100), (100, 100), (200, 100)]
+
+    # The complete tile is cached
+    assert len(cache.search_bbox(fetch, 17.39, 78.48, 17.43, 78.49)['records']) == 250
+    assert len(fetch.calls) == 3
+
+def test_tile_cache_pages_direct_queries_over_many_tiles():
+    cache = GeoTileCache(zoom=9, ttl=60, max_tiles=16, max_query_tiles=1, page_size=100)
+    fetch = PagedFetch(dense_records(150))
+    assert len(cache.search_bbox(fetch, 10.0, 70.0, 20.0, 80.0)['records']) == 150
+    assert len(fetch.calls) == 2
+
+def test_tile_cache_stops_when_skip_is_ignored():
+    cache = GeoTileCache(zoom=9, ttl=60, max_tiles=16, max_query_tiles=16, page_size=2)
+    records = dense_records(2)
+    result = cache.search_bbox(lambda *args, **kwargs: records, 17.39, 78.48, 17.43, 78.49)
+    assert len(result['records']) == 2
+
+def test_tile_cache_returns_errors_without_caching():
+    cache = GeoTileCache(zoom=9, ttl=60, max_tiles=16, max_query_tiles=16, page_size=100)
+    error = {'error': "unreachable", 'status_code': None}
+    assert cache.search_bbox(lambda *args, **kwargs: error, 17.39, 78.48, 17.43, 78.49) == error
+    fetch = PagedFetch(dense_records(3))
+    assert len(cache.search_bbox(fetch, 17.39, 78.48, 17.43, 78.49)['records']) == 3
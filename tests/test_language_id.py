@@ -0,0 +1,35 @@
+import pytest
+
+from utils.language_id import SEED_TEXTS, check_language, detected_label, identify_language
+
+ENGLISH = "This is a story about my village and the old temple near the river."
+
+@pytest.mark.parametrize("selected", ["Hindi", "Telugu", "Tamil", "Bengali"])
+def test_latin_script_text_is_flagged_for_indic_selections(selected):
+    result = check_language(ENGLISH, selected)
+    assert result is not None
+    assert result['script'] == 'latin' and result['language'] is None
+    assert detected_label(result) == "Latin-script text"
+
+def test_short_or_mixed_latin_text_is_not_flagged():
+    assert check_language("OK thanks", "Hindi") is None
+    # Mostly Devanagari with an English name: the script share stays below the threshold
+    assert check_language("मेरा नाम John Smith है और मैं गाँव में रहता हूँ", "Hindi") is None
+
+def test_selection_without_known_script_is_not_flagged():
+    assert check_language(ENGLISH, "English") is None
+    assert check_language(ENGLISH, "") is None
+
+def test_matching_text_is_not_flagged():
+    assert check_language(SEED_TEXTS['hindi'], "Hindi") is None
+    assert check_language(SEED_TEXTS['bengali'], "Bengali") is None
+
+def test_other_indic_script_is_flagged_with_its_language():
+    result = check_language(SEED_TEXTS['bengali'], "Hindi")
+    assert result['language'] == 'bengali'
+    assert detected_label(result) == "Bengali"
+
+def test_identify_language_reports_script_share_for_latin_text():
+    result = identify_language(ENGLISH)
+    assert result['script'] == 'latin'
+    assert result['confidence'] == pytest.approx(1.0)
@@ -0,0 +1,156 @@
+import sqlite3
+
+import pytest
+
+from utils.session_store import MemorySessionBackend, SessionStore, SqliteSessionBackend, _key
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+@pytest.fixture
+def clock():
+    return FakeClock()
+
+@pytest.fixture(params=["memory", "sqlite"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return MemorySessionBackend()
+    return SqliteSessionBackend(tmp_path / "sessions.db")
+
+@pytest.fixture
+def make_store(backend, clock):
+    def make(**options):
+        options.setdefault('ttl', 60)
+        options.setdefault('max_age', 3600)
+        options.setdefault('sweep_interval', 3600)
+        return SessionStore(backend, clock=clock, **options)
+    return make
+
+def test_create_and_get_round_trip(make_store):
+    store = make_store()
+    sid = store.create({'user_id': "u1", 'page': "Home"})
+    assert store.get(sid)['user_id'] == "u1"
+    assert store.get("unknown") is None
+
+def test_session_ids_are_unique(make_store):
+    store = make_store()
+    sids = {store.create({'user_id': "u1"}) for _ in range(50)}
+    assert len(sids) == 50
+    assert all(len(sid) >= 32 for sid in sids)
+
+def test_backend_stores_only_hashed_ids(tmp_path, clock):
+    backend = SqliteSessionBackend(tmp_path / "sessions.db")
+    sid = SessionStore(backend, clock=clock).create({'user_id': "u1"})
+    [(stored,)] = sqlite3.connect(str(tmp_path / "sessions.db")).execute("SELECT sid FROM sessions").fetchall()
+    assert stored != sid and len(stored) == 64
+    # A copy of the store does not log anyone in
+    assert SessionStore(backend, clock=clock).get(stored) is None
+
+def test_expired_session_is_not_returned(make_store, backend, clock):
+    store = make_store(ttl=60)
+    sid = store.create({'user_id': "u1"})
+    clock.advance(59)
+    assert store.get(sid) is not None
+    clock.advance(1)
+    assert store.get(sid) is None
+    assert store.misses == 0 and store.hits == 2
+
+def test_save_slides_expiry_but_not_past_max_age(make_store, clock):
+    store = make_store(ttl=60, max_age=150)
+    sid = store.create({'user_id': "u1"})
+    for _ in range(2):
+        clock.advance(50)
+        assert store.save(sid, {'user_id': "u1"})
+    # 100 s in: beyond the first idle ttl, kept alive by the saves
+    clock.advance(40)
+    assert store.get(sid) is not None
+    clock.advance(10)
+    assert store.get(sid) is None
+    assert not store.save(sid, {'user_id': "u1"})
+
+def test_save_does_not_revive_an_expired_session(make_store, clock):
+    store = make_store(ttl=60)
+    sid = store.create({'user_id': "u1"})
+    clock.advance(61)
+    assert not store.save(sid, {'user_id': "u1"})
+    assert store.get(sid) is None
+
+def test_rotate_invalidates_the_old_id(make_store):
+    store = make_store()
+    sid = store.create({'user_id': "u1"})
+    created_at = store.get(sid)['created_at']
+    new_sid, data = store.rotate(sid)
+    assert new_sid != sid and data['user_id'] == "u1"
+    assert store.get(sid) is None
+    assert store.get(new_sid)['created_at'] == created_at
+    assert store.rotate(sid) == (None, None)
+
+def test_rotate_with_data_keeps_creation_time(make_store, clock):
+    store = make_store(ttl=60, max_age=100)
+    sid = store.create({'user_id': "u1", 'page': "Home"})
+    clock.advance(50)
+    sid, data = store.rotate(sid, {'user_id': "u1", 'page': "Contribute"})
+    assert store.get(sid)['page'] == "Contribute"
+    clock.advance(50)
+    # max_age still counts from the original login
+    assert store.rotate(sid, data) == (None, None)
+
+def test_sweep_removes_only_expired_sessions(make_store, backend, clock):
+    store = make_store(ttl=60)
+    expired = [store.create({'user_id': f"u{i}"}) for i in range(3)]
+    clock.advance(30)
+    live = store.create({'user_id': "live"})
+    clock.advance(30)
+    assert store.sweep() == 3
+    assert all(store.get(sid) is None for sid in expired)
+    assert store.get(live)['user_id'] == "live"
+
+def test_sweep_runs_on_save_after_interval(make_store, backend, clock):
+    store = make_store(ttl=60, sweep_interval=120)
+    old = store.create({'user_id': "old"})
+    clock.advance(61)
+    store.create({'user_id': "new"})
+    # Interval not reached yet: the expired row is still in the backend
+    assert backend.get(_key(old)) is not None
+    clock.advance(60)
+    store.create({'user_id': "newest"})
+    assert backend.get(_key(old)) is None
+
+def test_lru_evicts_least_recently_used(make_store):
+    store = make_store(cache_size=2)
+    first, second = store.create({'n': 1}), store.create({'n': 2})
+    store.get(first)
+    third = store.create({'n': 3})
+    assert len(store._cache) == 2
+
+    # The evicted session still loads from the backend, counted as a miss
+    misses = store.misses
+    assert store.get(second)['n'] == 2
+    assert store.misses == misses + 1
+    hits = store.hits
+    store.get(second)
+    store.get(third)
+    assert store.hits == hits + 2
+    store.get(first)
+    assert store.misses == misses + 2
+
+def test_cache_hits_skip_the_backend(make_store):
+    store = make_store()
+    sid = store.create({'user_id': "u1"})
+    hits, misses = store.hits, store.misses
+    store.get(sid)
+    store.get(sid)
+    assert (store.hits, store.misses) == (hits + 2, misses)
+
+def test_returned_data_is_a_copy(make_store):
+    store = make_store()
+    sid = store.create({'user_id': "u1"})
+    store.get(sid)['user_id'] = "someone else"
+    assert store.get(sid)['user_id'] == "u1"
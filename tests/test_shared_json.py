@@ -0,0 +1,88 @@
+import json
+import os
+import threading
+
+import pytest
+
+from utils.shared_json import SharedJsonFile, get_shared_file
+
+def write_json(path, data, mtime_ns):
+    path.write_text(json.dumps(data), encoding='utf-8')
+    # Filesystem timestamps can be coarse; pin them so each write is seen as a change
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+def test_missing_file_uses_default(tmp_path):
+    shared = SharedJsonFile(tmp_path / "missing.json", default=list)
+    assert shared.get() == ()
+    assert shared.loads == 0
+
+def test_snapshot_is_shared_and_read_only(tmp_path):
+    path = tmp_path / "users.json"
+    write_json(path, {'alice': {'id': 1}}, 1_000_000_000)
+    shared = SharedJsonFile(path)
+    first, second = shared.get(), shared.get()
+    assert first is second
+    assert shared.loads == 1
+    with pytest.raises(TypeError):
+        first['bob'] = {'id': 2}
+
+def test_reloads_when_mtime_changes(tmp_path):
+    path = tmp_path / "users.json"
+    write_json(path, {'name': "alice"}, 1_000_000_000)
+    shared = SharedJsonFile(path)
+    assert shared.get()['name'] == "alice"
+
+    # Same size, different mtime: only the stamp tells the two apart
+    write_json(path, {'name': "carol"}, 2_000_000_000)
+    assert shared.get()['name'] == "carol"
+    assert shared.loads == 2
+
+def test_reloads_when_size_changes_within_same_mtime(tmp_path):
+    path = tmp_path / "items.json"
+    write_json(path, [1], 1_000_000_000)
+    shared = SharedJsonFile(path, default=list)
+    assert shared.get() == (1,)
+    write_json(path, [1, 2], 1_000_000_000)
+    assert shared.get() == (1, 2)
+
+def test_update_does_not_change_earlier_snapshots(tmp_path):
+    shared = SharedJsonFile(tmp_path / "items.json", default=list)
+    before = shared.append({'id': 1})
+    after = shared.append({'id': 2})
+    assert before == ({'id': 1},)
+    assert after == ({'id': 1}, {'id': 2})
+    assert json.loads((tmp_path / "items.json").read_text(encoding='utf-8')) == list(after)
+
+def test_set_item_writes_through(tmp_path):
+    path = tmp_path / "users.json"
+    SharedJsonFile(path).set_item('alice', {'id': 1})
+    assert SharedJsonFile(path).get() == {'alice': {'id': 1}}
+
+def test_concurrent_appends_are_not_lost(tmp_path):
+    path = tmp_path / "contributions.json"
+    threads, per_thread = 8, 25
+    barrier = threading.Barrier(threads)
+
+    def worker(n):
+        # Each session looks the file up itself, as the app does
+        shared = get_shared_file(path, default=list)
+        barrier.wait()
+        for i in range(per_thread):
+            shared.append({'worker': n, 'i': i})
+
+    workers = [threading.Thread(target=worker, args=(n,)) for n in range(threads)]
+    for t in workers:
+        t.start()
+    for t in workers:
+        t.join()
+
+    on_disk = json.loads(path.read_text(encoding='utf-8'))
+    assert len(on_disk) == threads * per_thread
+    assert {(item['worker'], item['i']) for item in on_disk} == {
+        (n, i) for n in range(threads) for i in range(per_thread)}
+    assert list(get_shared_file(path, default=list).get()) == on_disk
+
+def test_get_shared_file_returns_one_instance_per_path(tmp_path):
+    path = tmp_path / "users.json"
+    assert get_shared_file(path) is get_shared_file(str(path))
+    assert get_shared_file(path) is not get_shared_file(tmp_path / "other.json")
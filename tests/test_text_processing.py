@@ -0,0 +1,47 @@
+from utils.text_processing import TextFeatureCache, _features_size, analyze_text, content_hash, feature_cache
+
+def test_analyze_text_is_served_from_the_cache_by_content_hash():
+    feature_cache.clear()
+    text = "मेरे गाँव में एक पुराना मंदिर है।"
+    first = analyze_text(text)
+    # An equal text in a different string object hits the same entry
+    assert analyze_text(text[:5] + text[5:]) is first
+    assert first.content_hash == content_hash(text)
+    assert first.script == 'devanagari'
+
+def test_long_texts_are_not_cached():
+    feature_cache.clear()
+    text = "word " * (feature_cache.max_text_chars // 5 + 1)
+    first = analyze_text(text)
+    assert analyze_text(text) is not first
+    assert analyze_text(text) == first
+    assert feature_cache.size == 0
+
+def test_cache_is_bounded_by_total_bytes():
+    cache = TextFeatureCache(max_entries=1000, max_bytes=20_000, max_text_chars=10_000)
+    for i in range(50):
+        cache.put(str(i), analyze_text(f"sample text number {i} " * 20))
+    assert cache.size <= 20_000
+    assert 0 < len(cache._entries) < 50
+    # Oldest entries are evicted first
+    assert cache.get("0") is None
+    assert cache.get("49") is not None
+
+def test_cache_is_bounded_by_entries_and_evicts_least_recently_used():
+    cache = TextFeatureCache(max_entries=2, max_bytes=10 ** 9, max_text_chars=10_000)
+    cache.put("a", analyze_text("a"))
+    cache.put("b", analyze_text("b"))
+    cache.get("a")
+    cache.put("c", analyze_text("c"))
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+
+def test_replacing_an_entry_keeps_the_size_accurate():
+    cache = TextFeatureCache(max_entries=10, max_bytes=10 ** 9, max_text_chars=10_000)
+    longer, other = analyze_text("a much longer text than before"), analyze_text("other")
+    cache.put("a", analyze_text("short"))
+    cache.put("a", longer)
+    cache.put("b", other)
+    assert cache.size == _features_size(longer) + _features_size(other)
+    cache.clear()
+    assert cache.size == 0 and cache.get("a") is None
@@ -1,43 +1,31 @@
 import requests
-import json
 from typing import Optional, Dict, Any
-from pathlib import Path
+from urllib.parse import urlsplit
 import streamlit as st
 from config import API_TIMEOUT, DEBUG
+from .metrics import InstrumentedSession, endpoint_label
+from .profiling import span
+from .contribution_summary import invalidate_contribution_summary
 
 class APIClient:
-    def __init__(self, base_url: str):
+    def __init__(self, base_url: str, token: Optional[str] = None):
         self.base_url = base_url.rstrip('/')
-        self.session = requests.Session()
-        self.token = self._load_token()
-        if self.token:
-            self.session.headers.update({'Authorization': f'Bearer {self.token}'})
-    
-    def _load_token(self) -> Optional[str]:
-        """Load JWT token from storage"""
-        token_file = Path("data/token.json")
-        if token_file.exists():
-            try:
-                with open(token_file, 'r') as f:
-                    data = json.load(f)
-                return data.get('access_token')
-            except:
-                return None
-        return None
-    
-    def _save_token(self, token: str):
-        """Save JWT token to storage"""
-        Path("data").mkdir(exist_ok=True)
-        with open("data/token.json", 'w') as f:
-            json.dump({'access_token': token}, f)
+        self.session = InstrumentedSession()
+        self.token = None
+        if token:
+            self.set_token(token)
+    
+    def set_token(self, token: str):
+        """Send this JWT token with every request
+        
+        The token lives only in this client; app.py persists it per browser
+        session through utils.session_store.
+        """
         self.token = token
         self.session.headers.update({'Authorization': f'Bearer {token}'})
     
     def _clear_token(self):
-        """Clear stored token"""
-        token_file = Path("data/token.json")
-        if token_file.exists():
-            token_file.unlink()
+        """Clear the token"""
         self.token = None
         self.session.headers.pop('Authorization', None)
     
@@ -50,7 +38,8 @@ class APIClient:
             kwargs['timeout'] = API_TIMEOUT
             
         try:
-            response = self.session.request(method, url, **kwargs)
+            with span(f"api {method} {endpoint_label(url)}"):
+                response = self.session.request(method, url, **kwargs)
             if response.status_code == 422:
                 # Show validation details for 422 errors
                 try:
@@ -69,7 +58,9 @@ class APIClient:
                 return {"message": "Success", "status_code": response.status_code}
                 
         except requests.exceptions.RequestException as e:
-            return {"error": str(e)}
+            # status_code is None when the backend could not be reached at all
+            status_code = e.response.status_code if e.response is not None else None
+            return {"error": str(e), "status_code": status_code}
     
     # Authentication endpoints
     def send_signup_otp(self, phone: str) -> Dict[Any, Any]:
@@ -85,7 +76,7 @@ class APIClient:
         }
         result = self.request('POST', '/auth/signup/verify-otp', json=data)
         if 'access_token' in result:
-            self._save_token(result['access_token'])
+            self.set_token(result['access_token'])
         return result
     
     def send_login_otp(self, phone: str) -> Dict[Any, Any]:
@@ -95,7 +86,7 @@ class APIClient:
         data = {'phone_number': phone, 'otp_code': otp}
         result = self.request('POST', '/auth/login/verify-otp', json=data)
         if 'access_token' in result:
-            self._save_token(result['access_token'])
+            self.set_token(result['access_token'])
         return result
     
     def get_current_user(self) -> Dict[Any, Any]:
@@ -104,6 +95,29 @@ class APIClient:
     def export_user_data(self, export_format: str = 'json') -> Dict[Any, Any]:
         return self.request('POST', '/tasks/export-data', params={'export_format': export_format})
     
+    def get_task_status(self, task_id: str) -> Dict[Any, Any]:
+        return self.request('GET', f'/tasks/{task_id}')
+    
+    def export_download_url(self, task_id: str, task_status: Optional[Dict[Any, Any]] = None) -> str:
+        """URL of a finished export file, preferring the one reported by the task"""
+        result = (task_status or {}).get('result')
+        if isinstance(result, dict):
+            url = result.get('download_url') or result.get('file_url')
+            if url:
+                return url if '://' in url else f"{self.base_url}/{url.lstrip('/')}"
+        return f"{self.base_url}/api/v1/tasks/{task_id}/download"
+    
+    def session_for(self, url: str) -> requests.Session:
+        """Session to fetch url with: the authenticated one only for the API's own origin
+        
+        Export URLs may point at another host, such as a presigned S3/GCS link;
+        those get a plain session so the bearer token is never sent there.
+        """
+        target, base = urlsplit(url), urlsplit(self.base_url)
+        if (target.scheme, target.netloc) == (base.scheme, base.netloc):
+            return self.session
+        return requests.Session()
+    
     def logout(self):
         self._clear_token()
     
@@ -133,7 +147,10 @@ class APIClient:
     
     # Records
     def create_record(self, record_data: Dict[Any, Any]) -> Dict[Any, Any]:
-        return self.request('POST', '/records/', json=record_data)
+        result = self.request('POST', '/records/', json=record_data)
+        if 'error' not in result:
+            invalidate_contribution_summary(record_data.get('user_id'))
+        return result
     
     def get_user_contributions(self, user_id: str) -> Dict[Any, Any]:
         return self.request('GET', f'/users/{user_id}/contributions')
@@ -0,0 +1,99 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Callable
+from config import SUMMARY_CACHE_TTL_SECONDS, SUMMARY_CACHE_MAX_USERS, DASHBOARD_RECENT_LIMIT
+
+MEDIA_LISTS = ('text_contributions', 'audio_contributions', 'video_contributions',
+               'image_contributions', 'document_contributions')
+
+def summarize_contributions(contributions_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Pre-aggregate a /users/{id}/contributions response into the numbers the dashboard shows"""
+    all_contributions = []
+    for media_list in MEDIA_LISTS:
+        all_contributions.extend(contributions_data.get(media_list) or [])
+
+    return {
+        'total_contributions': contributions_data.get('total_contributions', 0),
+        'audio_duration': contributions_data.get('audio_duration', 0),
+        'video_duration': contributions_data.get('video_duration', 0),
+        'media_counts': dict(contributions_data.get('contributions_by_media_type') or {}),
+        'unique_categories': len(set(c.get('category_id') for c in all_contributions if c.get('category_id'))),
+        'public_count': sum(1 for c in all_contributions if c.get('release_rights') == 'public'),
+        'recent': all_contributions[:DASHBOARD_RECENT_LIMIT]
+    }
+
+class ContributionSummaryCache:
+    """Per-user dashboard summaries with TTL, LRU eviction and write-through invalidation"""
+
+    def __init__(self, ttl: float = SUMMARY_CACHE_TTL_SECONDS, max_users: int = SUMMARY_CACHE_MAX_USERS):
+        self.ttl = ttl
+        self.max_users = max_users
+        self._summaries = OrderedDict()
+        # Bumped on every invalidation, so a fetch that raced a new contribution is not stored
+        self._generations: Dict[str, int] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def _get(self, user_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entry = self._summaries.get(user_id)
+            if entry is None:
+                return None
+            fetched_at, summary = entry
+            if time.monotonic() - fetched_at > self.ttl:
+                del self._summaries[user_id]
+                return None
+            self._summaries.move_to_end(user_id)
+            return summary
+
+    def get(self, user_id: str, fetch: Callable[[str], Dict[Any, Any]]) -> Dict[str, Any]:
+        """Cached summary for user_id, fetching and summarizing on a miss
+
+        API errors are returned as-is and never cached.
+        """
+        summary = self._get(user_id)
+        if summary is not None:
+            self.hits += 1
+            return summary
+
+        self.misses += 1
+        with self._lock:
+            generation = self._generations.get(user_id, 0)
+        result = fetch(user_id)
+        if 'error' in result:
+            return result
+        summary = summarize_contributions(result)
+        with self._lock:
+            if self._generations.get(user_id, 0) == generation:
+                self._summaries[user_id] = (time.monotonic(), summary)
+                self._summaries.move_to_end(user_id)
+                while len(self._summaries) > self.max_users:
+                    evicted, _ = self._summaries.popitem(last=False)
+                    self._generations.pop(evicted, None)
+        return summary
+
+    def invalidate(self, user_id: Optional[str]):
+        """Drop a user's summary after they contribute"""
+        if not user_id:
+            return
+        with self._lock:
+            self._summaries.pop(user_id, None)
+            self._generations[user_id] = self._generations.get(user_id, 0) + 1
+
+    def clear(self):
+        """Drop every cached summary"""
+        with self._lock:
+            self._summaries.clear()
+            self._generations.clear()
+
+# Process-wide, so the summary survives reruns and is shared by a user's sessions
+summary_cache = ContributionSummaryCache()
+
+def get_contribution_summary(api_client, user_id: str) -> Dict[str, Any]:
+    """Dashboard numbers for a user; a rerun within the TTL makes no API call"""
+    return summary_cache.get(user_id, api_client.get_user_contributions)
+
+def invalidate_contribution_summary(user_id: Optional[str]):
+    summary_cache.invalidate(user_id)
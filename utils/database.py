@@ -1,14 +1,22 @@
 import json
+import math
 import sqlite3
 from datetime import datetime
 from pathlib import Path
 from config import DATA_DIR
+from .profiling import profile_methods
 
+# Kilometers per degree of latitude (and of longitude at the equator)
+KM_PER_DEGREE = 111.32
+
+@profile_methods("db")
 class LocalDatabase:
     """Simple local database for MVP using SQLite"""
     
     def __init__(self):
+        DATA_DIR.mkdir(parents=True, exist_ok=True)
         self.db_path = DATA_DIR / "corpus.db"
+        self.has_rtree = False
         self.init_database()
     
     def init_database(self):
@@ -42,13 +50,402 @@ class LocalDatabase:
                 file_size INTEGER,
                 is_public BOOLEAN DEFAULT FALSE,
                 created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                latitude REAL,
+                longitude REAL,
+                updated_at TEXT,
+                duration REAL,
+                sample_rate INTEGER,
+                width INTEGER,
+                height INTEGER,
+                source TEXT NOT NULL DEFAULT 'local',
                 FOREIGN KEY (user_id) REFERENCES users (id)
             )
         ''')
         
+        # Databases created before location support lack the coordinate columns
+        self._add_missing_columns(cursor, 'contributions', {'latitude': 'REAL', 'longitude': 'REAL'})
+        
+        self.init_spatial_index(cursor)
+        self.init_change_tracking(cursor)
+        # Added after updated_at so older databases end up with the same column order
+        self._add_missing_columns(cursor, 'contributions', {
+            'duration': 'REAL', 'sample_rate': 'INTEGER', 'width': 'INTEGER', 'height': 'INTEGER'
+        })
+        # Rows cached from API search results are marked 'search' and kept out of the corpus readers
+        self._add_missing_columns(cursor, 'contributions', {'source': "TEXT NOT NULL DEFAULT 'local'"})
+        self.init_dedup_index(cursor)
+        self.init_text_features(cursor)
+        
         conn.commit()
         conn.close()
     
+    def _add_missing_columns(self, cursor, table, columns):
+        """Add columns that are missing from an existing table"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        existing = {row[1] for row in cursor.fetchall()}
+        added = []
+        for name, column_type in columns.items():
+            if name not in existing:
+                cursor.execute(f"ALTER TABLE {table} ADD COLUMN {name} {column_type}")
+                added.append(name)
+        return added
+    
+    def init_change_tracking(self, cursor):
+        """Stamp every insert and update with a millisecond updated_at for incremental exports"""
+        if self._add_missing_columns(cursor, 'contributions', {'updated_at': 'TEXT'}):
+            cursor.execute("UPDATE contributions SET updated_at = created_at WHERE updated_at IS NULL")
+        
+        cursor.executescript('''
+            CREATE INDEX IF NOT EXISTS idx_contributions_updated ON contributions (updated_at, id);
+            
+            CREATE TRIGGER IF NOT EXISTS contributions_stamp_insert
+            AFTER INSERT ON contributions
+            BEGIN
+                UPDATE contributions SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE rowid = new.rowid;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS contributions_stamp_update
+            AFTER UPDATE ON contributions
+            WHEN new.updated_at IS old.updated_at
+            BEGIN
+                UPDATE contributions SET updated_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+                WHERE rowid = new.rowid;
+            END;
+        ''')
+    
+    def init_spatial_index(self, cursor):
+        """Index contribution coordinates with an R*Tree, kept in sync by triggers"""
+        try:
+            cursor.execute('''
+                CREATE VIRTUAL TABLE IF NOT EXISTS contributions_geo
+                USING rtree(id, min_lat, max_lat, min_lng, max_lng)
+            ''')
+        except sqlite3.OperationalError:
+            # SQLite built without the R*Tree module: fall back to a B-tree on latitude
+            cursor.execute(
+                "CREATE INDEX IF NOT EXISTS idx_contributions_lat_lng ON contributions (latitude, longitude)"
+            )
+            return
+        
+        self.has_rtree = True
+        cursor.executescript('''
+            CREATE TRIGGER IF NOT EXISTS contributions_geo_insert
+            AFTER INSERT ON contributions
+            WHEN new.latitude IS NOT NULL AND new.longitude IS NOT NULL
+            BEGIN
+                INSERT OR REPLACE INTO contributions_geo
+                VALUES (new.rowid, new.latitude, new.latitude, new.longitude, new.longitude);
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS contributions_geo_update
+            AFTER UPDATE OF latitude, longitude ON contributions
+            BEGIN
+                DELETE FROM contributions_geo WHERE id = old.rowid;
+                INSERT INTO contributions_geo
+                SELECT new.rowid, new.latitude, new.latitude, new.longitude, new.longitude
+                WHERE new.latitude IS NOT NULL AND new.longitude IS NOT NULL;
+            END;
+            
+            CREATE TRIGGER IF NOT EXISTS contributions_geo_delete
+            AFTER DELETE ON contributions
+            BEGIN
+                DELETE FROM contributions_geo WHERE id = old.rowid;
+            END;
+        ''')
+        
+        # Backfill rows that existed before the index was created
+        cursor.execute('''
+            INSERT OR IGNORE INTO contributions_geo
+            SELECT rowid, latitude, latitude, longitude, longitude FROM contributions
+            WHERE latitude IS NOT NULL AND longitude IS NOT NULL
+              AND rowid NOT IN (SELECT id FROM contributions_geo)
+        ''')
+    
+    def init_dedup_index(self, cursor):
+        """Tables for the near-duplicate indexes: MinHash/LSH for text, multi-index hashing for images"""
+        cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS text_signatures (
+                contribution_id TEXT PRIMARY KEY,
+                signature BLOB NOT NULL
+            );
+            
+            CREATE TABLE IF NOT EXISTS text_lsh_buckets (
+                band INTEGER NOT NULL,
+                bucket INTEGER NOT NULL,
+                contribution_id TEXT NOT NULL,
+                PRIMARY KEY (band, bucket, contribution_id)
+            ) WITHOUT ROWID;
+            
+            CREATE INDEX IF NOT EXISTS idx_lsh_buckets_contribution ON text_lsh_buckets (contribution_id);
+            
+            CREATE TABLE IF NOT EXISTS image_hashes (
+                contribution_id TEXT PRIMARY KEY,
+                phash INTEGER NOT NULL,
+                dhash INTEGER NOT NULL
+            );
+            
+            CREATE TABLE IF NOT EXISTS image_hash_chunks (
+                chunk INTEGER NOT NULL,
+                value INTEGER NOT NULL,
+                contribution_id TEXT NOT NULL,
+                PRIMARY KEY (chunk, value, contribution_id)
+            ) WITHOUT ROWID;
+            
+            CREATE INDEX IF NOT EXISTS idx_hash_chunks_contribution ON image_hash_chunks (contribution_id);
+        ''')
+    
+    def init_text_features(self, cursor):
+        """Precomputed text statistics and tokens, with an inverted index for search"""
+        cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS text_features (
+                contribution_id TEXT PRIMARY KEY,
+                content_hash TEXT NOT NULL,
+                script TEXT,
+                sentence_count INTEGER NOT NULL,
+                token_count INTEGER NOT NULL,
+                char_count INTEGER NOT NULL,
+                tokens TEXT NOT NULL
+            );
+            
+            CREATE TABLE IF NOT EXISTS text_tokens (
+                token TEXT NOT NULL,
+                contribution_id TEXT NOT NULL,
+                PRIMARY KEY (token, contribution_id)
+            ) WITHOUT ROWID;
+            
+            CREATE INDEX IF NOT EXISTS idx_text_tokens_contribution ON text_tokens (contribution_id);
+        ''')
+    
+    def save_text_features(self, entries):
+        """Store (contribution_id, TextFeatures) pairs and index their distinct tokens"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for contribution_id, features in entries:
+                conn.execute("DELETE FROM text_tokens WHERE contribution_id = ?", (contribution_id,))
+                conn.execute(
+                    "INSERT OR REPLACE INTO text_features VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (contribution_id, features.content_hash, features.script, features.sentence_count,
+                     features.token_count, features.char_count, ' '.join(features.tokens))
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO text_tokens VALUES (?, ?)",
+                    [(token, contribution_id) for token in set(features.tokens)]
+                )
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def get_text_hashes(self, contribution_ids):
+        """Content hashes of already processed texts, keyed by contribution id"""
+        contribution_ids = list(contribution_ids)
+        hashes = {}
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        for start in range(0, len(contribution_ids), 500):
+            chunk = contribution_ids[start:start + 500]
+            cursor.execute(
+                f"SELECT contribution_id, content_hash FROM text_features WHERE contribution_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            hashes.update(cursor.fetchall())
+        conn.close()
+        return hashes
+    
+    def get_languages(self, contribution_ids):
+        """Selected language of each contribution, keyed by contribution id"""
+        contribution_ids = list(contribution_ids)
+        languages = {}
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        for start in range(0, len(contribution_ids), 500):
+            chunk = contribution_ids[start:start + 500]
+            cursor.execute(
+                f"SELECT id, language FROM contributions WHERE id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            languages.update(cursor.fetchall())
+        conn.close()
+        return languages
+    
+    def iter_text_tokens(self, batch_size=1000):
+        """Yield (contribution_id, tokens) for every processed text"""
+        last_id = ''
+        while True:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT contribution_id, tokens FROM text_features WHERE contribution_id > ? ORDER BY contribution_id LIMIT ?",
+                (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            conn.close()
+            if not rows:
+                return
+            for contribution_id, tokens in rows:
+                yield contribution_id, tuple(tokens.split(' ')) if tokens else ()
+            last_id = rows[-1][0]
+    
+    def search_text(self, tokens, contribution_ids=None, limit=100):
+        """Contribution ids containing all of the given tokens
+        
+        With contribution_ids, only those candidates are searched and the limit
+        does not apply, so no match among them is dropped.
+        """
+        tokens = sorted(set(tokens))
+        if not tokens:
+            return []
+        query = f'''
+            SELECT contribution_id FROM text_tokens
+            WHERE token IN ({','.join('?' * len(tokens))}){{}}
+            GROUP BY contribution_id HAVING COUNT(*) = ?
+        '''
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        ids = []
+        if contribution_ids is None:
+            cursor.execute(query.format('') + " LIMIT ?", [*tokens, len(tokens), limit])
+            ids = [row[0] for row in cursor.fetchall()]
+        else:
+            contribution_ids = list(contribution_ids)
+            for start in range(0, len(contribution_ids), 500):
+                chunk = contribution_ids[start:start + 500]
+                cursor.execute(
+                    query.format(f" AND contribution_id IN ({','.join('?' * len(chunk))})"),
+                    [*tokens, *chunk, len(tokens)]
+                )
+                ids.extend(row[0] for row in cursor.fetchall())
+        conn.close()
+        return ids
+    
+    def text_corpus_stats(self):
+        """Text count, tokens and sentences per script"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT COALESCE(script, 'unknown'), COUNT(*), SUM(token_count), SUM(sentence_count), SUM(char_count)
+            FROM text_features GROUP BY script ORDER BY COUNT(*) DESC
+        ''')
+        rows = cursor.fetchall()
+        conn.close()
+        return [
+            {'script': script, 'texts': texts, 'tokens': tokens, 'sentences': sentences, 'characters': chars}
+            for script, texts, tokens, sentences, chars in rows
+        ]
+    
+    def save_text_signatures(self, entries):
+        """Store (contribution_id, signature bytes, [(band, bucket), ...]) entries, replacing old ones"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for contribution_id, signature, buckets in entries:
+                conn.execute("DELETE FROM text_lsh_buckets WHERE contribution_id = ?", (contribution_id,))
+                conn.execute("INSERT OR REPLACE INTO text_signatures VALUES (?, ?)", (contribution_id, signature))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO text_lsh_buckets VALUES (?, ?, ?)",
+                    [(band, bucket, contribution_id) for band, bucket in buckets]
+                )
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def lsh_candidates(self, buckets):
+        """Signatures of contributions sharing at least one LSH bucket, keyed by id"""
+        if not buckets:
+            return {}
+        # One primary-key seek per band
+        condition = " OR ".join(["(band = ? AND bucket = ?)"] * len(buckets))
+        params = [value for pair in buckets for value in pair]
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT contribution_id, signature FROM text_signatures
+            WHERE contribution_id IN (SELECT contribution_id FROM text_lsh_buckets WHERE {condition})
+        ''', params)
+        rows = cursor.fetchall()
+        conn.close()
+        return dict(rows)
+    
+    def get_text_signatures(self, contribution_ids):
+        """Signatures for the given contribution ids, keyed by id"""
+        contribution_ids = list(contribution_ids)
+        signatures = {}
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        # Stay below SQLite's bound parameter limit
+        for start in range(0, len(contribution_ids), 500):
+            chunk = contribution_ids[start:start + 500]
+            cursor.execute(
+                f"SELECT contribution_id, signature FROM text_signatures WHERE contribution_id IN ({','.join('?' * len(chunk))})",
+                chunk
+            )
+            signatures.update(cursor.fetchall())
+        conn.close()
+        return signatures
+    
+    def iter_lsh_collisions(self):
+        """Yield the contribution ids of every LSH bucket holding more than one contribution"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            cursor = conn.execute('''
+                SELECT group_concat(contribution_id, char(31)) FROM text_lsh_buckets
+                GROUP BY band, bucket HAVING COUNT(*) > 1
+            ''')
+            for (ids,) in cursor:
+                yield ids.split("\x1f")
+        finally:
+            conn.close()
+    
+    def save_image_hashes(self, entries):
+        """Store (contribution_id, phash, dhash, [(chunk, value), ...]) entries, replacing old ones"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            for contribution_id, phash, dhash, chunks in entries:
+                conn.execute("DELETE FROM image_hash_chunks WHERE contribution_id = ?", (contribution_id,))
+                conn.execute("INSERT OR REPLACE INTO image_hashes VALUES (?, ?, ?)", (contribution_id, phash, dhash))
+                conn.executemany(
+                    "INSERT OR IGNORE INTO image_hash_chunks VALUES (?, ?, ?)",
+                    [(chunk, value, contribution_id) for chunk, value in chunks]
+                )
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def image_hash_candidates(self, chunk_values):
+        """(contribution_id, phash, dhash) of images matching any of {chunk: [values]} exactly"""
+        conditions = []
+        params = []
+        for chunk, values in chunk_values.items():
+            conditions.append(f"(chunk = ? AND value IN ({','.join('?' * len(values))}))")
+            params.extend([chunk, *values])
+        if not conditions:
+            return []
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(f'''
+            SELECT contribution_id, phash, dhash FROM image_hashes
+            WHERE contribution_id IN (SELECT contribution_id FROM image_hash_chunks WHERE {" OR ".join(conditions)})
+        ''', params)
+        rows = cursor.fetchall()
+        conn.close()
+        return rows
+    
+    def iter_image_hashes(self, batch_size=1000):
+        """Yield (contribution_id, phash, dhash) for every indexed image"""
+        last_id = ''
+        while True:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(
+                "SELECT contribution_id, phash, dhash FROM image_hashes WHERE contribution_id > ? ORDER BY contribution_id LIMIT ?",
+                (last_id, batch_size)
+            )
+            rows = cursor.fetchall()
+            conn.close()
+            if not rows:
+                return
+            yield from rows
+            last_id = rows[-1][0]
+    
     def create_user(self, user_id, email, name, password_hash):
         """Create new user"""
         conn = sqlite3.connect(self.db_path)
@@ -93,8 +490,9 @@ class LocalDatabase:
         cursor.execute('''
             INSERT INTO contributions 
             (id, user_id, category, media_type, title, description, language, 
-             file_path, file_hash, file_size, is_public)
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+             file_path, file_hash, file_size, is_public, latitude, longitude,
+             duration, sample_rate, width, height)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
         ''', (
             contribution_data['id'],
             contribution_data['user_id'],
@@ -106,19 +504,132 @@ class LocalDatabase:
             contribution_data.get('file_path', ''),
             contribution_data.get('file_hash', ''),
             contribution_data.get('file_size', 0),
-            contribution_data.get('is_public', False)
+            contribution_data.get('is_public', False),
+            contribution_data.get('latitude'),
+            contribution_data.get('longitude'),
+            contribution_data.get('duration'),
+            contribution_data.get('sample_rate'),
+            contribution_data.get('width'),
+            contribution_data.get('height')
         ))
         
         conn.commit()
         conn.close()
     
+    def upsert_records(self, records, source='local'):
+        """Store API records locally so location search keeps working offline
+        
+        Pass source='search' for other users' records returned by a search:
+        they serve the offline location search only and are excluded from the
+        corpus readers (exports, totals, scans). A row already stored as
+        'local' stays local.
+        """
+        rows = []
+        for record in records:
+            location = record.get('location') or {}
+            rows.append((
+                record.get('uid') or record.get('id'),
+                record.get('user_id') or '',
+                record.get('category_id') or '',
+                record.get('media_type') or '',
+                record.get('title') or '',
+                record.get('description') or '',
+                record.get('language') or '',
+                record.get('file_url') or '',
+                record.get('file_size') or 0,
+                record.get('release_rights') in ('creator', 'public'),
+                record.get('created_at') or datetime.now().isoformat(),
+                location.get('latitude', record.get('latitude')),
+                location.get('longitude', record.get('longitude')),
+                source
+            ))
+        if not rows:
+            return
+        
+        conn = sqlite3.connect(self.db_path)
+        try:
+            # UPSERT keeps the rowid stable, so the R*Tree entry is updated rather than orphaned;
+            # unchanged rows are skipped so they don't look modified to incremental exports
+            conn.executemany('''
+                INSERT INTO contributions
+                (id, user_id, category, media_type, title, description, language,
+                 file_path, file_size, is_public, created_at, latitude, longitude, source)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ON CONFLICT(id) DO UPDATE SET
+                    category = excluded.category, media_type = excluded.media_type,
+                    title = excluded.title, description = excluded.description,
+                    language = excluded.language, file_path = excluded.file_path,
+                    file_size = excluded.file_size, is_public = excluded.is_public,
+                    latitude = excluded.latitude, longitude = excluded.longitude,
+                    source = CASE WHEN source = 'local' THEN 'local' ELSE excluded.source END
+                WHERE (category, media_type, title, description, language, file_path,
+                       file_size, is_public, latitude, longitude, source)
+                   IS NOT (excluded.category, excluded.media_type, excluded.title,
+                           excluded.description, excluded.language, excluded.file_path,
+                           excluded.file_size, excluded.is_public, excluded.latitude,
+                           excluded.longitude, CASE WHEN source = 'local' THEN 'local' ELSE excluded.source END)
+            ''', [row for row in rows if row[0]])
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def search_bbox(self, min_lat, min_lng, max_lat, max_lng, category=None, media_type=None, public_only=False):
+        """Get contributions inside a bounding box with optional filters"""
+        query = '''
+            SELECT c.* FROM contributions c
+            WHERE c.latitude BETWEEN ? AND ? AND c.longitude BETWEEN ? AND ?
+        '''
+        params = [min_lat, max_lat, min_lng, max_lng]
+        if self.has_rtree:
+            # R*Tree boxes are stored as rounded-outward float32, so probe by overlap and
+            # let the exact column comparison above settle points on the boundary
+            query = '''
+                SELECT c.* FROM contributions_geo g
+                JOIN contributions c ON c.rowid = g.id
+                WHERE g.max_lat >= ? AND g.min_lat <= ? AND g.max_lng >= ? AND g.min_lng <= ?
+                  AND c.latitude BETWEEN ? AND ? AND c.longitude BETWEEN ? AND ?
+            '''
+            params = [min_lat, max_lat, min_lng, max_lng] * 2
+        
+        if public_only:
+            query += " AND c.is_public = TRUE"
+        if category:
+            query += " AND c.category = ?"
+            params.append(category)
+        if media_type:
+            query += " AND c.media_type = ?"
+            params.append(media_type)
+        
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(query, params)
+        contributions = cursor.fetchall()
+        conn.close()
+        
+        return [self._contribution_to_dict(c) for c in contributions]
+    
+    def search_nearby(self, latitude, longitude, distance_km, category=None, media_type=None, public_only=False):
+        """Get contributions within distance_km of a point, nearest first"""
+        from .geospatial import rank_by_distance
+        
+        # Prefilter with the enclosing box, then apply the exact great-circle distance
+        lat_delta = distance_km / KM_PER_DEGREE
+        lng_delta = distance_km / (KM_PER_DEGREE * max(math.cos(math.radians(latitude)), 1e-6))
+        candidates = self.search_bbox(
+            max(latitude - lat_delta, -90), max(longitude - lng_delta, -180),
+            min(latitude + lat_delta, 90), min(longitude + lng_delta, 180),
+            category, media_type, public_only
+        )
+        
+        return [c for c in rank_by_distance(candidates, latitude, longitude) if c['distance'] <= distance_km]
+    
     def get_user_contributions(self, user_id):
         """Get all contributions by user"""
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
         cursor.execute(
-            "SELECT * FROM contributions WHERE user_id = ? ORDER BY created_at DESC",
+            "SELECT * FROM contributions WHERE user_id = ? AND source = 'local' ORDER BY created_at DESC",
             (user_id,)
         )
         contributions = cursor.fetchall()
@@ -131,7 +642,7 @@ class LocalDatabase:
         conn = sqlite3.connect(self.db_path)
         cursor = conn.cursor()
         
-        query = "SELECT * FROM contributions WHERE is_public = TRUE"
+        query = "SELECT * FROM contributions WHERE is_public = TRUE AND source = 'local'"
         params = []
         
         if category:
@@ -152,6 +663,101 @@ class LocalDatabase:
         
         return [self._contribution_to_dict(c) for c in contributions]
     
+    def iter_contributions(self, batch_size=1000, public_only=False):
+        """Yield contributions in insertion order, one page at a time
+        
+        Keyset pagination on rowid keeps every page an index seek, so memory and
+        per-page cost stay constant however large the table grows.
+        """
+        last_rowid = 0
+        while True:
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            query = "SELECT rowid, * FROM contributions WHERE rowid > ? AND source = 'local'"
+            if public_only:
+                query += " AND is_public = TRUE"
+            cursor.execute(query + " ORDER BY rowid LIMIT ?", (last_rowid, batch_size))
+            rows = cursor.fetchall()
+            conn.close()
+            
+            if not rows:
+                return
+            for row in rows:
+                yield self._contribution_to_dict(row[1:])
+            last_rowid = rows[-1][0]
+    
+    def iter_changed_since(self, since_updated_at=None, since_id='', until_updated_at=None, batch_size=1000):
+        """Yield contributions changed after an (updated_at, id) watermark, oldest change first"""
+        last_key = (since_updated_at or '', since_id or '')
+        while True:
+            query = "SELECT * FROM contributions WHERE (updated_at, id) > (?, ?) AND source = 'local'"
+            params = list(last_key)
+            if until_updated_at:
+                query += " AND updated_at < ?"
+                params.append(until_updated_at)
+            query += " ORDER BY updated_at, id LIMIT ?"
+            params.append(batch_size)
+            
+            conn = sqlite3.connect(self.db_path)
+            cursor = conn.cursor()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            conn.close()
+            
+            if not rows:
+                return
+            for row in rows:
+                yield self._contribution_to_dict(row)
+            last = self._contribution_to_dict(rows[-1])
+            last_key = (last['updated_at'], last['id'])
+    
+    def contribution_ids_without_metadata(self):
+        """Ids of audio, video and image contributions with no extracted metadata yet"""
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute('''
+            SELECT id FROM contributions
+            WHERE media_type IN ('audio', 'video', 'image') AND duration IS NULL AND width IS NULL
+              AND source = 'local'
+        ''')
+        ids = {row[0] for row in cursor.fetchall()}
+        conn.close()
+        return ids
+    
+    def update_media_metadata(self, entries):
+        """Store extracted (contribution_id, metadata) pairs"""
+        conn = sqlite3.connect(self.db_path)
+        try:
+            conn.executemany(
+                "UPDATE contributions SET duration = ?, sample_rate = ?, width = ?, height = ? WHERE id = ?",
+                [(metadata.get('duration'), metadata.get('sample_rate'), metadata.get('width'),
+                  metadata.get('height'), contribution_id) for contribution_id, metadata in entries]
+            )
+            conn.commit()
+        finally:
+            conn.close()
+    
+    def media_totals(self, user_ids=None):
+        """Per media type count, total duration and total size, optionally for some users only"""
+        query = '''
+            SELECT media_type, COUNT(*), COALESCE(SUM(duration), 0), COALESCE(SUM(file_size), 0)
+            FROM contributions WHERE source = 'local'
+        '''
+        params = []
+        if user_ids:
+            user_ids = list(user_ids)
+            query += f" AND user_id IN ({','.join('?' * len(user_ids))})"
+            params = user_ids
+        conn = sqlite3.connect(self.db_path)
+        cursor = conn.cursor()
+        cursor.execute(query + " GROUP BY media_type", params)
+        rows = cursor.fetchall()
+        conn.close()
+        return {
+            media_type: {'count': count, 'duration': duration, 'bytes': size}
+            for media_type, count, duration, size in rows
+        }
+    
     def _contribution_to_dict(self, contribution):
         """Convert contribution tuple to dictionary"""
         return {
@@ -166,7 +772,14 @@ class LocalDatabase:
             'file_hash': contribution[8],
             'file_size': contribution[9],
             'is_public': bool(contribution[10]),
-            'created_at': contribution[11]
+            'created_at': contribution[11],
+            'latitude': contribution[12],
+            'longitude': contribution[13],
+            'updated_at': contribution[14],
+            'duration': contribution[15],
+            'sample_rate': contribution[16],
+            'width': contribution[17],
+            'height': contribution[18]
         }
 
 # Global database instance
@@ -0,0 +1,319 @@
+import hashlib
+from concurrent.futures import ProcessPoolExecutor
+from itertools import combinations, islice
+from typing import Optional, List, Dict, Any, Iterable, Iterator, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import NEAR_DUPLICATE_THRESHOLD, DEDUP_WORKERS, IMAGE_DUPLICATE_DISTANCE
+from .text_processing import analyze_text, process_corpus
+
+# Character shingles work for every script without needing a word segmenter
+SHINGLE_SIZE = 5
+
+# 16 bands of 8 rows put the LSH S-curve's midpoint near 0.7 Jaccard similarity
+NUM_PERM = 128
+LSH_BANDS = 16
+ROWS_PER_BAND = NUM_PERM // LSH_BANDS
+
+# Texts shorter than this (after normalization) are too short to call near-duplicates
+MIN_TEXT_CHARS = 30
+
+# 64-bit image hashes are split into 4 chunks of 16 bits for multi-index hashing
+HASH_CHUNKS = 4
+CHUNK_BITS = 16
+
+# Fixed seed: stored signatures are only comparable if every process uses the same hash functions
+_rng = np.random.default_rng(0x5EED)
+_PERM_A = _rng.integers(1, 2 ** 63, NUM_PERM, dtype=np.uint64) | np.uint64(1)
+_PERM_B = _rng.integers(0, 2 ** 63, NUM_PERM, dtype=np.uint64)
+_SHINGLE_POWERS = np.uint64(1000003) ** np.arange(SHINGLE_SIZE - 1, -1, -1, dtype=np.uint64)
+
+# Joiners change how Indic text renders, not what it says
+_JOINERS = dict.fromkeys(map(ord, '\u200c\u200d'))
+
+def shingle_text(text: Optional[str] = None, tokens: Optional[Iterable[str]] = None) -> str:
+    """Space-joined word tokens, so punctuation, case and spacing edits don't change shingles"""
+    if tokens is None:
+        tokens = analyze_text(text or '').tokens
+    return ' '.join(tokens).translate(_JOINERS)
+
+def shingle_hashes(text: str) -> np.ndarray:
+    """Unique 64-bit hashes of the character shingles of normalized text"""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    if len(codes) < SHINGLE_SIZE:
+        return np.empty(0, dtype=np.uint64)
+    # Polynomial hash of every window at once; uint64 arithmetic wraps modulo 2**64
+    return np.unique((sliding_window_view(codes, SHINGLE_SIZE) * _SHINGLE_POWERS).sum(axis=1))
+
+def minhash_signature(shingles: np.ndarray) -> np.ndarray:
+    """MinHash signature from multiply-shift hashes of the shingles"""
+    signature = np.full(NUM_PERM, np.iinfo(np.uint32).max, dtype=np.uint64)
+    # Blocks bound the (shingles x permutations) matrix for long texts
+    for start in range(0, len(shingles), 4096):
+        block = shingles[start:start + 4096, None]
+        hashed = (block * _PERM_A + _PERM_B) >> np.uint64(32)
+        np.minimum(signature, hashed.min(axis=0), out=signature)
+    return signature.astype(np.uint32)
+
+def lsh_buckets(signature: np.ndarray) -> List[Tuple[int, int]]:
+    """(band, bucket) keys; texts sharing any bucket become candidate duplicates"""
+    buckets = []
+    for band in range(LSH_BANDS):
+        rows = signature[band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND].tobytes()
+        digest = hashlib.blake2b(rows, digest_size=8).digest()
+        # Signed so the bucket fits a SQLite INTEGER
+        buckets.append((band, int.from_bytes(digest, 'little', signed=True)))
+    return buckets
+
+def text_signature(text: Optional[str] = None, tokens: Optional[Iterable[str]] = None) -> Optional[np.ndarray]:
+    """MinHash signature of a text or its precomputed tokens, or None if too short to compare"""
+    normalized = shingle_text(text, tokens)
+    if len(normalized) < MIN_TEXT_CHARS:
+        return None
+    return minhash_signature(shingle_hashes(normalized))
+
+def _signatures_from_blobs(blobs: List[bytes]) -> np.ndarray:
+    return np.frombuffer(b''.join(blobs), dtype=np.uint32).reshape(len(blobs), NUM_PERM)
+
+def find_near_duplicates(text: str, threshold: float = NEAR_DUPLICATE_THRESHOLD,
+                         exclude_id: Optional[str] = None, database=None) -> List[Dict[str, Any]]:
+    """Indexed texts whose estimated Jaccard similarity to text is at least threshold"""
+    if database is None:
+        from .database import db as database
+    signature = text_signature(text)
+    if signature is None:
+        return []
+
+    candidates = database.lsh_candidates(lsh_buckets(signature))
+    candidates.pop(exclude_id, None)
+    if not candidates:
+        return []
+
+    ids = list(candidates)
+    # Fraction of matching MinHash rows estimates Jaccard similarity
+    similarities = (_signatures_from_blobs(list(candidates.values())) == signature).mean(axis=1)
+    matches = [
+        {'id': contribution_id, 'similarity': float(similarity)}
+        for contribution_id, similarity in zip(ids, similarities)
+        if similarity >= threshold
+    ]
+    return sorted(matches, key=lambda match: match['similarity'], reverse=True)
+
+def index_text(contribution_id: str, text: Optional[str] = None, tokens: Optional[Iterable[str]] = None,
+               database=None) -> bool:
+    """Add a text contribution to the near-duplicate index"""
+    if database is None:
+        from .database import db as database
+    signature = text_signature(text, tokens)
+    if signature is None:
+        return False
+    database.save_text_signatures([(contribution_id, signature.tobytes(), lsh_buckets(signature))])
+    return True
+
+def _signature_entry(item: Tuple[str, Tuple[str, ...]]) -> Optional[Tuple[str, bytes, List[Tuple[int, int]]]]:
+    """Worker process job: signature and buckets for one text's tokens"""
+    contribution_id, tokens = item
+    signature = text_signature(tokens=tokens)
+    if signature is None:
+        return None
+    return contribution_id, signature.tobytes(), lsh_buckets(signature)
+
+def build_text_index(database=None, workers: int = DEDUP_WORKERS, batch_size: int = 2000) -> int:
+    """(Re)index every local text contribution using a process pool, returning the count
+
+    Texts are tokenized once by text_processing.process_corpus; signatures are
+    built from the stored tokens rather than re-tokenizing.
+    """
+    if database is None:
+        from .database import db as database
+    process_corpus(database, workers)
+    items = database.iter_text_tokens()
+    indexed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        # Batches keep only batch_size texts in memory instead of the whole corpus
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+            entries = [entry for entry in executor.map(_signature_entry, batch, chunksize=64) if entry]
+            database.save_text_signatures(entries)
+            indexed += len(entries)
+    return indexed
+
+def _clusters_from_pairs(pairs: Iterable[Tuple[str, str]]) -> List[List[str]]:
+    """Connected components of duplicate pairs, largest first"""
+    parent: Dict[str, str] = {}
+
+    def find(x: str) -> str:
+        parent.setdefault(x, x)
+        while parent[x] != x:
+            # Path halving keeps the trees shallow
+            parent[x] = parent[parent[x]]
+            x = parent[x]
+        return x
+
+    for a, b in pairs:
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[root_b] = root_a
+
+    clusters: Dict[str, List[str]] = {}
+    for contribution_id in list(parent):
+        clusters.setdefault(find(contribution_id), []).append(contribution_id)
+    return sorted((sorted(members) for members in clusters.values() if len(members) > 1),
+                  key=len, reverse=True)
+
+def _similar_text_pairs(threshold: float, database) -> Iterator[Tuple[str, str]]:
+    """Verified near-duplicate pairs among contributions sharing an LSH bucket"""
+    signatures: Dict[str, bytes] = {}
+    for group in database.iter_lsh_collisions():
+        missing = [contribution_id for contribution_id in group if contribution_id not in signatures]
+        if missing:
+            signatures.update(database.get_text_signatures(missing))
+        matrix = _signatures_from_blobs([signatures[contribution_id] for contribution_id in group])
+        for i in range(len(group) - 1):
+            similar = (matrix[i + 1:] == matrix[i]).mean(axis=1) >= threshold
+            for j in np.nonzero(similar)[0]:
+                yield group[i], group[i + 1 + j]
+
+def find_duplicate_clusters(threshold: float = NEAR_DUPLICATE_THRESHOLD,
+                            database=None) -> List[List[str]]:
+    """Group indexed texts into clusters of near-duplicates, largest first
+
+    Only contributions sharing an LSH bucket are compared, so the work grows
+    with the number of candidate pairs rather than quadratically with the corpus.
+    """
+    if database is None:
+        from .database import db as database
+    return _clusters_from_pairs(_similar_text_pairs(threshold, database))
+
+def run_dedup_job(threshold: float = NEAR_DUPLICATE_THRESHOLD, workers: int = DEDUP_WORKERS) -> Dict[str, Any]:
+    """Batch job: index the whole text corpus, then cluster near-duplicates"""
+    indexed = build_text_index(workers=workers)
+    clusters = find_duplicate_clusters(threshold)
+    return {
+        'indexed': indexed,
+        'clusters': clusters,
+        'duplicates': sum(len(cluster) - 1 for cluster in clusters)
+    }
+
+def _to_signed64(value: int) -> int:
+    """SQLite integers are signed 64-bit"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+def _to_unsigned64(value: int) -> int:
+    return value & ((1 << 64) - 1)
+
+def hamming_distance(a: int, b: int) -> int:
+    return bin(_to_unsigned64(a) ^ _to_unsigned64(b)).count('1')
+
+def _hash_chunks(phash: int) -> List[int]:
+    """Split a 64-bit hash into HASH_CHUNKS values, most significant first"""
+    mask = (1 << CHUNK_BITS) - 1
+    return [(phash >> (CHUNK_BITS * (HASH_CHUNKS - 1 - i))) & mask for i in range(HASH_CHUNKS)]
+
+_chunk_masks: Dict[int, List[int]] = {}
+
+def _masks_within(radius: int) -> List[int]:
+    """Every CHUNK_BITS-bit XOR mask with at most radius bits set"""
+    if radius not in _chunk_masks:
+        _chunk_masks[radius] = [
+            sum(1 << bit for bit in bits)
+            for r in range(radius + 1)
+            for bits in combinations(range(CHUNK_BITS), r)
+        ]
+    return _chunk_masks[radius]
+
+def index_image(contribution_id: str, phash: int, dhash: int, database=None):
+    """Add an image's perceptual hashes to the near-duplicate index"""
+    if database is None:
+        from .database import db as database
+    chunks = list(enumerate(_hash_chunks(_to_unsigned64(phash))))
+    database.save_image_hashes([(contribution_id, _to_signed64(phash), _to_signed64(dhash), chunks)])
+
+def find_similar_images(phash: int, dhash: int, max_distance: int = IMAGE_DUPLICATE_DISTANCE,
+                        exclude_id: Optional[str] = None, database=None) -> List[Dict[str, Any]]:
+    """Indexed images within max_distance bits of both hashes, closest first
+
+    Multi-index hashing: if two 64-bit hashes differ in at most max_distance
+    bits, at least one of their four 16-bit chunks differs in at most
+    max_distance // 4 bits. Probing those chunk neighbourhoods through the
+    index finds every match without scanning the table.
+    """
+    if database is None:
+        from .database import db as database
+    phash = _to_unsigned64(phash)
+    masks = _masks_within(max_distance // HASH_CHUNKS)
+    probes = {chunk: [value ^ mask for mask in masks] for chunk, value in enumerate(_hash_chunks(phash))}
+
+    matches = []
+    for contribution_id, candidate_phash, candidate_dhash in database.image_hash_candidates(probes):
+        if contribution_id == exclude_id:
+            continue
+        phash_distance = hamming_distance(phash, candidate_phash)
+        dhash_distance = hamming_distance(dhash, candidate_dhash)
+        # Requiring both hashes to agree filters out pHash collisions between different images
+        if phash_distance <= max_distance and dhash_distance <= max_distance:
+            matches.append({'id': contribution_id, 'distance': phash_distance, 'dhash_distance': dhash_distance})
+    return sorted(matches, key=lambda match: (match['distance'], match['dhash_distance']))
+
+def _image_hash_entry(item: Tuple[str, str]) -> Optional[Tuple[str, int, int]]:
+    """Worker process job: perceptual hashes of one image file"""
+    from .file_handler import perceptual_hashes
+    contribution_id, path = item
+    try:
+        return (contribution_id, *perceptual_hashes(path))
+    except (OSError, ValueError):
+        # Unreadable or truncated images are skipped rather than failing the batch
+        return None
+
+def iter_image_items(database=None) -> Iterator[Tuple[str, str]]:
+    """Yield (contribution id, file path) for every image upload on disk"""
+    from .shard_export import iter_media_items
+    for _, path, metadata in iter_media_items(database):
+        if str(metadata.get('media_type', '')).lower() == 'image':
+            yield metadata['id'], str(path)
+
+def build_image_index(database=None, workers: int = DEDUP_WORKERS, batch_size: int = 500) -> int:
+    """(Re)hash every local image upload using a process pool, returning the count"""
+    if database is None:
+        from .database import db as database
+    items = iter_image_items(database)
+    indexed = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+            entries = [
+                (contribution_id, _to_signed64(phash), _to_signed64(dhash), list(enumerate(_hash_chunks(phash))))
+                for contribution_id, phash, dhash in filter(None, executor.map(_image_hash_entry, batch, chunksize=16))
+            ]
+            database.save_image_hashes(entries)
+            indexed += len(entries)
+    return indexed
+
+def find_image_clusters(max_distance: int = IMAGE_DUPLICATE_DISTANCE, database=None) -> List[List[str]]:
+    """Group indexed images into clusters of near-duplicates, largest first"""
+    if database is None:
+        from .database import db as database
+
+    def pairs():
+        for contribution_id, phash, dhash in database.iter_image_hashes():
+            for match in find_similar_images(phash, dhash, max_distance, contribution_id, database):
+                # Each pair is found from both ends; keep one
+                if contribution_id < match['id']:
+                    yield contribution_id, match['id']
+
+    return _clusters_from_pairs(pairs())
+
+def run_image_dedup_job(max_distance: int = IMAGE_DUPLICATE_DISTANCE,
+                        workers: int = DEDUP_WORKERS) -> Dict[str, Any]:
+    """Batch job: hash every image upload, then cluster near-duplicates"""
+    indexed = build_image_index(workers=workers)
+    clusters = find_image_clusters(max_distance)
+    return {
+        'indexed': indexed,
+        'clusters': clusters,
+        'duplicates': sum(len(cluster) - 1 for cluster in clusters)
+    }
\ No newline at end of file
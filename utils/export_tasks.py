@@ -0,0 +1,338 @@
+import json
+import os
+import random
+import re
+import threading
+import time
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Callable, Tuple
+from config import (API_TIMEOUT, EXPORT_DIR, EXPORT_POLL_INTERVAL_SECONDS, EXPORT_POLL_MAX_SECONDS,
+                    EXPORT_TASK_TIMEOUT_SECONDS, EXPORT_DOWNLOAD_PART_BYTES, EXPORT_DOWNLOAD_WORKERS,
+                    EXPORT_DOWNLOAD_RETRIES)
+from .metrics import record_retry
+
+TASKS_DIR = EXPORT_DIR / "tasks"
+DOWNLOADS_DIR = EXPORT_DIR / "downloads"
+
+# Status strings the backend task queue reports once a task has finished
+TASK_SUCCEEDED = {"success", "succeeded", "completed", "complete", "done", "finished"}
+TASK_FAILED = {"failure", "failed", "error", "revoked", "cancelled"}
+
+# Tracker states persisted per task
+POLLING = "polling"
+DOWNLOADING = "downloading"
+READY = "ready"
+FAILED = "failed"
+
+# Task ids become file names and URL paths, so anything else is rejected
+TASK_ID_PATTERN = re.compile(r'[A-Za-z0-9-]+')
+
+# Task status lookups that will not succeed however long we poll
+TASK_STATUS_FATAL_CODES = {401, 403, 404}
+
+class IncompleteDownload(Exception):
+    """The connection ended before the whole file arrived; the download can be resumed"""
+
+# Errors after which the task stays resumable instead of failing
+TRANSIENT_ERRORS = (requests.RequestException, OSError, IncompleteDownload)
+
+def _probe(session, url: str) -> Tuple[Optional[int], bool, Optional[str]]:
+    """Ask for the first byte to learn (size, range support, ETag) without a HEAD request"""
+    with session.get(url, headers={'Range': 'bytes=0-0'}, stream=True, timeout=API_TIMEOUT) as response:
+        if response.status_code == 416:
+            return 0, False, None
+        response.raise_for_status()
+        etag = response.headers.get('ETag')
+        if response.status_code == 206:
+            # Content-Range: bytes 0-0/<total>
+            total = response.headers.get('Content-Range', '').rpartition('/')[2]
+            return (int(total) if total.isdigit() else None), True, etag
+        length = response.headers.get('Content-Length')
+        return (int(length) if length and length.isdigit() else None), False, etag
+
+def _save_json(path: Path, data: Dict[str, Any]):
+    """Write JSON atomically"""
+    tmp_path = path.with_name(path.name + ".tmp")
+    with open(tmp_path, 'w') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _stream_download(session, url: str, part_path: Path, total: Optional[int], ranged: bool,
+                     etag: Optional[str], progress: Optional[Callable[[int, Optional[int]], None]]):
+    """Single-connection download that continues a partial file when the server allows it"""
+    offset = part_path.stat().st_size if ranged and part_path.exists() else 0
+    headers = {}
+    if offset:
+        headers['Range'] = f"bytes={offset}-"
+        if etag:
+            # The server sends the whole file instead if it changed since the partial download
+            headers['If-Range'] = etag
+
+    with session.get(url, headers=headers, stream=True, timeout=API_TIMEOUT) as response:
+        response.raise_for_status()
+        if response.status_code != 206:
+            offset = 0
+        with open(part_path, 'ab' if offset else 'wb') as f:
+            done = offset
+            for block in response.iter_content(chunk_size=1024 * 1024):
+                f.write(block)
+                done += len(block)
+                if progress:
+                    progress(done, total)
+
+def _parallel_download(session, url: str, part_path: Path, total: int, etag: Optional[str],
+                       part_size: int, max_workers: int,
+                       progress: Optional[Callable[[int, Optional[int]], None]]):
+    """Fetch fixed-size byte ranges concurrently into a preallocated file
+
+    Finished ranges are recorded in a sidecar file, so an interrupted download
+    only refetches the ranges that had not completed.
+    """
+    ranges_path = part_path.with_name(part_path.name + ".ranges.json")
+    ranges = {'size': total, 'etag': etag, 'part_size': part_size, 'done': []}
+    if ranges_path.exists() and part_path.exists():
+        with open(ranges_path, 'r') as f:
+            saved = json.load(f)
+        if (saved.get('size'), saved.get('etag'), saved.get('part_size')) == (total, etag, part_size):
+            ranges = saved
+
+    if not part_path.exists() or ranges['done'] == []:
+        with open(part_path, 'wb') as f:
+            f.truncate(total)
+        _save_json(ranges_path, ranges)
+
+    done = set(ranges['done'])
+    todo = [i for i in range(-(-total // part_size)) if i not in done]
+    lock = threading.Lock()
+    fetched = [sum(min(part_size, total - i * part_size) for i in done)]
+
+    def fetch(index: int):
+        start = index * part_size
+        end = min(start + part_size, total) - 1
+        with session.get(url, headers={'Range': f"bytes={start}-{end}"}, stream=True,
+                         timeout=API_TIMEOUT) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise IncompleteDownload("Server stopped honouring range requests")
+            with open(part_path, 'r+b') as f:
+                f.seek(start)
+                written = 0
+                for block in response.iter_content(chunk_size=1024 * 1024):
+                    f.write(block)
+                    written += len(block)
+        if written != end - start + 1:
+            raise IncompleteDownload(f"Range {start}-{end} truncated at {written} bytes")
+        with lock:
+            done.add(index)
+            ranges['done'] = sorted(done)
+            _save_json(ranges_path, ranges)
+            fetched[0] += written
+            if progress:
+                progress(fetched[0], total)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        # list() re-raises the first failed range
+        list(executor.map(fetch, todo))
+    ranges_path.unlink()
+
+def download_file(session, url: str, dest, part_size: int = EXPORT_DOWNLOAD_PART_BYTES,
+                  max_workers: int = EXPORT_DOWNLOAD_WORKERS,
+                  progress: Optional[Callable[[int, Optional[int]], None]] = None) -> Path:
+    """Download url to dest through a .part file, resuming and parallelising when ranges are supported"""
+    dest = Path(dest)
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    part_path = dest.with_name(dest.name + ".part")
+
+    total, ranged, etag = _probe(session, url)
+    if ranged and total and max_workers > 1 and total > part_size * 2:
+        _parallel_download(session, url, part_path, total, etag, part_size, max_workers, progress)
+    else:
+        _stream_download(session, url, part_path, total, ranged, etag, progress)
+
+    if total is not None and part_path.stat().st_size != total:
+        raise IncompleteDownload(f"Downloaded {part_path.stat().st_size} of {total} bytes")
+    os.replace(part_path, dest)
+    return dest
+
+class ExportTaskTracker:
+    """Polls export tasks in the background and downloads their files when done"""
+
+    def __init__(self, api_client, user_id: str, poll_interval: float = EXPORT_POLL_INTERVAL_SECONDS,
+                 max_poll_interval: float = EXPORT_POLL_MAX_SECONDS,
+                 timeout: int = EXPORT_TASK_TIMEOUT_SECONDS, max_retries: int = EXPORT_DOWNLOAD_RETRIES):
+        self.api_client = api_client
+        self.user_id = user_id
+        self.poll_interval = poll_interval
+        self.max_poll_interval = max_poll_interval
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.state_file = TASKS_DIR / f"{user_id}.json"
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads: Dict[str, threading.Thread] = {}
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Load tracked tasks"""
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {'tasks': {}}
+
+    def _set_task(self, task_id: str, **fields):
+        """Update one task and persist the change"""
+        with self._lock:
+            self.state['tasks'].setdefault(task_id, {}).update(fields)
+            TASKS_DIR.mkdir(parents=True, exist_ok=True)
+            _save_json(self.state_file, self.state)
+
+    def track(self, task_id: str, export_format: str = "json"):
+        """Start following a newly created export task"""
+        if not isinstance(task_id, str) or not TASK_ID_PATTERN.fullmatch(task_id):
+            raise ValueError(f"Invalid export task id: {task_id!r}")
+        if task_id not in self.state['tasks']:
+            self._set_task(task_id, status=POLLING, format=export_format,
+                           created_at=datetime.now().isoformat())
+        self._start(task_id)
+
+    def resume(self):
+        """Restart workers for tasks left unfinished by a previous process"""
+        for task_id, task in list(self.state['tasks'].items()):
+            if task.get('status') in (POLLING, DOWNLOADING) and TASK_ID_PATTERN.fullmatch(task_id):
+                self._start(task_id)
+
+    def _start(self, task_id: str):
+        with self._lock:
+            thread = self._threads.get(task_id)
+            if thread and thread.is_alive():
+                return
+            if self.state['tasks'].get(task_id, {}).get('status') in (READY, FAILED):
+                return
+            thread = threading.Thread(target=self._run, args=(task_id,), name=f"export-{task_id}", daemon=True)
+            self._threads[task_id] = thread
+            thread.start()
+
+    def stop(self):
+        """Ask all workers to exit; partial downloads resume on the next start"""
+        self._stop.set()
+
+    def wait(self, task_id: str, timeout: Optional[float] = None) -> Path:
+        """Block until a tracked task's file is downloaded"""
+        thread = self._threads.get(task_id)
+        if thread:
+            thread.join(timeout)
+        task = self.state['tasks'].get(task_id, {})
+        if task.get('status') != READY:
+            raise RuntimeError(task.get('error') or f"Export {task_id} is not ready")
+        return Path(task['path'])
+
+    def _run(self, task_id: str):
+        """Poll and download, retrying dropped connections with backoff
+        
+        Only failures the backend reports (or 4xx responses) mark the task
+        FAILED. After max_retries network errors the task keeps its state, so
+        the next resume() continues the partial download.
+        """
+        delay = self.poll_interval
+        for attempt in range(self.max_retries + 1):
+            try:
+                task_status = self._wait_for_task(task_id)
+                if task_status is None:
+                    return
+                self._download(task_id, task_status)
+                return
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code < 500:
+                    self._set_task(task_id, status=FAILED, error=str(e))
+                    return
+                error = e
+            except TRANSIENT_ERRORS as e:
+                error = e
+            except Exception as e:
+                self._set_task(task_id, status=FAILED, error=str(e))
+                return
+            
+            self._set_task(task_id, error=str(error), attempts=attempt + 1)
+            if attempt < self.max_retries and self._stop.wait(delay * random.uniform(0.8, 1.2)):
+                return
+            delay = min(delay * 2, self.max_poll_interval)
+
+    def _wait_for_task(self, task_id: str) -> Optional[Dict[str, Any]]:
+        """Poll with exponential backoff and jitter until the task finishes"""
+        task = self.state['tasks'][task_id]
+        if task.get('status') == DOWNLOADING:
+            # An earlier download was interrupted; this run resumes it
+            record_retry('export_download')
+            return task.get('task_status', {})
+
+        delay = self.poll_interval
+        deadline = time.time() + self.timeout
+        while not self._stop.is_set():
+            result = self.api_client.get_task_status(task_id)
+            if 'error' in result and result.get('status_code') in TASK_STATUS_FATAL_CODES:
+                raise RuntimeError(f"Export task status unavailable: {result['error']}")
+            status = str(result.get('status', '')).lower() if 'error' not in result else ''
+            if status in TASK_SUCCEEDED:
+                return result
+            if status in TASK_FAILED:
+                raise RuntimeError(result.get('message') or f"Export task {status}")
+            if time.time() >= deadline:
+                raise RuntimeError("Timed out waiting for the export to finish")
+
+            self._set_task(task_id, last_polled=datetime.now().isoformat(),
+                           message=result.get('message') or result.get('error'))
+            # Jitter keeps many sessions from polling the backend in lockstep
+            self._stop.wait(delay * random.uniform(0.8, 1.2))
+            delay = min(delay * 2, self.max_poll_interval)
+        return None
+
+    def _download(self, task_id: str, task_status: Dict[str, Any]):
+        """Fetch the finished export to disk"""
+        task = self.state['tasks'][task_id]
+        url = self.api_client.export_download_url(task_id, task_status)
+        dest = DOWNLOADS_DIR / f"{task_id}.{task.get('format', 'json')}"
+        self._set_task(task_id, status=DOWNLOADING, task_status=task_status, url=url)
+
+        def progress(done: int, total: Optional[int]):
+            # Persisting every block would dominate small downloads
+            with self._lock:
+                self.state['tasks'][task_id].update({'bytes': done, 'total': total})
+
+        session = self.api_client.session_for(url)
+        try:
+            download_file(session, url, dest, progress=progress)
+        finally:
+            if session is not self.api_client.session:
+                session.close()
+        self._set_task(task_id, status=READY, path=str(dest), bytes=dest.stat().st_size,
+                       total=dest.stat().st_size, error=None, completed_at=datetime.now().isoformat())
+
+    def tasks(self) -> List[Dict[str, Any]]:
+        """Tracked tasks, newest first, for the dashboard"""
+        with self._lock:
+            tasks = [{'task_id': task_id, **task} for task_id, task in self.state['tasks'].items()]
+        return sorted(tasks, key=lambda task: task.get('created_at', ''), reverse=True)
+
+# One tracker per user per process, so reruns never start duplicate pollers
+_trackers: Dict[str, ExportTaskTracker] = {}
+_trackers_lock = threading.Lock()
+
+def get_export_tracker(api_client, user_id: str) -> ExportTaskTracker:
+    """Get (or create) the process-wide export tracker for a user"""
+    with _trackers_lock:
+        tracker = _trackers.get(user_id)
+        if tracker is None:
+            tracker = ExportTaskTracker(api_client, user_id)
+            _trackers[user_id] = tracker
+            tracker.resume()
+        else:
+            tracker.api_client = api_client
+            # Picks up downloads whose worker gave up after repeated network errors
+            tracker.resume()
+        return tracker
\ No newline at end of file
@@ -1,9 +1,24 @@
 import os
 import hashlib
+import numpy as np
 from PIL import Image
 from pathlib import Path
+from typing import Tuple
 from config import MAX_FILE_SIZES, ALLOWED_EXTENSIONS, UPLOADS_DIR
 
+# pHash keeps the 8x8 lowest frequencies of a 32x32 DCT; dHash compares neighbours in a 9x8 thumbnail
+PHASH_SIZE = 32
+HASH_SIDE = 8
+
+def _dct_matrix(n):
+    """Orthonormal DCT-II basis, so a 2D DCT is two matrix products"""
+    k = np.arange(n)[:, None]
+    basis = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2 / n)
+    basis[0] /= np.sqrt(2)
+    return basis
+
+_DCT = _dct_matrix(PHASH_SIZE)
+
 def validate_file(file, media_type):
     """Validate uploaded file according to security requirements"""
     if not file:
@@ -36,6 +51,32 @@ def sanitize_image(image_file):
     except Exception as e:
         raise ValueError(f"Invalid image file: {str(e)}")
 
+def _bits_to_int(bits):
+    """Pack a boolean array into an unsigned integer, first element most significant"""
+    return int.from_bytes(np.packbits(bits.flatten()).tobytes(), 'big')
+
+def perceptual_hashes(image) -> Tuple[int, int]:
+    """64-bit (pHash, dHash) of a PIL image, path or file object
+    
+    Both survive resizing and re-compression, unlike the SHA-256 file hash.
+    """
+    if not isinstance(image, Image.Image):
+        if hasattr(image, 'seek'):
+            image.seek(0)
+        image = Image.open(image)
+        # JPEGs decode straight to a small grayscale image, skipping most of the work
+        image.draft('L', (PHASH_SIZE * 2, PHASH_SIZE * 2))
+    gray = image.convert('L')
+    
+    pixels = np.asarray(gray.resize((PHASH_SIZE, PHASH_SIZE), Image.LANCZOS), dtype=np.float64)
+    low = (_DCT @ pixels @ _DCT.T)[:HASH_SIDE, :HASH_SIDE].flatten()
+    # The DC term only encodes overall brightness
+    phash = _bits_to_int(low > np.median(low[1:]))
+    
+    thumb = np.asarray(gray.resize((HASH_SIDE + 1, HASH_SIDE), Image.LANCZOS), dtype=np.int16)
+    dhash = _bits_to_int(thumb[:, 1:] > thumb[:, :-1])
+    return phash, dhash
+
 def calculate_file_hash(file_content):
     """Calculate SHA-256 hash of file content"""
     return hashlib.sha256(file_content).hexdigest()
@@ -58,6 +99,10 @@ def save_file(file, contribution_id, media_type):
             # Sanitize image
             clean_img = sanitize_image(file)
             clean_img.save(filepath)
+            
+            # Index for near-duplicate lookups on later uploads
+            from .dedup import index_image
+            index_image(contribution_id, *perceptual_hashes(clean_img))
         else:
             # Save other file types
             with open(filepath, 'wb') as f:
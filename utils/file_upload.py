@@ -1,8 +1,50 @@
 import streamlit as st
 import uuid
 import math
-from typing import Optional, Dict, Any
+from typing import Optional, Dict, Any, Tuple
 from config import CHUNK_SIZE, MAX_FILE_SIZE, API_TIMEOUT
+from .contribution_summary import invalidate_contribution_summary
+
+def send_file_chunks(api_client, file_data, filename: str, upload_uuid: str) -> Tuple[int, Optional[str]]:
+    """Send a file to the chunk endpoint, returning (total_chunks, error)"""
+    file_size = len(file_data.getvalue())
+    total_chunks = math.ceil(file_size / CHUNK_SIZE)
+    
+    file_data.seek(0)
+    for chunk_index in range(total_chunks):
+        chunk_data = file_data.read(CHUNK_SIZE)
+        
+        # Prepare chunk upload
+        files = {'chunk': chunk_data}
+        data = {
+            'filename': filename,
+            'chunk_index': chunk_index,
+            'total_chunks': total_chunks,
+            'upload_uuid': upload_uuid
+        }
+        
+        # Upload chunk via API
+        result = api_client.request(
+            'POST', '/records/upload/chunk',
+            files=files, data=data
+        )
+        
+        if 'error' in result:
+            return total_chunks, result['error']
+    
+    return total_chunks, None
+
+def finalize_upload(api_client, upload_data: Dict[str, Any]):
+    """Finalize a chunked upload and create the record, returning the raw response"""
+    # Use form data for upload endpoint
+    response = api_client.session.post(
+        f"{api_client.base_url}/api/v1/records/upload",
+        data=upload_data,
+        timeout=API_TIMEOUT
+    )
+    if response.status_code == 201:
+        invalidate_contribution_summary(upload_data.get('user_id'))
+    return response
 
 def upload_file_chunked(file_data, record_data: Dict[str, Any]) -> Optional[str]:
     """Upload file using chunked upload API"""
@@ -12,35 +54,13 @@ def upload_file_chunked(file_data, record_data: Dict[str, Any]) -> Optional[str]
     # Generate upload UUID
     upload_uuid = str(uuid.uuid4())
     filename = file_data.name
-    file_size = len(file_data.getvalue())
-    
-    # Calculate chunks
-    total_chunks = math.ceil(file_size / CHUNK_SIZE)
     
     try:
         # Upload chunks
-        file_data.seek(0)
-        for chunk_index in range(total_chunks):
-            chunk_data = file_data.read(CHUNK_SIZE)
-            
-            # Prepare chunk upload
-            files = {'chunk': chunk_data}
-            data = {
-                'filename': filename,
-                'chunk_index': chunk_index,
-                'total_chunks': total_chunks,
-                'upload_uuid': upload_uuid
-            }
-            
-            # Upload chunk via API
-            result = st.session_state.api_client.request(
-                'POST', '/records/upload/chunk',
-                files=files, data=data
-            )
-            
-            if 'error' in result:
-                st.error(f"Chunk upload failed: {result['error']}")
-                return None
+        total_chunks, error = send_file_chunks(st.session_state.api_client, file_data, filename, upload_uuid)
+        if error:
+            st.error(f"Chunk upload failed: {error}")
+            return None
         
         # Finalize upload and create record
         upload_data = {
@@ -61,23 +81,13 @@ def upload_file_chunked(file_data, record_data: Dict[str, Any]) -> Optional[str]
             upload_data['latitude'] = record_data['latitude']
             upload_data['longitude'] = record_data['longitude']
         
-        # Use form data for upload endpoint
-        result = st.session_state.api_client.session.post(
-            f"{st.session_state.api_client.base_url}/api/v1/records/upload",
-            data=upload_data,
-            timeout=API_TIMEOUT
-        )
+        result = finalize_upload(st.session_state.api_client, upload_data)
         
         if result.status_code == 201:
             return result.json().get('uid')
         else:
             st.error(f"Upload finalization failed: {result.status_code} - {result.text}")
             return None
-        
-        if 'error' not in result:
-            return result.get('id')
-        else:
-            st.error(f"Upload finalization failed: {result['error']}")
     except Exception as e:
         st.error(f"Upload error: {str(e)}")
         return None
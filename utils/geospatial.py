@@ -1,6 +1,17 @@
 import streamlit as st
 import math
-from typing import Optional, List, Dict, Any
+import time
+import threading
+import numpy as np
+from collections import OrderedDict
+from typing import Optional, List, Dict, Any, Tuple, Callable
+from config import GEO_TILE_ZOOM, GEO_CACHE_TTL_SECONDS, GEO_CACHE_MAX_TILES, GEO_QUERY_MAX_TILES, GEO_PAGE_SIZE
+from .database import db
+
+EARTH_RADIUS_KM = 6371
+
+# Web Mercator cannot represent the poles
+MAX_MERCATOR_LAT = 85.05112878
 
 def get_user_location() -> Optional[Dict[str, float]]:
     """Get user's current location using browser geolocation"""
@@ -32,18 +43,23 @@ def get_user_location() -> Optional[Dict[str, float]]:
 def search_nearby_records(latitude: float, longitude: float, distance_km: float = 10, 
                          category_id: Optional[str] = None, media_type: Optional[str] = None) -> List[Dict[Any, Any]]:
     """Search for records within specified distance"""
-    distance_meters = distance_km * 1000
-    
     filters = {}
     if category_id:
         filters['category_id'] = category_id
     if media_type:
         filters['media_type'] = media_type.lower()
     
-    result = st.session_state.api_client.search_nearby(latitude, longitude, distance_meters, **filters)
+    # Served from the tile cache: fetch the circle's bounding box, then cut it down to the circle
+    min_lat, min_lng, max_lat, max_lng = radius_bbox(latitude, longitude, distance_km)
+    result = geo_cache.search_bbox(_fetch_bbox, min_lat, min_lng, max_lat, max_lng, **filters)
     
     if 'error' not in result:
-        return result if isinstance(result, list) else []
+        records = rank_by_distance(result['records'], latitude, longitude)
+        return [r for r in records if r.get('distance') is not None and r['distance'] <= distance_km]
+    if result.get('status_code') is None:
+        # Backend unreachable: answer from the local spatial index
+        return db.search_nearby(latitude, longitude, distance_km, category_id, filters.get('media_type'),
+                                public_only=True)
     return []
 
 def search_in_bbox(min_lat: float, min_lng: float, max_lat: float, max_lng: float,
@@ -55,15 +71,26 @@ def search_in_bbox(min_lat: float, min_lng: float, max_lat: float, max_lng: floa
     if media_type:
         filters['media_type'] = media_type.lower()
     
-    result = st.session_state.api_client.search_bbox(min_lat, min_lng, max_lat, max_lng, **filters)
+    result = geo_cache.search_bbox(_fetch_bbox, min_lat, min_lng, max_lat, max_lng, **filters)
     
     if 'error' not in result:
-        return result if isinstance(result, list) else []
+        return result['records']
+    if result.get('status_code') is None:
+        # Backend unreachable: answer from the local spatial index
+        return db.search_bbox(min_lat, min_lng, max_lat, max_lng, category_id, filters.get('media_type'),
+                              public_only=True)
     return []
 
+def _fetch_bbox(min_lat: float, min_lng: float, max_lat: float, max_lng: float, **filters) -> Any:
+    """Fetch one page of a box from the API, writing the results through to the local index"""
+    result = st.session_state.api_client.search_bbox(min_lat, min_lng, max_lat, max_lng, **filters)
+    if isinstance(result, list):
+        db.upsert_records(result, source='search')
+    return result
+
 def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
     """Calculate distance between two points in kilometers"""
-    R = 6371  # Earth's radius in kilometers
+    R = EARTH_RADIUS_KM
     
     lat1_rad = math.radians(lat1)
     lon1_rad = math.radians(lon1)
@@ -76,4 +103,314 @@ def calculate_distance(lat1: float, lon1: float, lat2: float, lon2: float) -> fl
     a = math.sin(dlat/2)**2 + math.cos(lat1_rad) * math.cos(lat2_rad) * math.sin(dlon/2)**2
     c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
     
-    return R * c
\ No newline at end of file
+    return R * c
+
+def haversine_distances(latitude: float, longitude: float, lats, lons) -> np.ndarray:
+    """Calculate distances in kilometers from one point to many points at once"""
+    lat1 = np.radians(latitude)
+    lat2 = np.radians(np.asarray(lats, dtype=np.float64))
+    dlat = lat2 - lat1
+    dlon = np.radians(np.asarray(lons, dtype=np.float64)) - np.radians(longitude)
+    
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    # arcsin form is equivalent to the atan2 form for a in [0, 1] and cheaper to vectorize
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+def nearest_k(latitude: float, longitude: float, lats, lons, k: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Indices and distances of the k points closest to a location, nearest first"""
+    distances = haversine_distances(latitude, longitude, lats, lons)
+    k = min(k, len(distances))
+    if k <= 0:
+        return np.array([], dtype=np.intp), np.array([], dtype=np.float64)
+    
+    # argpartition is O(n); only the k selected candidates need a full sort
+    candidates = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+    order = candidates[np.argsort(distances[candidates], kind='stable')]
+    return order, distances[order]
+
+def get_record_coordinates(record: Dict[Any, Any]) -> Optional[Tuple[float, float]]:
+    """Extract (latitude, longitude) from an API record"""
+    location = record.get('location')
+    if isinstance(location, dict) and location.get('latitude') is not None and location.get('longitude') is not None:
+        return float(location['latitude']), float(location['longitude'])
+    if record.get('latitude') is not None and record.get('longitude') is not None:
+        return float(record['latitude']), float(record['longitude'])
+    return None
+
+def rank_by_distance(records: List[Dict[Any, Any]], latitude: float, longitude: float,
+                     limit: Optional[int] = None) -> List[Dict[Any, Any]]:
+    """Sort records nearest first and annotate each with its 'distance' in kilometers"""
+    located = []
+    lats = []
+    lons = []
+    unlocated = []
+    for record in records:
+        coordinates = get_record_coordinates(record)
+        if coordinates is None:
+            unlocated.append(record)
+        else:
+            located.append(record)
+            lats.append(coordinates[0])
+            lons.append(coordinates[1])
+    
+    order, distances = nearest_k(latitude, longitude, lats, lons, limit if limit is not None else len(located))
+    ranked = []
+    for index, distance in zip(order.tolist(), distances.tolist()):
+        record = dict(located[index])
+        record['distance'] = distance
+        ranked.append(record)
+    
+    # Records without coordinates cannot be ranked; keep them after the located ones
+    if limit is None:
+        ranked.extend(unlocated)
+    return ranked
+
+def radius_bbox(latitude: float, longitude: float, distance_km: float) -> Tuple[float, float, float, float]:
+    """Bounding box (min_lat, min_lng, max_lat, max_lng) enclosing a circle"""
+    lat_delta = math.degrees(distance_km / EARTH_RADIUS_KM)
+    lng_delta = lat_delta / max(math.cos(math.radians(latitude)), 1e-6)
+    return (max(latitude - lat_delta, -90.0), max(longitude - lng_delta, -180.0),
+            min(latitude + lat_delta, 90.0), min(longitude + lng_delta, 180.0))
+
+def lat_lng_to_tile(latitude: float, longitude: float, zoom: int) -> Tuple[int, int]:
+    """Web Mercator tile (x, y) containing a point"""
+    latitude = min(max(latitude, -MAX_MERCATOR_LAT), MAX_MERCATOR_LAT)
+    n = 2 ** zoom
+    x = int((longitude + 180.0) / 360.0 * n)
+    lat_rad = math.radians(latitude)
+    y = int((1.0 - math.asinh(math.tan(lat_rad)) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+def tile_bounds(x: int, y: int, zoom: int) -> Tuple[float, float, float, float]:
+    """Bounding box (min_lat, min_lng, max_lat, max_lng) of a tile"""
+    n = 2 ** zoom
+    min_lng = x / n * 360.0 - 180.0
+    max_lng = (x + 1) / n * 360.0 - 180.0
+    max_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * y / n))))
+    min_lat = math.degrees(math.atan(math.sinh(math.pi * (1 - 2 * (y + 1) / n))))
+    return min_lat, min_lng, max_lat, max_lng
+
+def tile_to_quadkey(x: int, y: int, zoom: int) -> str:
+    """Bing-style quadkey for a tile"""
+    digits = []
+    for level in range(zoom, 0, -1):
+        mask = 1 << (level - 1)
+        digit = (1 if x & mask else 0) + (2 if y & mask else 0)
+        digits.append(str(digit))
+    return ''.join(digits)
+
+def tiles_for_bbox(min_lat: float, min_lng: float, max_lat: float, max_lng: float,
+                   zoom: int) -> List[Tuple[int, int]]:
+    """All tiles at a zoom level that overlap a bounding box"""
+    min_x, max_y = lat_lng_to_tile(min_lat, min_lng, zoom)
+    max_x, min_y = lat_lng_to_tile(max_lat, max_lng, zoom)
+    return [(x, y) for x in range(min_x, max_x + 1) for y in range(min_y, max_y + 1)]
+
+def _record_key(record: Dict[Any, Any]) -> Any:
+    return record.get('uid') or record.get('id') or id(record)
+
+class GeoTileCache:
+    """Per-tile cache of geo search results with TTL and LRU eviction"""
+    
+    def __init__(self, zoom: int = GEO_TILE_ZOOM, ttl: float = GEO_CACHE_TTL_SECONDS,
+                 max_tiles: int = GEO_CACHE_MAX_TILES, max_query_tiles: int = GEO_QUERY_MAX_TILES,
+                 page_size: int = GEO_PAGE_SIZE):
+        self.zoom = zoom
+        self.page_size = page_size
+        self.ttl = ttl
+        self.max_tiles = max_tiles
+        self.max_query_tiles = max_query_tiles
+        self._tiles = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+    
+    def _get(self, key) -> Optional[List[Dict[Any, Any]]]:
+        with self._lock:
+            entry = self._tiles.get(key)
+            if entry is None:
+                return None
+            fetched_at, records = entry
+            if time.monotonic() - fetched_at > self.ttl:
+                del self._tiles[key]
+                return None
+            self._tiles.move_to_end(key)
+            return records
+    
+    def _put(self, key, records: List[Dict[Any, Any]]):
+        with self._lock:
+            self._tiles[key] = (time.monotonic(), records)
+            self._tiles.move_to_end(key)
+            while len(self._tiles) > self.max_tiles:
+                self._tiles.popitem(last=False)
+    
+    def clear(self):
+        """Drop every cached tile"""
+        with self._lock:
+            self._tiles.clear()
+    
+    def _fetch_all(self, fetch: Callable[..., Any], bounds: Tuple[float, float, float, float],
+                   **filters) -> Any:
+        """Every record in a box, paging until the API returns a short page
+        
+        The bbox endpoint returns at most one page per call, so a single call
+        would silently truncate dense tiles. Returns the first error dict.
+        """
+        records = []
+        seen = set()
+        skip = 0
+        while True:
+            page = fetch(*bounds, skip=skip, limit=self.page_size, **filters)
+            if not isinstance(page, list):
+                if 'error' in page:
+                    return page
+                page = []
+            new = 0
+            for record in page:
+                key = _record_key(record)
+                if key not in seen:
+                    seen.add(key)
+                    records.append(record)
+                    new += 1
+            # A page with nothing new means the backend ignored skip; stop rather than loop forever
+            if len(page) < self.page_size or new == 0:
+                return records
+            skip += len(page)
+    
+    def search_bbox(self, fetch: Callable[..., Any], min_lat: float, min_lng: float,
+                    max_lat: float, max_lng: float, **filters) -> Dict[str, Any]:
+        """Answer a bbox query from cached tiles, fetching only the missing ones
+        
+        fetch(min_lat, min_lng, max_lat, max_lng, skip=, limit=, **filters)
+        returns one page of records. Returns {'records': [...]} or the first
+        API error dict encountered.
+        """
+        tiles = tiles_for_bbox(min_lat, min_lng, max_lat, max_lng, self.zoom)
+        if len(tiles) > self.max_query_tiles:
+            # Very large areas would cost more tile requests than one direct query
+            result = self._fetch_all(fetch, (min_lat, min_lng, max_lat, max_lng), **filters)
+            if not isinstance(result, list):
+                return result
+            return {'records': result}
+        
+        # Results are scoped per user, since the backend may return private records
+        scope = (st.session_state.get('user_id'), tuple(sorted(filters.items())))
+        merged = {}
+        for x, y in tiles:
+            key = (scope, tile_to_quadkey(x, y, self.zoom))
+            records = self._get(key)
+            if records is None:
+                self.misses += 1
+                records = self._fetch_all(fetch, tile_bounds(x, y, self.zoom), **filters)
+                if not isinstance(records, list):
+                    return records
+                self._put(key, records)
+            else:
+                self.hits += 1
+            
+            for record in records:
+                merged.setdefault(_record_key(record), record)
+        
+        # Tiles overhang the query box; keep only records inside it
+        in_box = []
+        for record in merged.values():
+            coordinates = get_record_coordinates(record)
+            if coordinates and min_lat <= coordinates[0] <= max_lat and min_lng <= coordinates[1] <= max_lng:
+                in_box.append(record)
+        return {'records': in_box}
+
+# Process-wide tile cache shared by all sessions
+geo_cache = GeoTileCache()
+
+def project_to_mercator(lats, lngs) -> Tuple[np.ndarray, np.ndarray]:
+    """Project coordinates to normalized Web Mercator x, y in [0, 1]"""
+    lats = np.clip(np.asarray(lats, dtype=np.float64), -MAX_MERCATOR_LAT, MAX_MERCATOR_LAT)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    x = (lngs + 180.0) / 360.0
+    y = 0.5 - np.log(np.tan(np.pi / 4 + np.radians(lats) / 2)) / (2 * np.pi)
+    return x, y
+
+def unproject_from_mercator(x, y) -> Tuple[np.ndarray, np.ndarray]:
+    """Inverse of project_to_mercator"""
+    lngs = np.asarray(x) * 360.0 - 180.0
+    lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * np.asarray(y)))))
+    return lats, lngs
+
+def zoom_for_radius(distance_km: float) -> int:
+    """Map zoom level at which a search radius roughly fills the view"""
+    zoom = math.log2(2 * math.pi * EARTH_RADIUS_KM / max(distance_km * 4, 1e-3))
+    return int(min(max(zoom, 0), 20))
+
+def _grid_cluster(x: np.ndarray, y: np.ndarray, weights: np.ndarray, cell_size: float):
+    """Merge weighted points sharing a grid cell into their weighted centroid"""
+    cells_x = np.floor(x / cell_size).astype(np.int64)
+    cells_y = np.floor(y / cell_size).astype(np.int64)
+    cell_ids = cells_x * (int(1 / cell_size) + 2) + cells_y
+    unique_cells, parents = np.unique(cell_ids, return_inverse=True)
+    counts = np.bincount(parents, weights=weights, minlength=len(unique_cells))
+    centroid_x = np.bincount(parents, weights=x * weights, minlength=len(unique_cells)) / counts
+    centroid_y = np.bincount(parents, weights=y * weights, minlength=len(unique_cells)) / counts
+    return centroid_x, centroid_y, counts, parents
+
+class ClusterIndex:
+    """Hierarchical grid clusters precomputed for every zoom level
+    
+    Like supercluster, each level clusters the centroids of the level below it,
+    so a zoom change is a lookup instead of a recomputation.
+    """
+    
+    def __init__(self, records: List[Dict[Any, Any]], min_zoom: int = 0, max_zoom: int = 16,
+                 radius_px: int = 60, tile_extent: int = 256):
+        self.min_zoom = min_zoom
+        self.max_zoom = max_zoom
+        self.levels = {}
+        
+        located = [(record, get_record_coordinates(record)) for record in records]
+        located = [(record, coordinates) for record, coordinates in located if coordinates]
+        self.records = [record for record, _ in located]
+        if not located:
+            return
+        
+        x, y = project_to_mercator([c[0] for _, c in located], [c[1] for _, c in located])
+        weights = np.ones(len(located))
+        # Record indices behind each point, used to expose singletons as records
+        members = np.arange(len(located))
+        
+        for zoom in range(max_zoom, min_zoom - 1, -1):
+            cell_size = radius_px / (tile_extent * 2 ** zoom)
+            x, y, weights, parents = _grid_cluster(x, y, weights, cell_size)
+            
+            # A cluster of one keeps a pointer to its record
+            single = np.full(len(weights), -1, dtype=np.int64)
+            first_member = np.full(len(weights), -1, dtype=np.int64)
+            first_member[parents[::-1]] = members[::-1]
+            single[weights == 1] = first_member[weights == 1]
+            members = first_member
+            
+            lats, lngs = unproject_from_mercator(x, y)
+            self.levels[zoom] = (lats, lngs, weights.astype(np.int64), single)
+    
+    def get_clusters(self, zoom: int, bbox: Optional[Tuple[float, float, float, float]] = None) -> List[Dict[str, Any]]:
+        """Clusters at a zoom level, optionally limited to a (min_lat, min_lng, max_lat, max_lng) box"""
+        if not self.levels:
+            return []
+        lats, lngs, counts, single = self.levels[min(max(zoom, self.min_zoom), self.max_zoom)]
+        
+        mask = np.ones(len(lats), dtype=bool)
+        if bbox is not None:
+            min_lat, min_lng, max_lat, max_lng = bbox
+            mask = (lats >= min_lat) & (lats <= max_lat) & (lngs >= min_lng) & (lngs <= max_lng)
+        
+        clusters = []
+        for index in np.flatnonzero(mask).tolist():
+            cluster = {
+                'latitude': float(lats[index]),
+                'longitude': float(lngs[index]),
+                'count': int(counts[index])
+            }
+            if single[index] >= 0:
+                record = self.records[single[index]]
+                cluster['record_id'] = record.get('uid', record.get('id'))
+                cluster['title'] = record.get('title')
+            clusters.append(cluster)
+        return clusters
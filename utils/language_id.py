@@ -0,0 +1,210 @@
+from functools import lru_cache
+from itertools import islice
+from typing import Optional, List, Dict, Any, Iterable, Tuple
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+from config import LANGUAGE_ID_MIN_CONFIDENCE
+from .text_processing import analyze_text, detect_script
+
+# Languages written in each script the text processor detects
+SCRIPT_LANGUAGES = {
+    'devanagari': ['hindi', 'marathi', 'nepali', 'sanskrit', 'konkani', 'maithili', 'bodo', 'dogri'],
+    'bengali': ['bengali', 'assamese'],
+    'gurmukhi': ['punjabi'],
+    'gujarati': ['gujarati'],
+    'odia': ['odia'],
+    'tamil': ['tamil'],
+    'telugu': ['telugu'],
+    'kannada': ['kannada'],
+    'malayalam': ['malayalam'],
+    'arabic': ['urdu', 'kashmiri', 'sindhi'],
+}
+LANGUAGE_SCRIPTS = {language: script for script, languages in SCRIPT_LANGUAGES.items() for language in languages}
+
+# Character 1- to 3-grams hashed into 2**14 buckets
+NGRAM_ORDERS = (1, 2, 3)
+NGRAM_BUCKET_BITS = 14
+NGRAM_BUCKETS = 1 << NGRAM_BUCKET_BITS
+SMOOTHING = 0.5
+
+# Fewer tokens than this give too little evidence to contradict the user
+MIN_TOKENS = 3
+
+# Reference text for languages that share a script. Languages without a sample
+# are never predicted, so a text in one of them is not flagged.
+SEED_TEXTS = {
+    'hindi': (
+        "भारत एक विशाल देश है। यहाँ अनेक भाषाएँ बोली जाती हैं और हर राज्य की अपनी संस्कृति है। "
+        "मेरे गाँव में एक पुराना मंदिर है जिसके पास बच्चे खेलते हैं। हम लोग त्योहारों पर मिलकर "
+        "खाना बनाते हैं और गीत गाते हैं। वह कल बाज़ार गया था लेकिन दुकान बंद थी। क्या आप मेरे "
+        "साथ चलेंगे? यह कहानी मेरी दादी ने मुझे सुनाई थी। इसके बारे में सबको पता होना चाहिए।"
+    ),
+    'marathi': (
+        "महाराष्ट्र हे भारतातील एक मोठे राज्य आहे. येथे मराठी भाषा बोलली जाते आणि प्रत्येक गावाची "
+        "स्वतःची परंपरा आहे. माझ्या गावात एक जुने मंदिर आहे ज्याच्या जवळ मुले खेळतात. आम्ही "
+        "सणांच्या वेळी एकत्र जेवण बनवतो आणि गाणी म्हणतो. तो काल बाजारात गेला होता पण दुकान बंद "
+        "होते. तुम्ही माझ्याबरोबर येणार का? ही गोष्ट माझ्या आजीने मला सांगितली होती."
+    ),
+    'nepali': (
+        "नेपाल एक सुन्दर देश हो। यहाँ धेरै भाषाहरू बोलिन्छन् र हरेक ठाउँको आफ्नै संस्कृति छ। मेरो "
+        "गाउँमा एउटा पुरानो मन्दिर छ जसको नजिक केटाकेटीहरू खेल्छन्। हामी चाडपर्वमा सँगै खाना "
+        "पकाउँछौं र गीत गाउँछौं। ऊ हिजो बजार गएको थियो तर पसल बन्द थियो। के तपाईं मसँग "
+        "जानुहुन्छ? यो कथा मेरी हजुरआमाले मलाई सुनाउनुभएको थियो।"
+    ),
+    'sanskrit': (
+        "भारतं विशालः देशः अस्ति। अत्र बहवः भाषाः भाष्यन्ते। मम ग्रामे एकं प्राचीनं मन्दिरम् अस्ति "
+        "यस्य समीपे बालकाः क्रीडन्ति। वयम् उत्सवेषु मिलित्वा भोजनं पचामः गीतानि च गायामः। सः ह्यः "
+        "आपणं गतवान् परन्तु आपणः पिहितः आसीत्। किं भवान् मया सह आगमिष्यति? इयं कथा मम "
+        "पितामह्या मह्यं कथिता।"
+    ),
+    'bengali': (
+        "বাংলা একটি সমৃদ্ধ ভাষা। আমাদের গ্রামে একটি পুরনো মন্দির আছে যার কাছে ছেলেমেয়েরা খেলা করে। "
+        "আমরা উৎসবের সময় একসাথে রান্না করি এবং গান গাই। সে গতকাল বাজারে গিয়েছিল কিন্তু দোকান বন্ধ "
+        "ছিল। তুমি কি আমার সাথে যাবে? এই গল্পটি আমার ঠাকুমা আমাকে বলেছিলেন।"
+    ),
+    'assamese': (
+        "অসমীয়া এটা চহকী ভাষা। আমাৰ গাঁৱত এটা পুৰণি মন্দিৰ আছে যাৰ ওচৰত ল'ৰা-ছোৱালীবোৰে খেলে। "
+        "আমি উৎসৱৰ সময়ত একেলগে ৰান্ধোঁ আৰু গান গাওঁ। তেওঁ কালি বজাৰলৈ গৈছিল কিন্তু দোকান বন্ধ "
+        "আছিল। তুমি মোৰ লগত যাবানে? এই সাধুটো মোৰ আইতাই মোক কৈছিল।"
+    ),
+}
+
+_NGRAM_POWERS = {n: np.uint64(1000003) ** np.arange(n - 1, -1, -1, dtype=np.uint64) for n in NGRAM_ORDERS}
+# Odd 64-bit constant (golden ratio); multiply-shift spreads polynomial hashes over the buckets
+_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+def ngram_buckets(tokens: Iterable[str]) -> np.ndarray:
+    """Hashed bucket of every character n-gram; tokens are padded with spaces so n-grams see word edges"""
+    text = f" {' '.join(tokens)} "
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32).astype(np.uint64)
+    buckets = []
+    for n in NGRAM_ORDERS:
+        if len(codes) >= n:
+            # Adding n keeps a unigram and a bigram with the same polynomial hash apart
+            hashes = (sliding_window_view(codes, n) * _NGRAM_POWERS[n]).sum(axis=1) + np.uint64(n)
+            buckets.append((hashes * _MIX) >> np.uint64(64 - NGRAM_BUCKET_BITS))
+    return np.concatenate(buckets).astype(np.intp) if buckets else np.empty(0, dtype=np.intp)
+
+def train_model(samples: Dict[str, str]) -> Tuple[List[str], np.ndarray]:
+    """Per-language log probabilities of each n-gram bucket, with additive smoothing"""
+    languages = sorted(samples)
+    counts = np.zeros((len(languages), NGRAM_BUCKETS), dtype=np.float64)
+    for row, language in enumerate(languages):
+        counts[row] = np.bincount(ngram_buckets(analyze_text(samples[language]).tokens), minlength=NGRAM_BUCKETS)
+    counts += SMOOTHING
+    log_probs = np.log(counts / counts.sum(axis=1, keepdims=True))
+    return languages, log_probs.astype(np.float32)
+
+@lru_cache(maxsize=1)
+def _seed_model() -> Tuple[List[str], np.ndarray]:
+    return train_model(SEED_TEXTS)
+
+def _softmax(scores: np.ndarray) -> np.ndarray:
+    exp = np.exp(scores - scores.max(axis=-1, keepdims=True))
+    return exp / exp.sum(axis=-1, keepdims=True)
+
+def score_languages(token_lists: List[Tuple[str, ...]], candidates: List[str]) -> np.ndarray:
+    """Posterior over candidates (columns) for each text (rows), scored in one pass
+
+    Every text's n-gram buckets are concatenated so a single gather and
+    np.add.reduceat sum the log probabilities of all texts at once.
+    """
+    languages, log_probs = _seed_model()
+    rows = [languages.index(language) for language in candidates]
+    buckets = [ngram_buckets(tokens) for tokens in token_lists]
+    lengths = np.array([len(b) for b in buckets])
+    scores = np.zeros((len(token_lists), len(rows)), dtype=np.float64)
+    nonempty = lengths > 0
+    if nonempty.any():
+        offsets = np.concatenate(([0], np.cumsum(lengths[nonempty])[:-1]))
+        gathered = log_probs[rows][:, np.concatenate([b for b in buckets if len(b)])]
+        scores[nonempty] = np.add.reduceat(gathered, offsets, axis=1).T
+    return _softmax(scores)
+
+def _identify(token_lists: List[Tuple[str, ...]]) -> List[Dict[str, Any]]:
+    """Script decides the language when only one uses it; the n-gram model separates the rest"""
+    results = []
+    ambiguous: Dict[str, List[int]] = {}
+    for i, tokens in enumerate(token_lists):
+        script, counts = detect_script(''.join(tokens))
+        languages = SCRIPT_LANGUAGES.get(script, [])
+        # Letters in other scripts (quotes, names) lower the confidence
+        share = counts[script] / sum(counts.values()) if script else 0.0
+        results.append({'language': None, 'script': script, 'confidence': share})
+        modelled = [language for language in languages if language in SEED_TEXTS]
+        if len(modelled) > 1:
+            ambiguous.setdefault(script, []).append(i)
+        elif languages:
+            # Otherwise the script's most widely used language
+            results[i]['language'] = (modelled or languages)[0]
+        # Scripts with no listed language (such as Latin) keep language None; the confidence is the script's share
+
+    for script, indices in ambiguous.items():
+        candidates = [language for language in SCRIPT_LANGUAGES[script] if language in SEED_TEXTS]
+        posteriors = score_languages([token_lists[i] for i in indices], candidates)
+        for i, posterior in zip(indices, posteriors):
+            best = int(posterior.argmax())
+            results[i]['language'] = candidates[best]
+            results[i]['confidence'] *= float(posterior[best])
+    return results
+
+def identify_language(text: str) -> Dict[str, Any]:
+    """Most likely language and script of a text, with a confidence between 0 and 1"""
+    return _identify([analyze_text(text).tokens])[0]
+
+def _mismatch(result: Dict[str, Any], token_count: int, selected: str,
+              min_confidence: float) -> bool:
+    """Whether an identification contradicts the selected language"""
+    selected = (selected or '').lower()
+    # Nothing to contradict when the selection is missing or a language we have no script for
+    if selected not in LANGUAGE_SCRIPTS:
+        return False
+    if not result['script'] or token_count < MIN_TOKENS or result['confidence'] < min_confidence:
+        return False
+    # Text in another script contradicts the selection even when its language is unknown,
+    # e.g. English typed in for Hindi
+    if LANGUAGE_SCRIPTS[selected] != result['script']:
+        return True
+    if not result['language']:
+        return False
+    # Same script: only a language the model knows can be contradicted
+    return selected in SEED_TEXTS and selected != result['language']
+
+def detected_label(result: Dict[str, Any]) -> str:
+    """Display name of an identification: the language, or the script when no language is known"""
+    if result['language']:
+        return result['language'].title()
+    return f"{str(result['script']).title()}-script text"
+
+def check_language(text: str, selected: str,
+                   min_confidence: float = LANGUAGE_ID_MIN_CONFIDENCE) -> Optional[Dict[str, Any]]:
+    """The identified language if it confidently contradicts the selected one, else None"""
+    features = analyze_text(text)
+    result = _identify([features.tokens])[0]
+    return result if _mismatch(result, features.token_count, selected, min_confidence) else None
+
+def scan_language_mismatches(database=None, min_confidence: float = LANGUAGE_ID_MIN_CONFIDENCE,
+                             batch_size: int = 1000) -> List[Dict[str, Any]]:
+    """Processed text contributions whose selected language the identifier disagrees with
+
+    Uses the tokens stored by text_processing, so texts are not re-tokenized.
+    Texts with no locally known selected language (such as those ingested
+    after an API submission) are skipped.
+    """
+    if database is None:
+        from .database import db as database
+    items = database.iter_text_tokens()
+    mismatches = []
+    while True:
+        batch = list(islice(items, batch_size))
+        if not batch:
+            break
+        selected = database.get_languages([contribution_id for contribution_id, _ in batch])
+        batch = [(contribution_id, tokens) for contribution_id, tokens in batch if selected.get(contribution_id)]
+        if not batch:
+            continue
+        results = _identify([tokens for _, tokens in batch])
+        for (contribution_id, tokens), result in zip(batch, results):
+            if _mismatch(result, len(tokens), selected.get(contribution_id), min_confidence):
+                mismatches.append({'id': contribution_id, 'selected': selected.get(contribution_id), **result})
+    return mismatches
@@ -0,0 +1,271 @@
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Any, Iterator, Optional, Tuple
+from PIL import Image
+from config import MEDIA_METADATA_WORKERS
+
+# Bytes read from the end of an Ogg stream to find its last page
+OGG_TAIL_BYTES = 64 * 1024
+
+# MPEG audio bitrates in kbps by [version is MPEG-1][layer], indexed by the 4-bit bitrate field
+_MP3_BITRATES = {
+    (True, 1): [0, 32, 64, 96, 128, 160, 192, 224, 256, 288, 320, 352, 384, 416, 448],
+    (True, 2): [0, 32, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 384],
+    (True, 3): [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320],
+    (False, 1): [0, 32, 48, 56, 64, 80, 96, 112, 128, 144, 160, 176, 192, 224, 256],
+    (False, 2): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+    (False, 3): [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160],
+}
+# Sample rates by the 2-bit version field (0 = MPEG-2.5, 2 = MPEG-2, 3 = MPEG-1)
+_MP3_SAMPLE_RATES = {0: [11025, 12000, 8000], 2: [22050, 24000, 16000], 3: [44100, 48000, 32000]}
+
+# Atoms of an MP4/MOV file that only contain other atoms
+_MP4_CONTAINERS = {b'moov', b'mdia'}
+
+def _wav_metadata(f) -> Dict[str, Any]:
+    """Walk RIFF chunks up to 'data' without reading the samples"""
+    header = f.read(12)
+    if header[:4] != b'RIFF' or header[8:12] != b'WAVE':
+        raise ValueError("Not a WAV file")
+    metadata = {}
+    byte_rate = 0
+    while True:
+        chunk = f.read(8)
+        if len(chunk) < 8:
+            break
+        chunk_id, size = struct.unpack('<4sI', chunk)
+        if chunk_id == b'fmt ':
+            fmt = f.read(size)
+            _, channels, sample_rate, byte_rate = struct.unpack('<HHII', fmt[:12])
+            metadata.update(channels=channels, sample_rate=sample_rate)
+            size -= len(fmt)
+        elif chunk_id == b'data':
+            if byte_rate:
+                metadata['duration'] = size / byte_rate
+            break
+        # Chunks are padded to an even length
+        f.seek(size + (size & 1), os.SEEK_CUR)
+    return metadata
+
+def _mp3_frame_header(data: bytes, pos: int) -> Optional[Dict[str, Any]]:
+    """Decode the 4-byte MPEG audio frame header at pos, if it is a valid one"""
+    if data[pos] != 0xFF or data[pos + 1] & 0xE0 != 0xE0:
+        return None
+    version = (data[pos + 1] >> 3) & 0x3
+    layer = 4 - ((data[pos + 1] >> 1) & 0x3)
+    bitrate_index = data[pos + 2] >> 4
+    rate_index = (data[pos + 2] >> 2) & 0x3
+    if version == 1 or layer == 4 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    if layer == 1:
+        samples = 384
+    elif layer == 2 or mpeg1:
+        samples = 1152
+    else:
+        samples = 576
+    return {
+        'mpeg1': mpeg1,
+        'layer': layer,
+        'bitrate': _MP3_BITRATES[(mpeg1, layer)][bitrate_index] * 1000,
+        'sample_rate': _MP3_SAMPLE_RATES[version][rate_index],
+        'channels': 1 if data[pos + 3] >> 6 == 3 else 2,
+        'samples_per_frame': samples
+    }
+
+def _mp3_metadata(f, file_size: int) -> Dict[str, Any]:
+    """Duration from the Xing/Info or VBRI header, or from the bitrate for CBR files"""
+    head = f.read(10)
+    audio_start = 0
+    if head[:3] == b'ID3':
+        # Tag size is a 28-bit syncsafe integer; a footer adds another 10 bytes
+        size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        audio_start = 10 + size + (10 if head[5] & 0x10 else 0)
+
+    f.seek(audio_start)
+    data = f.read(64 * 1024)
+    for pos in range(len(data) - 4):
+        frame = _mp3_frame_header(data, pos)
+        if frame:
+            break
+    else:
+        raise ValueError("No MPEG audio frame found")
+
+    metadata = {'sample_rate': frame['sample_rate'], 'channels': frame['channels']}
+    if frame['mpeg1']:
+        side_info = 17 if frame['channels'] == 1 else 32
+    else:
+        side_info = 9 if frame['channels'] == 1 else 17
+
+    frames = None
+    xing = pos + 4 + side_info
+    if data[xing:xing + 4] in (b'Xing', b'Info'):
+        flags = struct.unpack('>I', data[xing + 4:xing + 8])[0]
+        if flags & 0x1:
+            frames = struct.unpack('>I', data[xing + 8:xing + 12])[0]
+    elif data[pos + 36:pos + 40] == b'VBRI':
+        frames = struct.unpack('>I', data[pos + 50:pos + 54])[0]
+
+    if frames:
+        metadata['duration'] = frames * frame['samples_per_frame'] / frame['sample_rate']
+    else:
+        metadata['duration'] = (file_size - audio_start - pos) * 8 / frame['bitrate']
+    return metadata
+
+def _ogg_metadata(f, file_size: int) -> Dict[str, Any]:
+    """Sample rate from the first packet, duration from the last page's granule position"""
+    page = f.read(27 + 255)
+    if page[:4] != b'OggS':
+        raise ValueError("Not an Ogg file")
+    segments = page[26]
+    f.seek(27 + segments)
+    packet = f.read(64)
+
+    pre_skip = 0
+    if packet[:7] == b'\x01vorbis':
+        channels = packet[11]
+        sample_rate = granule_rate = struct.unpack('<I', packet[12:16])[0]
+    elif packet[:8] == b'OpusHead':
+        channels = packet[9]
+        pre_skip = struct.unpack('<H', packet[10:12])[0]
+        sample_rate = struct.unpack('<I', packet[12:16])[0]
+        # Opus granule positions always count 48 kHz samples
+        granule_rate = 48000
+    else:
+        raise ValueError("Unsupported Ogg codec")
+    metadata = {'sample_rate': sample_rate, 'channels': channels}
+
+    f.seek(max(0, file_size - OGG_TAIL_BYTES))
+    tail = f.read()
+    last_page = tail.rfind(b'OggS')
+    if last_page >= 0 and granule_rate:
+        granule = struct.unpack('<q', tail[last_page + 6:last_page + 14])[0]
+        metadata['duration'] = max(0, granule - pre_skip) / granule_rate
+    return metadata
+
+def _mp4_atoms(f, start: int, end: int) -> Iterator[Tuple[bytes, int, int]]:
+    """Yield (type, payload start, atom end) for the atoms between start and end"""
+    pos = start
+    while pos + 8 <= end:
+        f.seek(pos)
+        size, atom_type = struct.unpack('>I4s', f.read(8))
+        header = 8
+        if size == 1:
+            size = struct.unpack('>Q', f.read(8))[0]
+            header = 16
+        elif size == 0:
+            size = end - pos
+        if size < header:
+            return
+        yield atom_type, pos + header, pos + size
+        pos += size
+
+def _mp4_metadata(f, file_size: int) -> Dict[str, Any]:
+    """Read mvhd, tkhd and mdhd boxes from moov, seeking past the media data"""
+    metadata = {}
+
+    def walk(start, end, track):
+        for atom_type, payload, atom_end in _mp4_atoms(f, start, end):
+            if atom_type == b'trak':
+                child = {}
+                walk(payload, atom_end, child)
+                if child.get('handler') == b'vide' and child.get('width'):
+                    metadata.setdefault('width', child['width'])
+                    metadata.setdefault('height', child['height'])
+                continue
+            if atom_type in _MP4_CONTAINERS:
+                walk(payload, atom_end, track)
+                continue
+            f.seek(payload)
+            if atom_type in (b'mvhd', b'mdhd'):
+                version = f.read(4)[0]
+                if version == 1:
+                    timescale, duration = struct.unpack('>16xIQ', f.read(28))
+                else:
+                    timescale, duration = struct.unpack('>8xII', f.read(16))
+                if atom_type == b'mvhd' and timescale:
+                    metadata['duration'] = duration / timescale
+                else:
+                    track['timescale'] = timescale
+            elif atom_type == b'hdlr':
+                track['handler'] = f.read(12)[8:12]
+                if track['handler'] == b'soun' and track.get('timescale'):
+                    # An audio track's media timescale is its sample rate
+                    metadata.setdefault('sample_rate', track['timescale'])
+            elif atom_type == b'tkhd':
+                # Width and height are the last two 16.16 fixed-point fields
+                f.seek(atom_end - 8)
+                width, height = struct.unpack('>II', f.read(8))
+                track['width'], track['height'] = width >> 16, height >> 16
+
+    for atom_type, payload, atom_end in _mp4_atoms(f, 0, file_size):
+        if atom_type == b'moov':
+            walk(payload, atom_end, {})
+            break
+    return metadata
+
+def extract_metadata(source) -> Dict[str, Any]:
+    """Duration, sample rate, channels and/or dimensions of a media file or file object
+
+    Only container headers are parsed, so cost is independent of file length.
+    Unknown or malformed files yield an empty dict.
+    """
+    owns_file = not hasattr(source, 'read')
+    f = open(source, 'rb') if owns_file else source
+    try:
+        f.seek(0, os.SEEK_END)
+        file_size = f.tell()
+        f.seek(0)
+        magic = f.read(12)
+        f.seek(0)
+
+        if magic[:4] == b'RIFF' and magic[8:12] == b'WAVE':
+            return _wav_metadata(f)
+        if magic[:4] == b'OggS':
+            return _ogg_metadata(f, file_size)
+        if magic[4:8] in (b'ftyp', b'moov', b'mdat', b'wide', b'free'):
+            return _mp4_metadata(f, file_size)
+        if magic[:3] == b'ID3' or (magic[0] == 0xFF and magic[1] & 0xE0 == 0xE0):
+            return _mp3_metadata(f, file_size)
+        # Image.open reads only the header until pixel data is requested
+        with Image.open(f) as image:
+            return {'width': image.width, 'height': image.height}
+    except (OSError, ValueError, struct.error, IndexError, KeyError):
+        return {}
+    finally:
+        if owns_file:
+            f.close()
+        else:
+            f.seek(0)
+
+def _metadata_entry(item: Tuple[str, Path]) -> Tuple[str, Dict[str, Any]]:
+    contribution_id, path = item
+    return contribution_id, extract_metadata(path)
+
+def extract_all_metadata(database=None, workers: int = MEDIA_METADATA_WORKERS,
+                         batch_size: int = 500) -> int:
+    """Fill in metadata for every local media file that lacks it, returning the count
+
+    Header parsing is dominated by small seeks and reads, so a thread pool
+    overlaps the I/O without the cost of worker processes.
+    """
+    if database is None:
+        from .database import db as database
+    from .shard_export import iter_media_items
+    missing = database.contribution_ids_without_metadata()
+    items = ((metadata['id'], path) for _, path, metadata in iter_media_items(database)
+             if metadata['id'] in missing)
+
+    updated = 0
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+            entries = [entry for entry in executor.map(_metadata_entry, batch) if entry[1]]
+            database.update_media_metadata(entries)
+            updated += len(entries)
+    return updated
\ No newline at end of file
@@ -0,0 +1,264 @@
+import re
+import threading
+import time
+from bisect import bisect_left
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Optional, List, Dict, Any, Tuple
+from urllib.parse import urlsplit
+import requests
+from config import METRICS_ENABLED, METRICS_HOST, METRICS_PORT
+
+# Upper bounds (seconds) of the latency histogram buckets; +Inf is implicit
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# Path segments that identify a resource rather than an endpoint
+_ID_SEGMENT = re.compile(r'^(?:\d+|[0-9a-fA-F-]{8,}|[0-9A-Za-z_-]{20,})$')
+
+def endpoint_label(url: str) -> str:
+    """Path of a request URL with ids replaced by {id}, so each endpoint is one series"""
+    path = urlsplit(url).path
+    if path.startswith('/api/v1/'):
+        path = path[len('/api/v1'):]
+    return '/'.join('{id}' if _ID_SEGMENT.match(segment) else segment for segment in path.split('/')) or '/'
+
+class _Series:
+    """Latency histogram and byte counters for one (method, endpoint)"""
+    __slots__ = ('buckets', 'count', 'total', 'statuses', 'bytes_sent', 'bytes_received')
+
+    def __init__(self):
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.statuses: Dict[str, int] = {}
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+class MetricsRegistry:
+    """Thread-safe in-process store of API client metrics"""
+
+    def __init__(self, enabled: bool = METRICS_ENABLED):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._series: Dict[Tuple[str, str], _Series] = {}
+            self._retries: Dict[str, int] = {}
+            self.in_flight = 0
+            self.max_in_flight = 0
+            self.started_at = time.time()
+
+    def request_started(self):
+        with self._lock:
+            self.in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+    def request_finished(self, method: str, endpoint: str, status: str, seconds: float,
+                         bytes_sent: int, bytes_received: int):
+        with self._lock:
+            self.in_flight -= 1
+            series = self._series.get((method, endpoint))
+            if series is None:
+                series = self._series[(method, endpoint)] = _Series()
+            series.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+            series.count += 1
+            series.total += seconds
+            series.statuses[status] = series.statuses.get(status, 0) + 1
+            series.bytes_sent += bytes_sent
+            series.bytes_received += bytes_received
+
+    def record_retry(self, operation: str):
+        """Count a repeated attempt of an operation that failed before"""
+        if not self.enabled:
+            return
+        with self._lock:
+            self._retries[operation] = self._retries.get(operation, 0) + 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Copy of all metrics, safe to read while requests continue"""
+        with self._lock:
+            return {
+                'series': {
+                    key: {
+                        'buckets': list(series.buckets),
+                        'count': series.count,
+                        'sum': series.total,
+                        'statuses': dict(series.statuses),
+                        'bytes_sent': series.bytes_sent,
+                        'bytes_received': series.bytes_received
+                    }
+                    for key, series in self._series.items()
+                },
+                'retries': dict(self._retries),
+                'in_flight': self.in_flight,
+                'max_in_flight': self.max_in_flight,
+                'started_at': self.started_at
+            }
+
+registry = MetricsRegistry()
+
+def record_retry(operation: str):
+    registry.record_retry(operation)
+
+def histogram_quantile(q: float, buckets: List[int]) -> Optional[float]:
+    """Estimate a quantile from bucket counts by linear interpolation, as Prometheus does"""
+    count = sum(buckets)
+    if not count:
+        return None
+    rank = q * count
+    cumulative = 0
+    for i, bucket_count in enumerate(buckets):
+        if cumulative + bucket_count >= rank and bucket_count:
+            if i == len(LATENCY_BUCKETS):
+                # Above the last bound: report the bound, like histogram_quantile
+                return LATENCY_BUCKETS[-1]
+            lower = LATENCY_BUCKETS[i - 1] if i else 0.0
+            return lower + (LATENCY_BUCKETS[i] - lower) * (rank - cumulative) / bucket_count
+        cumulative += bucket_count
+    return LATENCY_BUCKETS[-1]
+
+def endpoint_summary(snapshot: Optional[Dict[str, Any]] = None) -> List[Dict[str, Any]]:
+    """One row per endpoint, slowest total time first, for the admin panel"""
+    snapshot = snapshot or registry.snapshot()
+    rows = []
+    for (method, endpoint), series in snapshot['series'].items():
+        errors = sum(count for status, count in series['statuses'].items() if not status.startswith(('2', '3')))
+        rows.append({
+            'method': method,
+            'endpoint': endpoint,
+            'requests': series['count'],
+            'errors': errors,
+            'total_seconds': series['sum'],
+            'mean_ms': series['sum'] / series['count'] * 1000,
+            'p50_ms': histogram_quantile(0.5, series['buckets']) * 1000,
+            'p95_ms': histogram_quantile(0.95, series['buckets']) * 1000,
+            'bytes_sent': series['bytes_sent'],
+            'bytes_received': series['bytes_received'],
+            'statuses': series['statuses']
+        })
+    return sorted(rows, key=lambda row: row['total_seconds'], reverse=True)
+
+def _escape(value) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+def _labels(**labels) -> str:
+    return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + '}'
+
+def render_prometheus(snapshot: Optional[Dict[str, Any]] = None) -> str:
+    """Metrics in the Prometheus text exposition format (version 0.0.4)"""
+    snapshot = snapshot or registry.snapshot()
+    series = sorted(snapshot['series'].items())
+    lines = [
+        "# HELP api_request_duration_seconds Latency of backend API requests.",
+        "# TYPE api_request_duration_seconds histogram"
+    ]
+    for (method, endpoint), data in series:
+        cumulative = 0
+        for bound, bucket_count in zip(LATENCY_BUCKETS + ('+Inf',), data['buckets']):
+            cumulative += bucket_count
+            lines.append(f"api_request_duration_seconds_bucket{_labels(method=method, endpoint=endpoint, le=bound)} {cumulative}")
+        lines.append(f"api_request_duration_seconds_sum{_labels(method=method, endpoint=endpoint)} {data['sum']:.6f}")
+        lines.append(f"api_request_duration_seconds_count{_labels(method=method, endpoint=endpoint)} {data['count']}")
+
+    lines += ["# HELP api_requests_total Backend API requests by response status.", "# TYPE api_requests_total counter"]
+    for (method, endpoint), data in series:
+        for status, count in sorted(data['statuses'].items()):
+            lines.append(f"api_requests_total{_labels(method=method, endpoint=endpoint, status=status)} {count}")
+
+    for name, key, help_text in (
+        ("api_request_bytes_sent_total", 'bytes_sent', "Request body bytes sent to the backend."),
+        ("api_response_bytes_received_total", 'bytes_received', "Response body bytes received from the backend.")
+    ):
+        lines += [f"# HELP {name} {help_text}", f"# TYPE {name} counter"]
+        for (method, endpoint), data in series:
+            lines.append(f"{name}{_labels(method=method, endpoint=endpoint)} {data[key]}")
+
+    lines += ["# HELP api_retries_total Repeated attempts of failed operations.", "# TYPE api_retries_total counter"]
+    for operation, count in sorted(snapshot['retries'].items()):
+        lines.append(f"api_retries_total{_labels(operation=operation)} {count}")
+
+    lines += [
+        "# HELP api_requests_in_flight Backend API requests currently in progress.",
+        "# TYPE api_requests_in_flight gauge",
+        f"api_requests_in_flight {snapshot['in_flight']}",
+        "# HELP api_requests_in_flight_max Most concurrent backend API requests seen.",
+        "# TYPE api_requests_in_flight_max gauge",
+        f"api_requests_in_flight_max {snapshot['max_in_flight']}"
+    ]
+    return "\n".join(lines) + "\n"
+
+class InstrumentedSession(requests.Session):
+    """requests.Session that records every request it sends in the registry
+
+    Wrapping send() covers APIClient.request and direct session users (chunk
+    finalization, export downloads) alike. Non-streamed bodies are read inside
+    the timing; streamed downloads are timed to their headers.
+    """
+
+    def __init__(self, metrics: MetricsRegistry = registry):
+        super().__init__()
+        self.metrics = metrics
+
+    def send(self, request, **kwargs):
+        if not self.metrics.enabled:
+            return super().send(request, **kwargs)
+
+        body = request.body
+        bytes_sent = len(body) if isinstance(body, (bytes, str)) else 0
+        endpoint = endpoint_label(request.url)
+        status = "error"
+        bytes_received = 0
+        self.metrics.request_started()
+        start = time.perf_counter()
+        try:
+            response = super().send(request, **kwargs)
+            status = str(response.status_code)
+            if kwargs.get('stream'):
+                length = response.headers.get('Content-Length', '')
+                bytes_received = int(length) if length.isdigit() else 0
+            else:
+                bytes_received = len(response.content)
+            return response
+        finally:
+            self.metrics.request_finished(request.method, endpoint, status, time.perf_counter() - start,
+                                          bytes_sent, bytes_received)
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_prometheus().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        # Scrapes every few seconds would flood the Streamlit log
+        pass
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_attempted = False
+_server_lock = threading.Lock()
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics from a daemon thread, once per process
+
+    Returns None when metrics are disabled, no port is configured or the port
+    is taken (for example by another app process already serving them). The
+    bind is attempted once per process, not on every rerun.
+    """
+    global _server, _server_attempted
+    with _server_lock:
+        if not _server_attempted and registry.enabled and port:
+            _server_attempted = True
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError:
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+        return _server
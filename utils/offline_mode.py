@@ -1,13 +1,27 @@
 import streamlit as st
 import hashlib
 from datetime import datetime
-from pathlib import Path
-import json
+from typing import Dict, Any, Sequence
+from config import DATA_DIR, UPLOADS_DIR
+from .database import db
+from .static_categories import get_static_category_id
+from .shared_json import get_shared_file
+
+USERS_FILE = DATA_DIR / "users.json"
+CONTRIBUTIONS_FILE = DATA_DIR / "contributions.json"
+
+def get_offline_contributions() -> Sequence[Dict[str, Any]]:
+    """Offline contributions as a read-only snapshot shared by every session"""
+    return get_shared_file(CONTRIBUTIONS_FILE, list).get()
+
+def offline_user_id(phone: str) -> str:
+    """Derive the local user id used for a phone number in offline mode"""
+    return hashlib.md5(phone.encode()).hexdigest()[:8]
 
 def handle_offline_login(phone: str, otp: str) -> bool:
     """Handle login in offline mode"""
     if len(otp) == 6:  # Accept any 6-digit OTP
-        st.session_state.user_id = hashlib.md5(phone.encode()).hexdigest()[:8]
+        st.session_state.user_id = offline_user_id(phone)
         st.session_state.user_name = "Demo User"
         st.session_state.user_phone = phone
         return True
@@ -17,17 +31,12 @@ def handle_offline_register(phone: str, name: str, otp: str) -> bool:
     """Handle registration in offline mode"""
     if len(otp) == 6:  # Accept any 6-digit OTP
         # Save user locally
-        st.session_state.registered_users[phone] = {
+        get_shared_file(USERS_FILE, dict).set_item(phone, {
             'name': name,
             'created_at': datetime.now().isoformat()
-        }
+        })
         
-        # Save to file
-        Path("data").mkdir(exist_ok=True)
-        with open("data/users.json", 'w') as f:
-            json.dump(st.session_state.registered_users, f, indent=2)
-        
-        st.session_state.user_id = hashlib.md5(phone.encode()).hexdigest()[:8]
+        st.session_state.user_id = offline_user_id(phone)
         st.session_state.user_name = name
         st.session_state.user_phone = phone
         return True
@@ -35,6 +44,12 @@ def handle_offline_register(phone: str, name: str, otp: str) -> bool:
 
 def save_offline_contribution(contribution_data: dict, content_data) -> bool:
     """Save contribution in offline mode"""
+    # Imported here so pages that never save offline don't load numpy and Pillow
+    from .dedup import index_image
+    from .text_processing import ingest_text
+    from .file_handler import perceptual_hashes
+    from .media_metadata import extract_metadata
+    
     contribution = {
         "id": hashlib.md5(f"{st.session_state.user_id}{datetime.now().isoformat()}".encode()).hexdigest()[:12],
         "user_id": st.session_state.user_id,
@@ -47,27 +62,46 @@ def save_offline_contribution(contribution_data: dict, content_data) -> bool:
         "timestamp": datetime.now().isoformat(),
         "size": len(str(content_data)) if contribution_data["media_type"] == "Text" else len(content_data.getvalue()) if hasattr(content_data, 'getvalue') else 0
     }
+    if contribution_data.get("latitude") is not None and contribution_data.get("longitude") is not None:
+        contribution["latitude"] = contribution_data["latitude"]
+        contribution["longitude"] = contribution_data["longitude"]
+    if contribution["media_type"] != "Text":
+        contribution.update(extract_metadata(content_data))
+    
+    # Index locally so nearby searches and media totals include it while offline
+    db.create_contribution({
+        **contribution,
+        "category": get_static_category_id(contribution["category"]),
+        "media_type": contribution["media_type"].lower(),
+        "language": contribution["language"].lower(),
+        "is_public": contribution["public"],
+        "file_size": contribution["size"]
+    })
     
-    # Add to session state
-    st.session_state.contributions.append(contribution)
+    # Add to the shared offline store and save it to file
+    get_shared_file(CONTRIBUTIONS_FILE, list).append(contribution)
     
-    # Save to file
-    Path("data").mkdir(exist_ok=True)
-    with open("data/contributions.json", 'w') as f:
-        json.dump(st.session_state.contributions, f, indent=2)
+    # Queue for background sync to the API
+    if 'offline_queue' in st.session_state:
+        st.session_state.offline_queue.append(contribution['id'])
     
     # Save content file
     if contribution["media_type"] == "Text":
-        content_file = Path("data") / f"{contribution['id']}.txt"
+        content_file = DATA_DIR / f"{contribution['id']}.txt"
         with open(content_file, 'w', encoding='utf-8') as f:
             f.write(str(content_data))
+        ingest_text(contribution['id'], str(content_data))
     else:
-        uploads_dir = Path("data/uploads")
-        uploads_dir.mkdir(exist_ok=True)
+        UPLOADS_DIR.mkdir(parents=True, exist_ok=True)
         file_extension = content_data.name.split('.')[-1] if '.' in content_data.name else 'bin'
-        content_file = uploads_dir / f"{contribution['id']}.{file_extension}"
+        content_file = UPLOADS_DIR / f"{contribution['id']}.{file_extension}"
         with open(content_file, 'wb') as f:
             content_data.seek(0)
             f.write(content_data.read())
+        if contribution["media_type"] == "Image":
+            try:
+                index_image(contribution['id'], *perceptual_hashes(content_file))
+            except (OSError, ValueError):
+                pass
     
     return True
\ No newline at end of file
@@ -0,0 +1,365 @@
+import json
+import os
+import time
+import uuid
+import hashlib
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from io import BytesIO
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Tuple
+from config import DATA_DIR, UPLOADS_DIR, SYNC_BATCH_SIZE, SYNC_MAX_WORKERS, SYNC_INTERVAL_SECONDS, SYNC_MAX_ATTEMPTS
+from .static_categories import get_static_category_id
+from .category_mapper import get_language_enum
+from .file_upload import send_file_chunks, finalize_upload
+from .metrics import record_retry
+from .offline_mode import get_offline_contributions
+
+SYNC_DIR = DATA_DIR / "sync"
+
+# Namespace for deterministic upload UUIDs, so a replayed upload reuses the same server-side slot
+UPLOAD_NAMESPACE = uuid.UUID("6f1c3a52-3d0e-4c52-9a56-0b8f3f6e2d11")
+
+# Item states persisted in the sync state file
+PENDING = "pending"
+IN_FLIGHT = "in_flight"
+SYNCED = "synced"
+DUPLICATE = "duplicate"
+FAILED = "failed"
+
+# Client errors that retrying cannot fix (auth and rate-limit errors are retried)
+PERMANENT_ERRORS = {400, 404, 413, 415, 422}
+
+class SyncEngine:
+    """Background worker that replays offline contributions to the API"""
+
+    def __init__(self, api_client, user_id: str, offline_user_id: Optional[str] = None,
+                 batch_size: int = SYNC_BATCH_SIZE, max_workers: int = SYNC_MAX_WORKERS,
+                 interval: int = SYNC_INTERVAL_SECONDS):
+        self.api_client = api_client
+        self.user_id = user_id
+        # Contributions saved offline carry the phone-derived offline id instead of the API user id
+        self.owner_ids = {user_id, offline_user_id} - {None}
+        self.batch_size = batch_size
+        self.max_workers = max_workers
+        self.interval = interval
+        self.state_file = SYNC_DIR / f"{user_id}.json"
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+        self._synced_at = deque(maxlen=1000)
+        self._active_fingerprints = set()
+        self.state = self._load_state()
+
+    def _load_state(self) -> Dict[str, Any]:
+        """Load persisted sync progress"""
+        if self.state_file.exists():
+            try:
+                with open(self.state_file, 'r') as f:
+                    return json.load(f)
+            except (OSError, ValueError):
+                pass
+        return {'items': {}, 'fingerprints': {}, 'last_sync': None}
+
+    def _save_state(self):
+        """Persist sync progress atomically so a crash never leaves a torn file"""
+        SYNC_DIR.mkdir(parents=True, exist_ok=True)
+        tmp_file = self.state_file.with_suffix('.tmp')
+        with open(tmp_file, 'w') as f:
+            json.dump(self.state, f, indent=2)
+        os.replace(tmp_file, self.state_file)
+
+    def _set_item(self, contribution_id: str, **fields):
+        """Update one queue item and persist the change"""
+        with self._lock:
+            item = self.state['items'].setdefault(contribution_id, {'status': PENDING, 'attempts': 0})
+            item.update(fields)
+            self._save_state()
+
+    def _load_contributions(self) -> List[Dict[str, Any]]:
+        """Read offline contributions owned by this user"""
+        try:
+            # The shared snapshot is only re-parsed when the file changes, not on every sync tick
+            contributions = get_offline_contributions()
+        except (OSError, ValueError):
+            return []
+        return [c for c in contributions if c.get('user_id') in self.owner_ids]
+
+    def pending_contributions(self) -> List[Dict[str, Any]]:
+        """Contributions still waiting to be synced and due for an attempt"""
+        now = time.time()
+        pending = []
+        with self._lock:
+            items = self.state['items']
+            for contribution in self._load_contributions():
+                item = items.get(contribution['id'], {})
+                if item.get('status') in (SYNCED, DUPLICATE, FAILED):
+                    continue
+                if item.get('next_attempt_at', 0) > now:
+                    continue
+                pending.append(contribution)
+        return pending
+
+    def enqueue(self, contribution_ids: List[str]):
+        """Queue contributions for immediate sync and wake the worker"""
+        with self._lock:
+            for contribution_id in contribution_ids:
+                item = self.state['items'].setdefault(contribution_id, {'status': PENDING, 'attempts': 0})
+                if item['status'] == PENDING:
+                    item['next_attempt_at'] = 0
+            self._save_state()
+        self._wake.set()
+
+    def start(self):
+        """Start the background worker if it is not running"""
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name=f"offline-sync-{self.user_id}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Ask the background worker to exit after the current batch"""
+        self._stop.set()
+        self._wake.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sync_once()
+            except Exception:
+                # Keep the worker alive; failed items are retried on the next pass
+                pass
+            self._wake.wait(self.interval)
+            self._wake.clear()
+
+    def sync_once(self) -> int:
+        """Replay all due contributions in batches, returning how many were synced"""
+        pending = self.pending_contributions()
+        synced = 0
+
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            for start in range(0, len(pending), self.batch_size):
+                if self._stop.is_set():
+                    break
+                batch = pending[start:start + self.batch_size]
+                for status in executor.map(self._sync_one, batch):
+                    if status in (SYNCED, DUPLICATE):
+                        synced += 1
+
+        with self._lock:
+            self.state['last_sync'] = datetime.now().isoformat()
+            self._save_state()
+        return synced
+
+    def _sync_one(self, contribution: Dict[str, Any]) -> str:
+        """Replay a single contribution, recording the outcome"""
+        contribution_id = contribution['id']
+        with self._lock:
+            item = dict(self.state['items'].get(contribution_id, {'status': PENDING, 'attempts': 0}))
+
+        try:
+            fingerprint = self._fingerprint(contribution)
+        except OSError as e:
+            self._set_item(contribution_id, status=FAILED, last_error=f"Content missing: {e}")
+            return FAILED
+
+        # Same content already reached the backend under another queue entry
+        with self._lock:
+            existing_id = self.state['fingerprints'].get(fingerprint)
+            in_progress = fingerprint in self._active_fingerprints
+            if not existing_id and not in_progress:
+                self._active_fingerprints.add(fingerprint)
+        if existing_id:
+            self._set_item(contribution_id, status=DUPLICATE, remote_id=existing_id)
+            return DUPLICATE
+        if in_progress:
+            # Identical entry is being sent by another worker; settle it on the next pass
+            return PENDING
+
+        try:
+            return self._send(contribution, item, fingerprint)
+        finally:
+            with self._lock:
+                self._active_fingerprints.discard(fingerprint)
+
+    def _send(self, contribution: Dict[str, Any], item: Dict[str, Any], fingerprint: str) -> str:
+        """Send a contribution that is not a known duplicate"""
+        contribution_id = contribution['id']
+        # A previous run crashed mid-request: check whether the record landed before resending
+        if item.get('status') == IN_FLIGHT:
+            remote_id = self._find_remote_copy(contribution)
+            if remote_id:
+                return self._mark_synced(contribution_id, fingerprint, remote_id)
+
+        attempts = item.get('attempts', 0) + 1
+        self._set_item(contribution_id, status=IN_FLIGHT, attempts=attempts)
+        if attempts > 1:
+            record_retry('offline_sync')
+        remote_id, error, status_code = self._replay(contribution)
+
+        if remote_id:
+            return self._mark_synced(contribution_id, fingerprint, remote_id)
+        if status_code == 409:
+            self._set_item(contribution_id, status=DUPLICATE, last_error=error)
+            return DUPLICATE
+        if status_code in PERMANENT_ERRORS or attempts >= SYNC_MAX_ATTEMPTS:
+            # Validation errors will not succeed on retry
+            self._set_item(contribution_id, status=FAILED, last_error=error)
+            return FAILED
+
+        backoff = min(self.interval * 2 ** (attempts - 1), 3600)
+        self._set_item(contribution_id, status=PENDING, last_error=error,
+                       next_attempt_at=time.time() + backoff)
+        return PENDING
+
+    def _mark_synced(self, contribution_id: str, fingerprint: str, remote_id: str) -> str:
+        """Record a successful sync and remember its content fingerprint"""
+        with self._lock:
+            self.state['fingerprints'][fingerprint] = remote_id
+            item = self.state['items'].setdefault(contribution_id, {'attempts': 0})
+            item.update({'status': SYNCED, 'remote_id': remote_id, 'synced_at': datetime.now().isoformat()})
+            item.pop('last_error', None)
+            self._save_state()
+            self._synced_at.append(time.time())
+        return SYNCED
+
+    def _content_path(self, contribution: Dict[str, Any]) -> Path:
+        """Locate the content file written by save_offline_contribution"""
+        if contribution['media_type'] == "Text":
+            return DATA_DIR / f"{contribution['id']}.txt"
+        matches = sorted(UPLOADS_DIR.glob(f"{contribution['id']}.*"))
+        if not matches:
+            raise FileNotFoundError(f"No upload found for {contribution['id']}")
+        return matches[0]
+
+    def _fingerprint(self, contribution: Dict[str, Any]) -> str:
+        """Content-based identity used to skip duplicate queue entries"""
+        digest = hashlib.sha256()
+        digest.update(f"{self.user_id}|{contribution['title']}|{contribution['media_type']}|".encode('utf-8'))
+        with open(self._content_path(contribution), 'rb') as f:
+            for block in iter(lambda: f.read(1024 * 1024), b''):
+                digest.update(block)
+        return digest.hexdigest()
+
+    def _find_remote_copy(self, contribution: Dict[str, Any]) -> Optional[str]:
+        """Find a record created by an interrupted earlier attempt"""
+        result = self.api_client.get_records(
+            user_id=self.user_id,
+            category_id=get_static_category_id(contribution['category']),
+            media_type=contribution['media_type'].lower()
+        )
+        if 'error' in result or not isinstance(result, list):
+            return None
+        for record in result:
+            if record.get('title') == contribution['title']:
+                return record.get('uid') or record.get('id')
+        return None
+
+    def _replay(self, contribution: Dict[str, Any]) -> Tuple[Optional[str], Optional[str], Optional[int]]:
+        """Send one contribution to the API, returning (remote_id, error, status_code)"""
+        content_path = self._content_path(contribution)
+        release_rights = 'creator' if contribution.get('public') else 'family_or_friend'
+        category_id = get_static_category_id(contribution['category'])
+        language = get_language_enum(contribution['language'])
+
+        has_location = contribution.get('latitude') is not None and contribution.get('longitude') is not None
+
+        if contribution['media_type'] == "Text":
+            text_content = content_path.read_text(encoding='utf-8')
+            text_description = contribution.get('description') or text_content
+            record = {
+                "title": contribution['title'],
+                "description": text_description[:1000],
+                "category_id": category_id,
+                "user_id": self.user_id,
+                "media_type": "text",
+                "language": language,
+                "release_rights": release_rights
+            }
+            if has_location:
+                record["location"] = {
+                    "latitude": contribution['latitude'],
+                    "longitude": contribution['longitude']
+                }
+            result = self.api_client.create_record(record)
+            if 'error' in result:
+                return None, result['error'], result.get('status_code')
+            return result.get('uid') or result.get('id'), None, None
+
+        file_data = BytesIO(content_path.read_bytes())
+        file_data.name = content_path.name
+        upload_uuid = str(uuid.uuid5(UPLOAD_NAMESPACE, contribution['id']))
+
+        total_chunks, error = send_file_chunks(self.api_client, file_data, file_data.name, upload_uuid)
+        if error:
+            return None, error, None
+
+        upload_data = {
+            'title': contribution['title'],
+            'description': contribution.get('description', ''),
+            'category_id': category_id,
+            'user_id': self.user_id,
+            'media_type': contribution['media_type'].lower(),
+            'upload_uuid': upload_uuid,
+            'filename': file_data.name,
+            'total_chunks': total_chunks,
+            'release_rights': release_rights,
+            'language': language
+        }
+        if has_location:
+            upload_data['latitude'] = contribution['latitude']
+            upload_data['longitude'] = contribution['longitude']
+
+        try:
+            response = finalize_upload(self.api_client, upload_data)
+        except Exception as e:
+            return None, str(e), None
+
+        if response.status_code == 201:
+            return response.json().get('uid'), None, None
+        return None, f"{response.status_code} - {response.text}", response.status_code
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and throughput for the dashboard"""
+        owned_ids = {c['id'] for c in self._load_contributions()}
+        now = time.time()
+        with self._lock:
+            items = self.state['items']
+            counts = {PENDING: 0, IN_FLIGHT: 0, SYNCED: 0, DUPLICATE: 0, FAILED: 0}
+            for contribution_id in owned_ids:
+                status = items.get(contribution_id, {}).get('status', PENDING)
+                counts[status] += 1
+            recent = sum(1 for t in self._synced_at if now - t <= 60)
+            last_sync = self.state.get('last_sync')
+
+        return {
+            'queue_depth': counts[PENDING] + counts[IN_FLIGHT],
+            'synced': counts[SYNCED],
+            'duplicates': counts[DUPLICATE],
+            'failed': counts[FAILED],
+            'throughput_per_min': recent,
+            'last_sync': last_sync,
+            'running': bool(self._thread and self._thread.is_alive())
+        }
+
+# One engine per user per process, so several browser sessions never replay the same queue twice
+_engines: Dict[str, SyncEngine] = {}
+_engines_lock = threading.Lock()
+
+def get_sync_engine(api_client, user_id: str, offline_user_id: Optional[str] = None) -> SyncEngine:
+    """Get (or create) the process-wide sync engine for a user"""
+    with _engines_lock:
+        engine = _engines.get(user_id)
+        if engine is None:
+            engine = SyncEngine(api_client, user_id, offline_user_id)
+            _engines[user_id] = engine
+        else:
+            # Always replay with the most recently authenticated client
+            engine.api_client = api_client
+            if offline_user_id:
+                engine.owner_ids.add(offline_user_id)
+        return engine
\ No newline at end of file
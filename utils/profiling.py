@@ -0,0 +1,223 @@
+import cProfile
+import functools
+import inspect
+import json
+import os
+import sys
+import threading
+import time
+import uuid
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Optional, List, Dict, Any, Iterator
+from config import (DATA_DIR, PROFILING_ENABLED, PROFILE_SLOW_RERUN_MS, PROFILE_CAPTURE,
+                    PROFILE_SAMPLE_INTERVAL_MS)
+
+TRACES_DIR = DATA_DIR / "traces"
+
+# Deeper stacks are cut from the root end; the frames nearest the leaf matter most
+MAX_STACK_DEPTH = 64
+
+_local = threading.local()
+_write_lock = threading.Lock()
+
+class _Trace:
+    """Spans recorded during one script rerun"""
+
+    def __init__(self, page: str):
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.page = page
+        self.started_at = datetime.now().isoformat()
+        self.start = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+        self.depth = 0
+
+class StackSampler:
+    """Samples one thread's Python stack on an interval, like pyinstrument or py-spy
+
+    Sampling from a separate thread costs the rerun almost nothing, unlike
+    cProfile's per-call hooks, so it can run on every rerun and be kept only
+    for the slow ones.
+    """
+
+    def __init__(self, thread_id: int, interval: float):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.samples: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and len(stack) < MAX_STACK_DEPTH:
+                code = frame.f_code
+                stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+                frame = frame.f_back
+            if stack:
+                self.samples[';'.join(reversed(stack))] += 1
+
+    def folded(self) -> str:
+        """Samples in the folded-stack format read by flamegraph.pl and speedscope"""
+        return ''.join(f"{stack} {count}\n" for stack, count in self.samples.most_common())
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[None]:
+    """Time a block as a nested span of the current rerun's trace; a no-op outside one"""
+    trace: Optional[_Trace] = getattr(_local, 'trace', None)
+    if trace is None:
+        yield
+        return
+    entry = {'name': name, 'depth': trace.depth, 'start_ms': (time.perf_counter() - trace.start) * 1000}
+    if attrs:
+        entry['attrs'] = attrs
+    trace.spans.append(entry)
+    trace.depth += 1
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        entry['duration_ms'] = (time.perf_counter() - start) * 1000
+        trace.depth -= 1
+
+def profiled(name: Optional[str] = None):
+    """Decorator recording each call of a function as a span"""
+    def decorator(func):
+        span_name = name or func.__qualname__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if getattr(_local, 'trace', None) is None:
+                return func(*args, **kwargs)
+            with span(span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def profile_methods(prefix: str):
+    """Class decorator that records every public method call as a span
+
+    Generator methods are left alone: timing them would only cover creating
+    the generator, not iterating it.
+    """
+    def decorator(cls):
+        for attr, value in list(vars(cls).items()):
+            if attr.startswith('_') or not inspect.isfunction(value) or inspect.isgeneratorfunction(value):
+                continue
+            setattr(cls, attr, profiled(f"{prefix}.{attr}")(value))
+        return cls
+    return decorator
+
+def _write_trace(record: Dict[str, Any]):
+    """Append a trace to today's JSONL file"""
+    TRACES_DIR.mkdir(parents=True, exist_ok=True)
+    path = TRACES_DIR / f"traces-{datetime.now():%Y%m%d}.jsonl"
+    line = json.dumps(record, ensure_ascii=False) + "\n"
+    with _write_lock:
+        with open(path, 'a', encoding='utf-8') as f:
+            f.write(line)
+
+@contextmanager
+def trace_rerun(page: str, enabled: bool = PROFILING_ENABLED,
+                slow_ms: float = PROFILE_SLOW_RERUN_MS, capture: str = PROFILE_CAPTURE) -> Iterator[None]:
+    """Trace one rerun of a page, keeping a profile when it takes at least slow_ms
+
+    capture is "sample" (stack sampler), "cprofile" (deterministic, slower)
+    or "off". Traces go to data/traces/traces-YYYYMMDD.jsonl and profiles
+    next to them, named by trace id.
+    """
+    if not enabled or getattr(_local, 'trace', None) is not None:
+        yield
+        return
+
+    trace = _Trace(page)
+    sampler = profiler = None
+    if capture == "sample":
+        sampler = StackSampler(threading.get_ident(), PROFILE_SAMPLE_INTERVAL_MS / 1000)
+        sampler.start()
+    elif capture == "cprofile":
+        profiler = cProfile.Profile()
+        profiler.enable()
+
+    _local.trace = trace
+    error = None
+    try:
+        with span(f"page:{page}"):
+            yield
+    except BaseException as e:
+        # st.rerun() and st.stop() end a rerun by raising; record them, then let them through
+        error = type(e).__name__
+        raise
+    finally:
+        _local.trace = None
+        if profiler:
+            profiler.disable()
+        if sampler:
+            sampler.stop()
+
+        duration_ms = (time.perf_counter() - trace.start) * 1000
+        record = {
+            'trace_id': trace.trace_id,
+            'page': page,
+            'started_at': trace.started_at,
+            'duration_ms': round(duration_ms, 3),
+            'spans': [
+                {**entry, 'start_ms': round(entry['start_ms'], 3), 'duration_ms': round(entry.get('duration_ms', 0), 3)}
+                for entry in trace.spans
+            ]
+        }
+        if error:
+            record['exit'] = error
+        if duration_ms >= slow_ms and (sampler or profiler):
+            TRACES_DIR.mkdir(parents=True, exist_ok=True)
+            if sampler:
+                profile_path = TRACES_DIR / f"{trace.trace_id}.folded"
+                profile_path.write_text(sampler.folded(), encoding='utf-8')
+            else:
+                profile_path = TRACES_DIR / f"{trace.trace_id}.prof"
+                profiler.dump_stats(str(profile_path))
+            record['profile'] = str(profile_path)
+        _write_trace(record)
+
+def load_traces(days: int = 1, traces_dir: Path = TRACES_DIR) -> List[Dict[str, Any]]:
+    """Traces from the most recent daily files, oldest first"""
+    traces = []
+    for path in sorted(traces_dir.glob("traces-*.jsonl"))[-days:]:
+        with open(path, 'r', encoding='utf-8') as f:
+            traces.extend(json.loads(line) for line in f if line.strip())
+    return traces
+
+def summarize_traces(traces: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Per-page rerun count and latency percentiles, plus the slowest span names"""
+    by_page: Dict[str, List[Dict[str, Any]]] = {}
+    for trace in traces:
+        by_page.setdefault(trace['page'], []).append(trace)
+
+    summary = []
+    for page, page_traces in by_page.items():
+        durations = sorted(trace['duration_ms'] for trace in page_traces)
+        span_totals: Counter = Counter()
+        for trace in page_traces:
+            for entry in trace['spans']:
+                if entry['depth'] > 0:
+                    span_totals[entry['name']] += entry['duration_ms']
+        summary.append({
+            'page': page,
+            'reruns': len(durations),
+            'p50_ms': durations[len(durations) // 2],
+            'p95_ms': durations[min(len(durations) - 1, int(len(durations) * 0.95))],
+            'max_ms': durations[-1],
+            'profiles': sum(1 for trace in page_traces if trace.get('profile')),
+            'top_spans': [(name, total / len(durations)) for name, total in span_totals.most_common(3)]
+        })
+    return sorted(summary, key=lambda row: row['p95_ms'], reverse=True)
@@ -0,0 +1,215 @@
+import hashlib
+import json
+import secrets
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional, Dict, Any, Tuple, Callable
+from config import (DATA_DIR, SESSION_BACKEND, SESSION_CACHE_SIZE, SESSION_SWEEP_INTERVAL_SECONDS, SESSION_TIMEOUT_HOURS,
+                    SESSION_MAX_AGE_HOURS)
+
+class MemorySessionBackend:
+    """Sessions kept in a dict; they do not survive a restart"""
+
+    def __init__(self):
+        self._sessions: Dict[str, Tuple[Dict[str, Any], float]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, sid: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            return self._sessions.get(sid)
+
+    def put(self, sid: str, data: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._sessions[sid] = (data, expires_at)
+
+    def delete(self, sid: str):
+        with self._lock:
+            self._sessions.pop(sid, None)
+
+    def sweep(self, now: float) -> int:
+        with self._lock:
+            expired = [sid for sid, (_, expires_at) in self._sessions.items() if expires_at <= now]
+            for sid in expired:
+                del self._sessions[sid]
+        return len(expired)
+
+class SqliteSessionBackend:
+    """Sessions stored as JSON rows in one SQLite table, so they survive restarts"""
+
+    def __init__(self, path):
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False)
+        self._lock = threading.Lock()
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.executescript('''
+            CREATE TABLE IF NOT EXISTS sessions (
+                sid TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            ) WITHOUT ROWID;
+
+            CREATE INDEX IF NOT EXISTS idx_sessions_expires ON sessions (expires_at);
+        ''')
+        self._conn.commit()
+
+    def get(self, sid: str) -> Optional[Tuple[Dict[str, Any], float]]:
+        with self._lock:
+            row = self._conn.execute("SELECT data, expires_at FROM sessions WHERE sid = ?", (sid,)).fetchone()
+        return (json.loads(row[0]), row[1]) if row else None
+
+    def put(self, sid: str, data: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._conn.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)",
+                               (sid, json.dumps(data), expires_at))
+            self._conn.commit()
+
+    def delete(self, sid: str):
+        with self._lock:
+            self._conn.execute("DELETE FROM sessions WHERE sid = ?", (sid,))
+            self._conn.commit()
+
+    def sweep(self, now: float) -> int:
+        with self._lock:
+            cursor = self._conn.execute("DELETE FROM sessions WHERE expires_at <= ?", (now,))
+            self._conn.commit()
+        return cursor.rowcount
+
+def _key(sid: str) -> str:
+    """Backend key for a session id; only its hash is stored, so a copy of the store holds no usable ids"""
+    return hashlib.sha256(sid.encode('utf-8')).hexdigest()
+
+class SessionStore:
+    """Login sessions keyed by an opaque session id, with an in-memory LRU in front of the backend
+
+    Every save slides the expiry forward by ttl, but never past max_age after
+    the session was created. Expired sessions are never returned and are
+    deleted from the backend at most once per sweep_interval.
+    """
+
+    def __init__(self, backend, ttl: float = SESSION_TIMEOUT_HOURS * 3600, cache_size: int = SESSION_CACHE_SIZE,
+                 sweep_interval: float = SESSION_SWEEP_INTERVAL_SECONDS,
+                 max_age: float = SESSION_MAX_AGE_HOURS * 3600, clock: Callable[[], float] = time.time):
+        self.backend = backend
+        self.ttl = ttl
+        self.max_age = max_age
+        self.cache_size = cache_size
+        self.sweep_interval = sweep_interval
+        self.clock = clock
+        self._cache = OrderedDict()
+        self._lock = threading.Lock()
+        self._last_sweep = clock()
+        self.hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, data: Dict[str, Any], expires_at: float):
+        with self._lock:
+            self._cache[key] = (data, expires_at)
+            self._cache.move_to_end(key)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+
+    def create(self, data: Dict[str, Any]) -> str:
+        """Store a new session and return its id"""
+        sid = secrets.token_urlsafe(32)
+        self.save(sid, {**data, 'created_at': self.clock()})
+        return sid
+
+    def get(self, sid: str) -> Optional[Dict[str, Any]]:
+        """Session data, or None if the id is unknown or expired"""
+        key = _key(sid)
+        with self._lock:
+            entry = self._cache.get(key)
+            if entry is not None:
+                self._cache.move_to_end(key)
+        if entry is None:
+            self.misses += 1
+            entry = self.backend.get(key)
+            if entry is None:
+                return None
+            self._remember(key, *entry)
+        else:
+            self.hits += 1
+
+        data, expires_at = entry
+        if expires_at <= self.clock():
+            self.delete(sid)
+            return None
+        return dict(data)
+
+    def rotate(self, sid: str, data: Optional[Dict[str, Any]] = None) -> Tuple[Optional[str], Optional[Dict[str, Any]]]:
+        """Move a session to a new id, optionally replacing its data, and invalidate the old one
+
+        Returns (new id, data), or (None, None) if sid is unknown or expired.
+        The absolute lifetime still counts from the original creation.
+        """
+        existing = self.get(sid)
+        if existing is None:
+            return None, None
+        if data is None:
+            data = existing
+        else:
+            data = {**data, 'created_at': existing.get('created_at', self.clock())}
+        new_sid = secrets.token_urlsafe(32)
+        saved = self.save(new_sid, data)
+        self.delete(sid)
+        return (new_sid, data) if saved else (None, None)
+
+    def save(self, sid: str, data: Dict[str, Any]) -> bool:
+        """Write a session through to the backend and refresh its expiry
+
+        Returns False, writing nothing, if the session has already expired, so
+        saving cannot extend a login past max_age.
+        """
+        now = self.clock()
+        data = dict(data)
+        if 'created_at' not in data:
+            # Callers rebuild the data on every save; keep the original creation time
+            existing = self.get(sid)
+            if existing is None:
+                return False
+            data['created_at'] = existing.get('created_at', now)
+        expires_at = min(now + self.ttl, data['created_at'] + self.max_age)
+        if expires_at <= now:
+            self.delete(sid)
+            return False
+        self.backend.put(_key(sid), data, expires_at)
+        self._remember(_key(sid), data, expires_at)
+        self._maybe_sweep()
+        return True
+
+    def delete(self, sid: str):
+        key = _key(sid)
+        with self._lock:
+            self._cache.pop(key, None)
+        self.backend.delete(key)
+
+    def sweep(self) -> int:
+        """Delete every expired session; returns how many the backend removed"""
+        now = self.clock()
+        self._last_sweep = now
+        with self._lock:
+            for key in [key for key, (_, expires_at) in self._cache.items() if expires_at <= now]:
+                del self._cache[key]
+        return self.backend.sweep(now)
+
+    def _maybe_sweep(self):
+        if self.clock() - self._last_sweep >= self.sweep_interval:
+            self.sweep()
+
+# One store per process, shared by every browser session
+_store: Optional[SessionStore] = None
+_store_lock = threading.Lock()
+
+def get_session_store() -> SessionStore:
+    """Get (or create) the process-wide session store"""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if SESSION_BACKEND == "memory":
+                backend = MemorySessionBackend()
+            else:
+                backend = SqliteSessionBackend(DATA_DIR / "sessions.db")
+            _store = SessionStore(backend)
+        return _store
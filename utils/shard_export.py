@@ -0,0 +1,164 @@
+import io
+import json
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Any, Iterable, Iterator, Optional, Tuple
+from config import DATA_DIR, UPLOADS_DIR, SHARD_MAX_BYTES, SHARD_READ_WORKERS
+
+INDEX_FILENAME = "index.jsonl"
+
+def _sample_key(contribution_id: str) -> str:
+    """WebDataset splits member names on the first dot, so keys must not contain one"""
+    return str(contribution_id).replace('.', '_')
+
+def iter_media_items(database=None, public_only: bool = False) -> Iterator[Tuple[str, Path, Dict[str, Any]]]:
+    """Yield (key, file path, metadata) for every media contribution with a file on disk
+
+    Covers files saved by file_handler.save_file (tracked in LocalDatabase) and
+    by offline_mode.save_offline_contribution (tracked in contributions.json).
+    With public_only, contributions without public release rights are skipped.
+    """
+    if database is None:
+        from .database import db as database
+    seen = set()
+
+    for contribution in database.iter_contributions():
+        if contribution['media_type'].lower() == 'text' or not contribution.get('file_path'):
+            continue
+        # Seen even when skipped, so a private row is never picked up again from contributions.json
+        seen.add(contribution['id'])
+        if public_only and not contribution.get('is_public', contribution.get('release_rights') == 'public'):
+            continue
+        path = Path(contribution['file_path'])
+        if path.is_file():
+            yield _sample_key(contribution['id']), path, contribution
+
+    contributions_file = DATA_DIR / "contributions.json"
+    if contributions_file.exists():
+        with open(contributions_file, 'r') as f:
+            offline_contributions = json.load(f)
+        for contribution in offline_contributions:
+            if contribution['id'] in seen or contribution.get('media_type') == "Text":
+                continue
+            if public_only and not contribution.get('public', False):
+                continue
+            matches = sorted(UPLOADS_DIR.glob(f"{contribution['id']}.*"))
+            if matches:
+                yield _sample_key(contribution['id']), matches[0], contribution
+
+def _read_sample(item: Tuple[str, Path, Dict[str, Any]]) -> Tuple[str, Path, bytes, bytes, float]:
+    """Load one sample's file and serialized metadata"""
+    key, path, metadata = item
+    metadata_json = json.dumps(metadata, ensure_ascii=False, default=str).encode('utf-8')
+    return key, path, path.read_bytes(), metadata_json, path.stat().st_mtime
+
+def _read_in_order(items: Iterable, max_workers: int) -> Iterator:
+    """Read files on a thread pool while yielding them in input order
+
+    At most 2 * max_workers reads are in flight, which bounds memory use.
+    """
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        pending = deque()
+        for item in items:
+            pending.append(executor.submit(_read_sample, item))
+            if len(pending) >= max_workers * 2:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+
+def _member_bytes(size: int) -> int:
+    """Bytes a member of this size occupies in a tar stream, header included"""
+    return tarfile.BLOCKSIZE + -(-size // tarfile.BLOCKSIZE) * tarfile.BLOCKSIZE
+
+def _add_member(tar: tarfile.TarFile, name: str, data: bytes, mtime: float) -> Tuple[int, int]:
+    """Append a member, returning (data offset, size) within the shard"""
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    info.mtime = int(mtime)
+    tar.addfile(info, io.BytesIO(data))
+    # Data ends at the current offset minus its padding to a whole block
+    return tar.offset - (_member_bytes(len(data)) - tarfile.BLOCKSIZE), len(data)
+
+def write_shards(out_dir, items: Optional[Iterable] = None, shard_size: int = SHARD_MAX_BYTES,
+                 max_workers: int = SHARD_READ_WORKERS, prefix: str = "shard",
+                 public_only: bool = False) -> Dict[str, Any]:
+    """Pack media files and their metadata JSON into size-bounded tar shards
+
+    Each sample becomes two members, <key>.<ext> and <key>.json, as WebDataset
+    expects. Files are read in path order for sequential disk access, and an
+    index.jsonl of byte offsets allows random access to any sample. public_only
+    applies when items is not given.
+    """
+    out_dir = Path(out_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+    if items is None:
+        items = iter_media_items(public_only=public_only)
+    items = sorted(items, key=lambda item: str(item[1]))
+
+    shards = []
+    tar = None
+    shard_bytes = 0
+    start = time.perf_counter()
+
+    with open(out_dir / INDEX_FILENAME, 'w', encoding='utf-8') as index:
+        for key, path, data, metadata, mtime in _read_in_order(items, max_workers):
+            # Count tar headers and block padding so shards stay close to shard_size
+            sample_bytes = _member_bytes(len(data)) + _member_bytes(len(metadata))
+            # Start a new shard unless this one is empty (oversized samples get their own shard)
+            if tar is None or (shard_bytes and shard_bytes + sample_bytes > shard_size):
+                if tar is not None:
+                    tar.close()
+                shard_name = f"{prefix}-{len(shards):06d}.tar"
+                tar = tarfile.open(out_dir / shard_name, 'w', format=tarfile.USTAR_FORMAT)
+                shards.append({'name': shard_name, 'samples': 0})
+                shard_bytes = 0
+
+            extension = path.suffix.lower() or '.bin'
+            data_offset, data_size = _add_member(tar, f"{key}{extension}", data, mtime)
+            json_offset, json_size = _add_member(tar, f"{key}.json", metadata, mtime)
+            shard_bytes += sample_bytes
+            shards[-1]['samples'] += 1
+
+            index.write(json.dumps({
+                'key': key,
+                'shard': shards[-1]['name'],
+                'member': f"{key}{extension}",
+                'offset': data_offset,
+                'size': data_size,
+                'json_offset': json_offset,
+                'json_size': json_size
+            }) + "\n")
+
+        if tar is not None:
+            tar.close()
+
+    for shard in shards:
+        shard['bytes'] = (out_dir / shard['name']).stat().st_size
+
+    return {
+        'path': str(out_dir),
+        'shards': shards,
+        'samples': sum(shard['samples'] for shard in shards),
+        'seconds': time.perf_counter() - start
+    }
+
+def load_shard_index(out_dir) -> Dict[str, Dict[str, Any]]:
+    """Load the shard index keyed by sample key"""
+    index = {}
+    with open(Path(out_dir) / INDEX_FILENAME, 'r', encoding='utf-8') as f:
+        for line in f:
+            entry = json.loads(line)
+            index[entry['key']] = entry
+    return index
+
+def read_shard_sample(out_dir, entry: Dict[str, Any]) -> Tuple[bytes, Dict[str, Any]]:
+    """Read one sample's media bytes and metadata straight from its shard"""
+    with open(Path(out_dir) / entry['shard'], 'rb') as f:
+        f.seek(entry['offset'])
+        data = f.read(entry['size'])
+        f.seek(entry['json_offset'])
+        metadata = json.loads(f.read(entry['json_size']).decode('utf-8'))
+    return data, metadata
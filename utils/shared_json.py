@@ -0,0 +1,105 @@
+import json
+import os
+import threading
+from pathlib import Path
+from types import MappingProxyType
+from typing import Any, Callable, Dict, Optional, Tuple
+
+def _freeze(data: Any) -> Any:
+    """Read-only view of a parsed top-level list or dict"""
+    if isinstance(data, list):
+        return tuple(data)
+    if isinstance(data, dict):
+        return MappingProxyType(data)
+    return data
+
+def _thaw(data: Any) -> Any:
+    """Private, writable shallow copy of a frozen value"""
+    if isinstance(data, tuple):
+        return list(data)
+    if isinstance(data, MappingProxyType):
+        return dict(data)
+    return data
+
+class SharedJsonFile:
+    """A JSON file parsed once per process and shared by every session
+
+    Readers all get the same read-only snapshot (a tuple or mappingproxy)
+    until the file's mtime or size changes, so 500 sessions hold one copy
+    rather than 500. Writes are copy-on-write: update() copies the latest
+    snapshot, applies the change, replaces the file atomically and shares
+    the result, so a reader never sees a half-applied change and concurrent
+    writers no longer overwrite each other's additions. The items inside a
+    snapshot are shared too and must not be modified in place.
+    """
+
+    def __init__(self, path: Path, default: Callable[[], Any] = dict):
+        self.path = Path(path)
+        self.default = default
+        self.loads = 0
+        self._lock = threading.Lock()
+        self._stamp: Optional[Tuple[int, int]] = None
+        self._data: Any = None
+
+    def _file_stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = self.path.stat()
+        except FileNotFoundError:
+            return None
+        return stat.st_mtime_ns, stat.st_size
+
+    def _current(self) -> Any:
+        """Latest snapshot, re-parsing only if the file changed; call with the lock held"""
+        # Stamp before reading: a write racing the read leaves a stale stamp, which forces a re-read
+        stamp = self._file_stamp()
+        if self._data is None or stamp != self._stamp:
+            if stamp is None:
+                data = self.default()
+            else:
+                with open(self.path, 'r', encoding='utf-8') as f:
+                    data = json.load(f)
+                self.loads += 1
+            self._data = _freeze(data)
+            self._stamp = stamp
+        return self._data
+
+    def get(self) -> Any:
+        """Current contents as a read-only snapshot"""
+        with self._lock:
+            return self._current()
+
+    def update(self, change: Callable[[Any], Any]) -> Any:
+        """Apply change to a private copy, write it atomically and share it"""
+        with self._lock:
+            data = _thaw(self._current())
+            result = change(data)
+            if result is not None:
+                data = result
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, indent=2)
+            os.replace(tmp_path, self.path)
+            self._data = _freeze(data)
+            self._stamp = self._file_stamp()
+            return self._data
+
+    def append(self, item: Any) -> Any:
+        return self.update(lambda data: data.append(item))
+
+    def set_item(self, key: str, value: Any) -> Any:
+        return self.update(lambda data: data.__setitem__(key, value))
+
+# One instance per file per process, so every session shares the same snapshot
+_files: Dict[Path, SharedJsonFile] = {}
+_files_lock = threading.Lock()
+
+def get_shared_file(path, default: Callable[[], Any] = dict) -> SharedJsonFile:
+    """Get (or create) the process-wide shared view of a JSON file"""
+    key = Path(path).resolve()
+    with _files_lock:
+        shared = _files.get(key)
+        if shared is None:
+            shared = SharedJsonFile(key, default)
+            _files[key] = shared
+        return shared
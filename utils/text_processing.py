@@ -0,0 +1,234 @@
+import hashlib
+import json
+import re
+import sys
+import threading
+import unicodedata
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import islice
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+import numpy as np
+from config import DATA_DIR, TEXT_CACHE_SIZE, TEXT_CACHE_MAX_BYTES, TEXT_CACHE_MAX_TEXT_CHARS, TEXT_PROCESSING_WORKERS
+
+# Invisible characters with no meaning in stored text. ZWJ/ZWNJ are kept:
+# they select conjunct forms in Indic scripts.
+_STRIPPED_CHARS = dict.fromkeys(map(ord, '\ufeff\u200b\u00ad'))
+
+# A word is a run of letters, digits and combining marks. Python's \w excludes
+# vowel signs and viramas, which would split every Indic word, so the Indic
+# blocks (minus the dandas) and Arabic marks are added explicitly.
+_TOKEN_RE = re.compile(
+    r'(?:[^\W_]|[\u0900-\u0963\u0966-\u0DFF\u0610-\u061A\u064B-\u065F\u0670\u200C\u200D])+'
+)
+
+# Sentence ends: Latin marks, danda and double danda, Urdu full stop and question mark
+_SENTENCE_RE = re.compile(r'(?<=[.!?\u0964\u0965\u06D4\u061F])\s+|\n\s*\n')
+
+# (first code point, script) for each block; None marks a gap between scripts
+_SCRIPT_BLOCKS = [
+    (0x0041, 'latin'), (0x0250, None),
+    (0x0600, 'arabic'), (0x0700, None),
+    (0x0900, 'devanagari'), (0x0980, 'bengali'), (0x0A00, 'gurmukhi'), (0x0A80, 'gujarati'),
+    (0x0B00, 'odia'), (0x0B80, 'tamil'), (0x0C00, 'telugu'), (0x0C80, 'kannada'),
+    (0x0D00, 'malayalam'), (0x0D80, None),
+    (0xFB50, 'arabic'), (0xFE00, None), (0xFE70, 'arabic'), (0xFF00, None),
+]
+_BLOCK_STARTS = np.array([start for start, _ in _SCRIPT_BLOCKS], dtype=np.uint32)
+_BLOCK_SCRIPTS = [script for _, script in _SCRIPT_BLOCKS]
+
+class TextFeatures(NamedTuple):
+    """Per-text results computed once at ingest and shared by search, dedup and statistics"""
+    content_hash: str
+    normalized: str
+    script: Optional[str]
+    sentence_count: int
+    token_count: int
+    char_count: int
+    tokens: Tuple[str, ...]
+
+def content_hash(text: str) -> str:
+    """Stable identity of a text body, used to skip unchanged texts on re-processing"""
+    return hashlib.sha1(text.encode('utf-8')).hexdigest()
+
+def normalize_text(text: str) -> str:
+    """NFC-normalize, drop invisible characters and tidy whitespace, keeping line breaks"""
+    text = unicodedata.normalize('NFC', text or '').translate(_STRIPPED_CHARS)
+    lines = (' '.join(line.split()) for line in text.replace('\r\n', '\n').split('\n'))
+    return '\n'.join(lines).strip()
+
+def tokenize(text: str) -> List[str]:
+    """Case-folded word tokens of normalized text"""
+    return [token.casefold() for token in _TOKEN_RE.findall(text)]
+
+def split_sentences(text: str) -> List[str]:
+    """Sentences of normalized text, split after ., !, ?, danda or Urdu full stop"""
+    return [sentence.strip() for sentence in _SENTENCE_RE.split(text) if sentence.strip()]
+
+def detect_script(text: str) -> Tuple[Optional[str], Dict[str, int]]:
+    """Dominant script of the letters in text, and the letter count per script"""
+    codes = np.frombuffer(text.encode('utf-32-le'), dtype=np.uint32)
+    blocks = np.searchsorted(_BLOCK_STARTS, codes, side='right') - 1
+    counts = {}
+    for block, count in zip(*np.unique(blocks[blocks >= 0], return_counts=True)):
+        script = _BLOCK_SCRIPTS[block]
+        if script:
+            counts[script] = counts.get(script, 0) + int(count)
+    if not counts:
+        return None, counts
+    return max(counts, key=counts.get), counts
+
+def _features_size(features: TextFeatures) -> int:
+    """Approximate memory held by one cached TextFeatures"""
+    return (sys.getsizeof(features.normalized) + sys.getsizeof(features.tokens)
+            + sum(sys.getsizeof(token) for token in features.tokens))
+
+class TextFeatureCache:
+    """Analyzed texts keyed by content hash, with LRU eviction bounded by entries and total bytes
+
+    Keys are hashes rather than the texts themselves, and texts longer than
+    max_text_chars are not cached at all, so a few large submissions cannot
+    pin hundreds of megabytes per process.
+    """
+
+    def __init__(self, max_entries: int = TEXT_CACHE_SIZE, max_bytes: int = TEXT_CACHE_MAX_BYTES,
+                 max_text_chars: int = TEXT_CACHE_MAX_TEXT_CHARS):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.max_text_chars = max_text_chars
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[TextFeatures]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    def put(self, key: str, features: TextFeatures):
+        size = _features_size(features)
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            previous = self._entries.pop(key, None)
+            if previous is not None:
+                self.size -= previous[1]
+            self._entries[key] = (features, size)
+            self.size += size
+            while len(self._entries) > self.max_entries or self.size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.size -= evicted_size
+
+    def clear(self):
+        """Drop every cached entry"""
+        with self._lock:
+            self._entries.clear()
+            self.size = 0
+
+# Per process; the contribute page re-analyzes the same text on every rerun
+feature_cache = TextFeatureCache()
+
+def analyze_text(text: str) -> TextFeatures:
+    """Normalize, segment and tokenize a text; repeated calls with the same short text are free"""
+    digest = content_hash(text)
+    cacheable = len(text) <= feature_cache.max_text_chars
+    if cacheable:
+        features = feature_cache.get(digest)
+        if features is not None:
+            return features
+
+    normalized = normalize_text(text)
+    tokens = tuple(tokenize(normalized))
+    # Only word characters count towards the script, so digits and punctuation don't vote
+    script, _ = detect_script(''.join(tokens))
+    features = TextFeatures(
+        content_hash=digest,
+        normalized=normalized,
+        script=script,
+        sentence_count=len(split_sentences(normalized)),
+        token_count=len(tokens),
+        char_count=len(normalized),
+        tokens=tokens
+    )
+    if cacheable:
+        feature_cache.put(digest, features)
+    return features
+
+def truncate_text(text: str, limit: int) -> str:
+    """Shorten text to at most limit characters at a word boundary
+
+    Cutting mid-word can leave a dangling virama or vowel sign that renders
+    as a broken character.
+    """
+    if len(text) <= limit:
+        return text
+    cut = text[:limit]
+    boundary = max(cut.rfind(' '), cut.rfind('\n'))
+    return cut[:boundary].rstrip() if boundary > 0 else cut
+
+def ingest_text(contribution_id: str, text: str, database=None) -> TextFeatures:
+    """Process a new text contribution and store its features, tokens and dedup signature"""
+    if database is None:
+        from .database import db as database
+    from .dedup import index_text
+    features = analyze_text(text)
+    database.save_text_features([(contribution_id, features)])
+    index_text(contribution_id, tokens=features.tokens, database=database)
+    return features
+
+def iter_text_items(database=None) -> Iterator[Tuple[str, str]]:
+    """Yield (contribution id, text) for every text contribution known locally"""
+    if database is None:
+        from .database import db as database
+    seen = set()
+
+    for contribution in database.iter_contributions():
+        if contribution['media_type'].lower() != 'text':
+            continue
+        content_file = DATA_DIR / f"{contribution['id']}.txt"
+        text = content_file.read_text(encoding='utf-8') if content_file.exists() else contribution['description']
+        seen.add(contribution['id'])
+        yield contribution['id'], text or ''
+
+    contributions_file = DATA_DIR / "contributions.json"
+    if contributions_file.exists():
+        with open(contributions_file, 'r') as f:
+            offline_contributions = json.load(f)
+        for contribution in offline_contributions:
+            if contribution['id'] in seen or contribution.get('media_type') != "Text":
+                continue
+            content_file = DATA_DIR / f"{contribution['id']}.txt"
+            if content_file.exists():
+                yield contribution['id'], content_file.read_text(encoding='utf-8')
+
+def _analyze_entry(item: Tuple[str, str]) -> Tuple[str, TextFeatures]:
+    """Worker process job"""
+    contribution_id, text = item
+    return contribution_id, analyze_text(text)
+
+def process_corpus(database=None, workers: int = TEXT_PROCESSING_WORKERS,
+                   batch_size: int = 2000) -> Dict[str, int]:
+    """Re-process every local text contribution whose content changed, using a process pool"""
+    if database is None:
+        from .database import db as database
+    items = iter_text_items(database)
+    processed = unchanged = 0
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while True:
+            batch = list(islice(items, batch_size))
+            if not batch:
+                break
+            known = database.get_text_hashes([contribution_id for contribution_id, _ in batch])
+            todo = [item for item in batch if known.get(item[0]) != content_hash(item[1])]
+            unchanged += len(batch) - len(todo)
+            if todo:
+                database.save_text_features(list(executor.map(_analyze_entry, todo, chunksize=64)))
+                processed += len(todo)
+    return {'processed': processed, 'unchanged': unchanged}
\ No newline at end of file